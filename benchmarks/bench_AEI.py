@@ -0,0 +1,113 @@
+import io
+
+from AEPi import AEI, CompressionFormat, Texture
+
+from .common import SIZES, TEXTURE_COUNTS, FONT_SIZES, ROUNDTRIP_FORMATS, makeAEI, peakMemory, unit, textureGrid
+
+
+class ReadWrite:
+    """Reading and writing whole AEIs, for every format which can be both compressed and decompressed.
+    """
+    params = (ROUNDTRIP_FORMATS, SIZES)
+    param_names = ["format", "size"]
+    timeout = 600
+
+    def setup(self, format: str, size: int):
+        self.format = CompressionFormat[format]
+        self.aei = makeAEI(size)
+        file = io.BytesIO()
+        self.aei.write(file, format=self.format)
+        self.file = file.getvalue()
+
+
+    def teardown(self, format: str, size: int):
+        self.aei.close()
+
+
+    def time_read(self, format: str, size: int):
+        AEI.read(io.BytesIO(self.file)).close()
+
+
+    def time_write(self, format: str, size: int):
+        self.aei.write(format=self.format)
+
+
+    @unit("bytes")
+    def track_peakmem_read(self, format: str, size: int):
+        return peakMemory(lambda: AEI.read(io.BytesIO(self.file)).close())
+
+
+    @unit("bytes")
+    def track_peakmem_write(self, format: str, size: int):
+        return peakMemory(lambda: self.aei.write(format=self.format))
+
+
+class Textures:
+    """Texture management, which looks textures up by bounding box.
+    """
+    params = ([256, 4096], TEXTURE_COUNTS)
+    param_names = ["size", "textures"]
+
+    def setup(self, size: int, textures: int):
+        self.textures = textureGrid(size, textures)
+        self.aei = makeAEI(size, textures)
+
+
+    def teardown(self, size: int, textures: int):
+        self.aei.close()
+
+
+    def time_addTextures(self, size: int, textures: int):
+        with AEI((size, size)) as aei:
+            for texture in self.textures:
+                aei.addTexture(texture)
+
+
+    def time_getTextures(self, size: int, textures: int):
+        for texture in self.textures:
+            self.aei.getTexture(texture).close()
+
+
+    def time_removeTextures(self, size: int, textures: int):
+        # Remove in reverse order, so every lookup has to scan the remaining textures
+        for texture in reversed(self.textures):
+            self.aei.removeTexture(texture, clearImage=False)
+
+        for texture in self.textures:
+            self.aei.addTexture(texture)
+
+
+    def time_lookupMissing(self, size: int, textures: int):
+        missing = Texture(0, 0, 1, 1)
+        for _ in range(len(self.textures)):
+            self.aei._findTextureByBox(missing) # type: ignore[reportPrivateUsage]
+
+
+class Fonts:
+    """Reading and writing the symbol maps of uncompressed AEIs.
+    """
+    params = (FONT_SIZES,)
+    param_names = ["glyphs"]
+
+    def setup(self, glyphs: int):
+        self.aei = makeAEI(256, glyphs=glyphs)
+        file = io.BytesIO()
+        self.aei.write(file, format=CompressionFormat.Uncompressed_UI)
+        self.file = file.getvalue()
+
+
+    def teardown(self, glyphs: int):
+        self.aei.close()
+
+
+    def time_read(self, glyphs: int):
+        AEI.read(io.BytesIO(self.file)).close()
+
+
+    def time_write(self, glyphs: int):
+        self.aei.write(format=CompressionFormat.Uncompressed_UI)
+
+
+    @unit("bytes")
+    def track_peakmem_read(self, glyphs: int):
+        return peakMemory(lambda: AEI.read(io.BytesIO(self.file)).close())
@@ -0,0 +1,64 @@
+from PIL import Image
+
+from AEPi import CompressionFormat
+from AEPi.codec import compressorFor, decompressorFor, encodeImage, decodeImage
+
+from .common import SIZES, COMPRESS_FORMATS, DECOMPRESS_FORMATS, makeArray, makePayload, peakMemory, unit
+
+
+class Compress:
+    """The registered compressor for every format, both alone and with the conversions done by `encodeImage`.
+    """
+    params = (COMPRESS_FORMATS, SIZES)
+    param_names = ["format", "size"]
+    timeout = 600
+
+    def setup(self, format: str, size: int):
+        self.format = CompressionFormat[format]
+        self.codec = compressorFor(self.format)
+        self.image = Image.fromarray(makeArray(size)) # type: ignore[reportUnknownMemberType]
+        self.converted = self.image.convert(self.format.pillowMode)
+
+
+    def teardown(self, format: str, size: int):
+        self.image.close()
+        self.converted.close()
+
+
+    def time_compress(self, format: str, size: int):
+        self.codec.compress(self.converted, self.format, None)
+
+
+    def time_encodeImage(self, format: str, size: int):
+        encodeImage(self.image, self.format, None)
+
+
+    @unit("bytes")
+    def track_peakmem_encodeImage(self, format: str, size: int):
+        return peakMemory(lambda: encodeImage(self.image, self.format, None))
+
+
+class Decompress:
+    """The registered decompressor for every format, both alone and with the conversions done by `decodeImage`.
+    """
+    params = (DECOMPRESS_FORMATS, SIZES)
+    param_names = ["format", "size"]
+    timeout = 600
+
+    def setup(self, format: str, size: int):
+        self.format = CompressionFormat[format]
+        self.codec = decompressorFor(self.format)
+        self.payload = makePayload(self.format, size)
+
+
+    def time_decompress(self, format: str, size: int):
+        self.codec.decompress(self.payload, self.format, size, size, None).close()
+
+
+    def time_decodeImage(self, format: str, size: int):
+        decodeImage(self.payload, self.format, size, size, None).close()
+
+
+    @unit("bytes")
+    def track_peakmem_decodeImage(self, format: str, size: int):
+        return peakMemory(lambda: decodeImage(self.payload, self.format, size, size, None).close())
@@ -0,0 +1,38 @@
+from PIL import Image
+
+from AEPi.lib import imageOps
+
+from .common import SIZES, makeArray, peakMemory, unit
+
+
+class SwitchRGBA_BGRA:
+    params = (SIZES,)
+    param_names = ["size"]
+
+    def setup(self, size: int):
+        self.image = Image.fromarray(makeArray(size)) # type: ignore[reportUnknownMemberType]
+
+
+    def teardown(self, size: int):
+        self.image.close()
+
+
+    def time_switchRGBA_BGRA(self, size: int):
+        imageOps.switchRGBA_BGRA(self.image).close()
+
+
+    @unit("bytes")
+    def track_peakmem_switchRGBA_BGRA(self, size: int):
+        return peakMemory(lambda: imageOps.switchRGBA_BGRA(self.image).close())
+
+
+class Mipmaps:
+    params = (SIZES, ["box", "kaiser"])
+    param_names = ["size", "filter"]
+
+    def setup(self, size: int, filter: imageOps.MipmapFilter):
+        self.array = makeArray(size)
+
+
+    def time_downsample(self, size: int, filter: imageOps.MipmapFilter):
+        imageOps.downsample(self.array, filter)
@@ -0,0 +1,89 @@
+import tracemalloc
+from typing import Any, Callable, Dict, List, TypeVar
+import numpy as np
+import numpy.typing as npt
+
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.codec import compressors, decompressors
+
+TBenchmark = TypeVar("TBenchmark", bound=Callable[..., Any])
+
+# Square image sizes, in pixels
+SIZES = [256, 1024, 4096, 8192]
+TEXTURE_COUNTS = [1, 64, 1024]
+FONT_SIZES = [0, 256, 4096]
+
+# Formats which can be both compressed and decompressed by the loaded codecs
+ROUNDTRIP_FORMATS = [f.name for f in CompressionFormat if f in compressors and f in decompressors]
+COMPRESS_FORMATS = [f.name for f in compressors]
+DECOMPRESS_FORMATS = [f.name for f in decompressors]
+
+
+def makeArray(size: int) -> npt.NDArray[np.uint8]:
+    """A deterministic, noisy `(size, size, 4)` RGBA image, which doesn't compress trivially.
+    """
+    rng = np.random.default_rng(size)
+    gradient = np.linspace(0, 255, size, dtype=np.float32)
+    array = np.empty((size, size, 4), dtype=np.uint8)
+    array[..., 0] = gradient[None, :]
+    array[..., 1] = gradient[:, None]
+    array[..., 2] = rng.integers(0, 256, (size, size), dtype=np.uint8)
+    array[..., 3] = 255
+    return array
+
+
+def textureGrid(size: int, count: int) -> List[Texture]:
+    """`count` textures tiling a `size` x `size` AEI as evenly as possible.
+    """
+    perRow = int(np.ceil(np.sqrt(count)))
+    tileSize = max(1, size // perRow)
+    return [Texture((i % perRow) * tileSize, (i // perRow) * tileSize, tileSize, tileSize) for i in range(count)]
+
+
+def makeFont(size: int, glyphs: int) -> Dict[str, Texture]:
+    """A symbol map of `glyphs` distinct characters, tiling a `size` x `size` AEI.
+    """
+    # Skip the surrogate range, which can't be encoded as a single UTF-16 code unit
+    characters = (chr(c) for c in range(0x20, 0x10000) if not 0xD800 <= c < 0xE000)
+    return dict(zip(characters, textureGrid(size, glyphs)))
+
+
+def makeAEI(size: int, textures: int = 1, glyphs: int = 0) -> AEI:
+    aei = AEI.fromArray(makeArray(size))
+    for texture in textureGrid(size, textures):
+        aei.addTexture(texture)
+    
+    if glyphs:
+        aei.fonts.append(makeFont(size, glyphs))
+    
+    return aei
+
+
+def unit(name: str) -> Callable[[TBenchmark], TBenchmark]:
+    """Set the unit of a `track_` benchmark, which asv reads from the `unit` attribute of the benchmark.
+    """
+    def decorator(benchmark: TBenchmark) -> TBenchmark:
+        setattr(benchmark, "unit", name)
+        return benchmark
+    return decorator
+
+
+def peakMemory(func: Callable[[], Any]) -> int:
+    """Call `func`, and measure the peak memory allocated during the call, in bytes.
+    Only allocations made through python's and numpy's allocators are traced.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def makePayload(format: CompressionFormat, size: int) -> bytes:
+    """Deterministic, random image content of a `size` x `size` image in `format`, for benchmarking decompression.
+    Decoding cost does not depend on image content, so this does not need to be a sensible image.
+    """
+    rng = np.random.default_rng(size)
+    return rng.integers(0, 256, format.imageLength(size, size), dtype=np.uint8).tobytes()
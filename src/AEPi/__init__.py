@@ -1,8 +1,19 @@
-from .image import AEI, Texture
+from .image import AEI, Texture, Mipmap, AeiParser, CompressedAEI, CubeMap
 from .constants import CompressionFormat, CompressionQuality
 from .codec import *
 from . import codecs
 from . import lib
+from . import containers
+from . import instrumentation
+from . import assetIndex
+from . import integrity
+from . import archives
+from . import delta
+from . import dedup
+from . import streaming
+from . import derivatives
+from . import builder
+from . import fontAtlas
 
 __version__ = "0.8.4"
-__all__ = ["AEI", "Texture", "CompressionFormat", "CompressionQuality", "codecs", "lib", "codec"]
+__all__ = ["AEI", "Texture", "Mipmap", "AeiParser", "CompressedAEI", "CubeMap", "CompressionFormat", "CompressionQuality", "codecs", "lib", "containers", "instrumentation", "assetIndex", "integrity", "archives", "delta", "dedup", "streaming", "derivatives", "builder", "fontAtlas", "codec"]
@@ -0,0 +1,232 @@
+import mmap
+import os
+import struct
+import tarfile
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import suppress
+from os import PathLike
+from types import TracebackType
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, Tuple, Type, TypeVar, Union, cast
+
+from .exceptions import AeiReadException
+from .image import AEI, CompressedAEI
+
+TException = TypeVar("TException", bound=Exception)
+
+# The file extension of archive entries treated as AEIs
+AEI_EXTENSION = ".aei"
+
+# Signature, version, flags, compression, time, date, crc, sizes, then the lengths of the name and extra field
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_ZIP_LOCAL_SIGNATURE = b"PK\x03\x04"
+
+
+class AeiArchive:
+    """A zip or tar archive of AEI files, such as a game asset pack, read without extracting it to disk.
+
+    Entries are located from the archive's index: the central directory of a zip, or the member headers of a tar.
+    Entries which are stored without compression (in a zip with `ZIP_STORED`, or in an uncompressed tar) are read from a memory map of the archive,
+    so their image content is never copied until it is decoded. Other entries are decompressed from the archive as they are read.
+
+    ```py
+    with AeiArchive("assets.zip") as archive:
+        for name, aei in archive.readAll():
+            with aei:
+                ...
+    ```
+
+    :param path: The path to the archive
+    :type path: Union[str, PathLike]
+    :raises ValueError: If the file is neither a zip nor a tar archive
+    """
+    def __init__(self, path: Union[str, PathLike[Any]]) -> None:
+        self._file = open(path, "rb")
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        self._map: Optional[mmap.mmap] = None
+        # The offset and length of each entry which can be read from the memory map
+        self._mapped: Dict[str, Tuple[int, int]] = {}
+
+        try:
+            if zipfile.is_zipfile(self._file):
+                self._zip = zipfile.ZipFile(self._file)
+                self._names = [i.filename for i in self._zip.infolist() if _isAei(i.filename) and not i.is_dir()]
+            else:
+                # is_zipfile leaves the file at the end
+                self._file.seek(0)
+                self._openTar(path)
+
+            if os.fstat(self._file.fileno()).st_size > 0:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._zip is not None and self._map is not None:
+                self._mapStoredZipEntries()
+
+        except:
+            self.close()
+            raise
+
+
+    def _openTar(self, path: Union[str, PathLike[Any]]):
+        try:
+            # Uncompressed tars can be memory mapped
+            self._tar = tarfile.open(fileobj=self._file, mode="r:")
+            members = self._tar.getmembers()
+            self._mapped = {m.name: (m.offset_data, m.size) for m in members if m.isreg() and not m.sparse and _isAei(m.name)} # type: ignore[reportAttributeAccessIssue]
+        except tarfile.ReadError:
+            self._file.seek(0)
+            try:
+                self._tar = tarfile.open(fileobj=self._file, mode="r:*")
+            except tarfile.ReadError as ex:
+                raise ValueError(f"{os.fspath(path)} is neither a zip nor a tar archive") from ex
+            members = self._tar.getmembers()
+
+        self._names = [m.name for m in members if m.isreg() and _isAei(m.name)]
+
+
+    def _mapStoredZipEntries(self):
+        assert self._zip is not None and self._map is not None
+        for info in self._zip.infolist():
+            # Encrypted entries can't be read in place
+            if info.filename not in self._names or info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1:
+                continue
+
+            # The local header's extra field may differ from the central directory's, so its length is read from the local header
+            header = _ZIP_LOCAL_HEADER.unpack_from(self._map, info.header_offset)
+            if header[0] != _ZIP_LOCAL_SIGNATURE:
+                continue
+            offset = info.header_offset + _ZIP_LOCAL_HEADER.size + header[-2] + header[-1]
+            if offset + info.file_size <= len(self._map):
+                self._mapped[info.filename] = (offset, info.file_size)
+
+
+    @property
+    def names(self) -> List[str]:
+        """The names of the AEI entries in the archive, in archive order.
+
+        :return: The name of each AEI entry
+        :rtype: List[str]
+        """
+        return list(self._names)
+
+
+    def isMapped(self, name: str) -> bool:
+        """Whether an entry is read from a memory map of the archive, without copying its image content.
+
+        :param name: The name of the entry
+        :type name: str
+        :return: Whether the entry is memory mapped
+        :rtype: bool
+        """
+        return name in self._mapped and self._map is not None
+
+
+    def readCompressed(self, name: str) -> CompressedAEI:
+        """Read an AEI entry without decoding its image content.
+        For memory mapped entries, `mipmaps` are views of the memory map, which are valid until the archive is closed.
+
+        :param name: The name of the entry
+        :type name: str
+        :raises KeyError: If the archive has no AEI entry called `name`
+        :raises AeiReadException: If the entry is not a valid AEI
+        :return: The undecoded contents of the entry
+        :rtype: CompressedAEI
+        """
+        if name not in self._names:
+            raise KeyError(f"The archive has no AEI entry called {name!r}")
+
+        if self.isMapped(name):
+            offset, length = self._mapped[name]
+            return CompressedAEI.fromBuffer(memoryview(self._map)[offset : offset + length]) # type: ignore[reportArgumentType]
+
+        if self._zip is not None:
+            with self._zip.open(name) as entry:
+                # Archive entries are binary files, typed only as IO[bytes]
+                return CompressedAEI.read(cast(BinaryIO, entry))
+
+        assert self._tar is not None
+        entry = self._tar.extractfile(name)
+        if entry is None:
+            raise AeiReadException(f"Entry {name!r} is not a regular file")
+        with entry:
+            return CompressedAEI.read(cast(BinaryIO, entry))
+
+
+    def read(self, name: str) -> AEI:
+        """Read and decode an AEI entry.
+
+        :param name: The name of the entry
+        :type name: str
+        :raises KeyError: If the archive has no AEI entry called `name`
+        :raises AeiReadException: If the entry is not a valid AEI
+        :return: The decoded entry
+        :rtype: AEI
+        """
+        return AEI.fromCompressed(self.readCompressed(name))
+
+
+    def readAll(self, workers: Optional[int] = None) -> Iterator[Tuple[str, AEI]]:
+        """Read and decode every AEI entry, in archive order.
+        Entries are read from the archive in order, while previously read entries are decoded concurrently.
+        Only a few entries per worker are held at once, so memory use does not grow with the size of the archive.
+
+        :param workers: The number of entries to decode at once. defaults to the `ThreadPoolExecutor` default
+        :type workers: Optional[int], optional
+        :raises AeiReadException: If an entry is not a valid AEI
+        :return: The name of each entry, and the decoded entry
+        :rtype: Iterator[Tuple[str, AEI]]
+        """
+        # Matches the ThreadPoolExecutor default
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        window = 2 * workers
+
+        with ThreadPoolExecutor(workers) as executor:
+            pending: Deque[Tuple[str, Future[AEI]]] = deque()
+            try:
+                for name in self._names:
+                    pending.append((name, executor.submit(AEI.fromCompressed, self.readCompressed(name))))
+                    if len(pending) >= window:
+                        name, decoded = pending.popleft()
+                        yield name, decoded.result()
+
+                while pending:
+                    name, decoded = pending.popleft()
+                    yield name, decoded.result()
+
+            finally:
+                # Entries which were decoded, but never yielded, are closed
+                for _, decoded in pending:
+                    decoded.cancel()
+                    if not decoded.cancelled() and decoded.exception() is None:
+                        decoded.result().close()
+
+
+    def close(self):
+        """Close the archive.
+        Views of memory mapped entries keep the memory map open until they are released.
+        """
+        if self._zip is not None:
+            self._zip.close()
+        if self._tar is not None:
+            self._tar.close()
+        if self._map is not None:
+            with suppress(BufferError):
+                self._map.close()
+        self._file.close()
+
+
+    def __enter__(self):
+        """This method is called when entering a `with` statement.
+        """
+        return self
+
+
+    def __exit__(self, exceptionType: Type[TException], exception: TException, trace: TracebackType):
+        """This method is called when exiting a `with` statement.
+        """
+        self.close()
+
+
+def _isAei(name: str) -> bool:
+    return name.lower().endswith(AEI_EXTENSION)
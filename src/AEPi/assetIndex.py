@@ -0,0 +1,315 @@
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike
+from types import TracebackType
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Type, TypeVar, Union, cast
+
+from .constants import CompressionFormat, CompressionQuality
+from .exceptions import AeiReadException
+from .image import CompressedAEI, AeiMetadata, Texture
+
+TException = TypeVar("TException", bound=Exception)
+
+# The file extension of AEI files found by `AssetIndex.scan`
+AEI_EXTENSION = ".aei"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtimeNs INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    mipmapped INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    quality INTEGER,
+    payloadHash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS filesFormat ON files (format, width, height);
+CREATE INDEX IF NOT EXISTS filesPayloadHash ON files (payloadHash);
+
+CREATE TABLE IF NOT EXISTS textures (
+    fileId INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS texturesFile ON textures (fileId);
+
+CREATE TABLE IF NOT EXISTS glyphs (
+    fileId INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    font INTEGER NOT NULL,
+    glyph TEXT NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS glyphsGlyph ON glyphs (glyph);
+CREATE INDEX IF NOT EXISTS glyphsFile ON glyphs (fileId);
+"""
+
+_FILE_COLUMNS = "path, format, mipmapped, width, height, quality, payloadHash, mtimeNs, size"
+
+
+class IndexedAei(NamedTuple):
+    """An AEI file recorded in an `AssetIndex`.
+    """
+    # The absolute path to the file
+    path: str
+    format: CompressionFormat
+    mipmapped: bool
+    width: int
+    height: int
+    quality: Optional[CompressionQuality]
+    # The hex BLAKE2b digest of the image content of every mip level
+    payloadHash: str
+    # The modification time of the file when it was indexed, in nanoseconds
+    mtimeNs: int
+    # The size of the file when it was indexed, in bytes
+    size: int
+
+
+class ScanResult(NamedTuple):
+    """The changes made to an `AssetIndex` by `AssetIndex.scan`.
+    """
+    # Files which were not in the index
+    added: List[str]
+    # Files which were in the index, but have changed since
+    updated: List[str]
+    # Files which were in the index, but no longer exist
+    removed: List[str]
+    # The number of files which were in the index, and have not changed
+    unchanged: int
+    # Files which could not be read, and so are not in the index
+    failed: Dict[str, AeiReadException]
+
+
+class AssetIndex:
+    """A searchable record of the metadata of many AEI files, stored in an SQLite database.
+
+    Files are indexed with `CompressedAEI.readMetadata`, so image content is hashed but never decoded.
+    Rescanning only reads files whose modification time or size has changed.
+
+    ```py
+    with AssetIndex("assets.sqlite") as index:
+        index.scan("path/to/assets")
+        large = index.query(format=CompressionFormat.ETC2, minWidth=2048, minHeight=2048)
+        withGlyph = index.query(glyph="€")
+    ```
+
+    :param database: The path to the database file, which is created if it does not exist. defaults to an in-memory database
+    :type database: Union[str, PathLike], optional
+    """
+    def __init__(self, database: Union[str, PathLike[Any]] = ":memory:") -> None:
+        self._connection = sqlite3.connect(database)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(_SCHEMA)
+
+
+    def scan(self, root: Union[str, PathLike[Any]], recursive: bool = True) -> ScanResult:
+        """Bring the index up to date with the AEI files in a directory.
+        New and changed files are read concurrently, and files which no longer exist are removed from the index.
+
+        :param root: The directory to scan
+        :type root: Union[str, PathLike]
+        :param recursive: Whether to scan subdirectories. defaults to True
+        :type recursive: bool, optional
+        :return: The changes made to the index
+        :rtype: ScanResult
+        """
+        root = os.path.abspath(root)
+        found = dict(_findAeis(root, recursive))
+        known = self._knownFiles(root, recursive)
+
+        changed = [path for path, stat in found.items() if known.get(path) != stat]
+        removed = [path for path in known if path not in found]
+
+        # Reading metadata is I/O bound, and hashing releases the GIL, so files are read concurrently
+        with ThreadPoolExecutor() as executor:
+            results = list(executor.map(_readIndexable, changed))
+
+        added: List[str] = []
+        updated: List[str] = []
+        failed: Dict[str, AeiReadException] = {}
+        with self._connection:
+            for path in removed:
+                self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+
+            for path, result in zip(changed, results):
+                if isinstance(result, AeiReadException):
+                    failed[path] = result
+                    self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                    continue
+
+                (updated if path in known else added).append(path)
+                self._insert(path, found[path], *result)
+
+        return ScanResult(added, updated, removed, len(found) - len(changed), failed)
+
+
+    def query(
+            self,
+            format: Optional[CompressionFormat] = None,
+            minWidth: Optional[int] = None,
+            minHeight: Optional[int] = None,
+            glyph: Optional[str] = None,
+            payloadHash: Optional[str] = None
+        ) -> List[IndexedAei]:
+        """Find indexed AEIs matching all of the given criteria.
+
+        :param format: Only AEIs in this compression format. defaults to any format
+        :type format: Optional[CompressionFormat], optional
+        :param minWidth: Only AEIs at least this wide. defaults to any width
+        :type minWidth: Optional[int], optional
+        :param minHeight: Only AEIs at least this tall. defaults to any height
+        :type minHeight: Optional[int], optional
+        :param glyph: Only AEIs with a symbol map containing this glyph. defaults to any glyphs
+        :type glyph: Optional[str], optional
+        :param payloadHash: Only AEIs with this image content hash, for finding duplicates. defaults to any hash
+        :type payloadHash: Optional[str], optional
+        :return: The matching AEIs, ordered by path
+        :rtype: List[IndexedAei]
+        """
+        conditions: List[str] = []
+        parameters: List[Any] = []
+        if format is not None:
+            conditions.append("format = ?")
+            parameters.append(format.name)
+        if minWidth is not None:
+            conditions.append("width >= ?")
+            parameters.append(minWidth)
+        if minHeight is not None:
+            conditions.append("height >= ?")
+            parameters.append(minHeight)
+        if glyph is not None:
+            conditions.append("EXISTS (SELECT 1 FROM glyphs WHERE glyphs.fileId = files.id AND glyph = ?)")
+            parameters.append(glyph)
+        if payloadHash is not None:
+            conditions.append("payloadHash = ?")
+            parameters.append(payloadHash)
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection.execute(f"SELECT {_FILE_COLUMNS} FROM files{where} ORDER BY path", parameters)
+        return [_indexedAei(row) for row in rows]
+
+
+    def get(self, path: Union[str, PathLike[Any]]) -> Optional[IndexedAei]:
+        """Get the indexed metadata of a single AEI file.
+
+        :param path: The path to the file
+        :type path: Union[str, PathLike]
+        :return: The indexed metadata, or `None` if the file is not indexed
+        :rtype: Optional[IndexedAei]
+        """
+        row = self._connection.execute(f"SELECT {_FILE_COLUMNS} FROM files WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        return None if row is None else _indexedAei(row)
+
+
+    def textures(self, path: Union[str, PathLike[Any]]) -> List[Texture]:
+        """Get the texture bounding boxes of an indexed AEI file, in file order.
+
+        :param path: The path to the file
+        :type path: Union[str, PathLike]
+        :return: The textures of the AEI, or an empty list if the file is not indexed
+        :rtype: List[Texture]
+        """
+        rows = self._connection.execute(
+            "SELECT x, y, textures.width, textures.height FROM textures JOIN files ON files.id = textures.fileId WHERE path = ? ORDER BY textures.rowid",
+            (os.path.abspath(path),)
+        )
+        return [Texture(*row) for row in rows]
+
+
+    def fonts(self, path: Union[str, PathLike[Any]]) -> List[Dict[str, Texture]]:
+        """Get the symbol maps of an indexed AEI file, in file order.
+
+        :param path: The path to the file
+        :type path: Union[str, PathLike]
+        :return: The symbol maps of the AEI, or an empty list if the file is not indexed
+        :rtype: List[Dict[str, Texture]]
+        """
+        rows = self._connection.execute(
+            "SELECT font, glyph, x, y, glyphs.width, glyphs.height FROM glyphs JOIN files ON files.id = glyphs.fileId WHERE path = ? ORDER BY glyphs.rowid",
+            (os.path.abspath(path),)
+        )
+        fonts: List[Dict[str, Texture]] = []
+        for font, glyph, *box in rows:
+            while len(fonts) <= font:
+                fonts.append({})
+            fonts[font][glyph] = Texture(*box)
+        return fonts
+
+
+    def _knownFiles(self, root: str, recursive: bool) -> Dict[str, Tuple[int, int]]:
+        prefix = os.path.join(root, "")
+        rows = self._connection.execute("SELECT path, mtimeNs, size FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+        return {
+            path: (mtimeNs, size) for path, mtimeNs, size in rows
+            if recursive or os.path.dirname(path) == root
+        }
+
+
+    def _insert(self, path: str, stat: Tuple[int, int], metadata: AeiMetadata, payloadHash: str):
+        self._connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        cursor = self._connection.execute(
+            f"INSERT INTO files ({_FILE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, metadata.format.name, metadata.mipmapped, metadata.width, metadata.height, metadata.quality, payloadHash, *stat)
+        )
+        fileId = cursor.lastrowid
+        self._connection.executemany(
+            "INSERT INTO textures VALUES (?, ?, ?, ?, ?)",
+            ((fileId, t.x, t.y, t.width, t.height) for t in metadata.textures)
+        )
+        self._connection.executemany(
+            "INSERT INTO glyphs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((fileId, font, glyph, t.x, t.y, t.width, t.height) for font, symbols in enumerate(metadata.fonts) for glyph, t in symbols.items())
+        )
+
+
+    def close(self):
+        """Close the database connection.
+        """
+        self._connection.close()
+
+
+    def __enter__(self):
+        """This method is called when entering a `with` statement.
+        """
+        return self
+
+
+    def __exit__(self, exceptionType: Type[TException], exception: TException, trace: TracebackType):
+        """This method is called when exiting a `with` statement.
+        """
+        self.close()
+
+
+def _findAeis(directory: str, recursive: bool) -> Iterator[Tuple[str, Tuple[int, int]]]:
+    # scandir provides the stat of each entry without a separate call per file on most platforms
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if recursive:
+                    yield from _findAeis(entry.path, recursive)
+            elif entry.name.lower().endswith(AEI_EXTENSION):
+                stat = entry.stat()
+                yield entry.path, (stat.st_mtime_ns, stat.st_size)
+
+
+def _readIndexable(path: str) -> Union[Tuple[AeiMetadata, str], AeiReadException]:
+    payloadHash = hashlib.blake2b(digest_size=16)
+    try:
+        metadata = CompressedAEI.readMetadata(path, payloadHash.update)
+    except AeiReadException as ex:
+        return ex
+    return metadata, payloadHash.hexdigest()
+
+
+def _indexedAei(row: Tuple[Any, ...]) -> IndexedAei:
+    path, format, mipmapped, width, height, quality, payloadHash, mtimeNs, size = row
+    return IndexedAei(path, CompressionFormat[format], bool(mipmapped), width, height, cast(Optional[CompressionQuality], quality), payloadHash, mtimeNs, size)
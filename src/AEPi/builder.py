@@ -0,0 +1,475 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from os import PathLike
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+from PIL import Image
+
+from .constants import CompressionFormat, CompressionQuality
+from .image import CompressedAEI, Texture
+from .lib import imageOps
+from .streaming import STRIPE_FORMATS
+from . import codec
+
+# The number of seconds between checks for changed sources in `AtlasBuilder.watch`
+POLL_INTERVAL = 0.25
+
+# A rectangle of pixels, as (left, top, right, bottom)
+_Rect = Tuple[int, int, int, int]
+
+
+class SpriteSource(NamedTuple):
+    """An image file placed into an atlas by `AtlasBuilder`. The size of the sprite is the size of the image.
+    """
+    # The path to the image file
+    source: str
+    x: int
+    y: int
+
+
+class AtlasTarget(NamedTuple):
+    """An AEI built by `AtlasBuilder` from sprite images.
+    Sprites are copied onto a transparent canvas in order, so later sprites cover earlier ones where they overlap.
+    Each sprite becomes a texture of the AEI, in the same order.
+    """
+    # The path that the AEI is written to
+    output: str
+    width: int
+    height: int
+    format: CompressionFormat
+    sprites: Tuple[SpriteSource, ...]
+    quality: Optional[CompressionQuality] = None
+    mipmapped: bool = False
+    # The symbol maps of the AEI, as glyph bounding boxes of (x, y, width, height)
+    fonts: Tuple[Dict[str, Tuple[int, int, int, int]], ...] = ()
+
+
+class BuildEvent(NamedTuple):
+    """An AEI written by `AtlasBuilder`.
+    """
+    target: AtlasTarget
+    # The indices of the sprites which changed. Every sprite, for a full build
+    changedSprites: Tuple[int, ...]
+    # Whether the whole AEI was encoded, rather than only the changed regions
+    fullBuild: bool
+    # The number of pixels encoded, across all mip levels
+    encodedPixels: int
+    seconds: float
+
+
+def loadManifest(path: Union[str, PathLike[Any]]) -> List[AtlasTarget]:
+    """Read a JSON build manifest. Paths in the manifest are relative to the directory containing it.
+
+    ```json
+    {
+        "targets": [{
+            "output": "build/ui.aei",
+            "width": 1024, "height": 512,
+            "format": "DXT5", "quality": 2, "mipmapped": false,
+            "sprites": [{"source": "ui/button.png", "x": 0, "y": 0}],
+            "fonts": [{"a": [512, 0, 16, 24]}]
+        }]
+    }
+    ```
+
+    :param path: The path to the manifest
+    :type path: Union[str, PathLike]
+    :raises ValueError: If the manifest is not valid
+    :return: The targets described by the manifest
+    :rtype: List[AtlasTarget]
+    """
+    root = os.path.dirname(os.path.abspath(path))
+    with open(path, "rb") as file:
+        manifest = json.load(file)
+
+    try:
+        return [
+            AtlasTarget(
+                os.path.join(root, target["output"]),
+                int(target["width"]),
+                int(target["height"]),
+                CompressionFormat[target["format"]],
+                tuple(SpriteSource(os.path.join(root, s["source"]), int(s["x"]), int(s["y"])) for s in target["sprites"]),
+                target.get("quality"),
+                bool(target.get("mipmapped", False)),
+                tuple({glyph: tuple(int(v) for v in box) for glyph, box in font.items()} for font in target.get("fonts", [])) # type: ignore[reportArgumentType]
+            )
+            for target in manifest["targets"]
+        ]
+    except (KeyError, TypeError, AttributeError) as ex:
+        raise ValueError(f"Invalid build manifest {path}: {ex!r}") from ex
+
+
+class _AtlasState:
+    def __init__(self, target: AtlasTarget) -> None:
+        self.target = target
+        # Each mip level of the atlas, and its compressed image content
+        self.levels: List[npt.NDArray[np.uint8]] = []
+        self.payloads: List[bytearray] = []
+        self.sprites: List[npt.NDArray[np.uint8]] = []
+
+
+    def rect(self, index: int) -> _Rect:
+        sprite, pixels = self.target.sprites[index], self.sprites[index]
+        return sprite.x, sprite.y, sprite.x + pixels.shape[1], sprite.y + pixels.shape[0]
+
+
+    def compose(self, rect: _Rect):
+        # Redraw every sprite overlapping `rect` onto the cleared region, in order
+        left, top, right, bottom = rect
+        canvas = self.levels[0]
+        canvas[top:bottom, left:right] = 0
+        for i, pixels in enumerate(self.sprites):
+            x0, y0, x1, y1 = self.rect(i)
+            l, t, r, b = max(left, x0), max(top, y0), min(right, x1), min(bottom, y1)
+            if l < r and t < b:
+                canvas[t:b, l:r] = pixels[t - y0 : b - y0, l - x0 : r - x0]
+
+
+    def compressed(self) -> CompressedAEI:
+        target = self.target
+        textures = [Texture(*self._box(i)) for i in range(len(self.sprites))]
+        fonts = [{glyph: Texture(*box) for glyph, box in font.items()} for font in target.fonts]
+        if len(textures) == 0 and len(fonts) == 0:
+            textures.append(Texture(0, 0, target.width, target.height))
+        return CompressedAEI(target.format, target.width, target.height, self.payloads, textures, fonts, target.quality, target.mipmapped) # type: ignore[reportArgumentType]
+
+
+    def _box(self, index: int) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = self.rect(index)
+        return left, top, right - left, bottom - top
+
+
+class AtlasBuilder:
+    """Build AEIs from sprite images, and keep them up to date as the images change.
+
+    Only the AEIs containing a changed image are rebuilt. Within each, only the compression blocks covered by the changed sprites are encoded again,
+    in every mip level, and spliced into the stored image content. Changing one sprite in a large atlas therefore costs about as much as encoding the sprite.
+    Mip chains are generated with the box filter, and the output is identical to compressing the whole atlas with `AEI.write`.
+
+    ```py
+    builder = AtlasBuilder.fromManifest("assets/manifest.json")
+    builder.watch(onBuild=lambda event: print(event.target.output, f"{event.seconds:.3f}s"))
+    ```
+
+    :param targets: The AEIs to build
+    :type targets: Iterable[AtlasTarget]
+    :param workers: The number of AEIs to build at once. defaults to the `ThreadPoolExecutor` default
+    :type workers: Optional[int], optional
+    """
+    def __init__(self, targets: Iterable[AtlasTarget], workers: Optional[int] = None) -> None:
+        self.targets = list(targets)
+        self.workers = workers
+        # The path to the manifest that `targets` were loaded from, which is reloaded by `watch` when it changes
+        self.manifestPath: Optional[str] = None
+        self._states: Dict[str, _AtlasState] = {}
+        # The (modification time, size) of each source image when it was last read
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+
+
+    @classmethod
+    def fromManifest(cls, path: Union[str, PathLike[Any]], workers: Optional[int] = None) -> "AtlasBuilder":
+        """Create a builder for the targets in a manifest read by `loadManifest`. `watch` reloads the manifest when it changes.
+
+        :param path: The path to the manifest
+        :type path: Union[str, PathLike]
+        :param workers: The number of AEIs to build at once. defaults to the `ThreadPoolExecutor` default
+        :type workers: Optional[int], optional
+        :raises ValueError: If the manifest is not valid
+        :return: A new builder, which has not yet built anything
+        :rtype: AtlasBuilder
+        """
+        builder = cls(loadManifest(path), workers)
+        builder.manifestPath = os.fspath(path) # type: ignore[reportAttributeAccessIssue]
+        return builder
+
+
+    def build(self) -> List[BuildEvent]:
+        """Build every target in full, and write it.
+
+        :raises ValueError: If a target's format can't be encoded a region at a time, or a sprite falls outside of its target
+        :raises AeiWriteException: If compression or writing fails
+        :return: An event for every target
+        :rtype: List[BuildEvent]
+        """
+        self._states.clear()
+        return self._buildFull(self.targets)
+
+
+    def setTargets(self, targets: Iterable[AtlasTarget]) -> List[BuildEvent]:
+        """Replace the targets of the builder. Targets which are new or have changed are built in full. Other targets are kept as they are.
+        The outputs of removed targets are not deleted.
+
+        :param targets: The AEIs to build
+        :type targets: Iterable[AtlasTarget]
+        :raises ValueError: If a target's format can't be encoded a region at a time, or a sprite falls outside of its target
+        :raises AeiWriteException: If compression or writing fails
+        :return: An event for every target which was built
+        :rtype: List[BuildEvent]
+        """
+        self.targets = list(targets)
+        outputs = {target.output for target in self.targets}
+        for output in [o for o in self._states if o not in outputs]:
+            del self._states[output]
+
+        changed = [t for t in self.targets if t.output not in self._states or self._states[t.output].target != t]
+        return self._buildFull(changed)
+
+
+    def changedSources(self) -> Set[str]:
+        """Find the source images which have been modified since they were last read, by their modification time and size.
+        Missing images are ignored, as they may be partway through being saved.
+
+        :return: The paths of the changed images
+        :rtype: Set[str]
+        """
+        changed: Set[str] = set()
+        for path in {sprite.source for target in self.targets for sprite in target.sprites}:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if self._signatures.get(path) != (stat.st_mtime_ns, stat.st_size):
+                changed.add(path)
+        return changed
+
+
+    def rebuild(self, changed: Optional[Iterable[str]] = None, onError: Optional[Callable[[str, Exception], None]] = None) -> List[BuildEvent]:
+        """Update the targets which use changed source images, encoding only the changed regions of each.
+        Targets which have not been built yet are built in full.
+
+        :param changed: The paths of the changed images. defaults to `changedSources()`
+        :type changed: Optional[Iterable[str]], optional
+        :param onError: Called with the path and exception of each image which can't be read, which is then skipped until it next changes.
+        If not given, the first such exception is raised before anything is rebuilt. defaults to None
+        :type onError: Optional[Callable[[str, Exception], None]], optional
+        :raises ValueError: If a changed sprite falls outside of its target
+        :raises AeiWriteException: If compression or writing fails
+        :return: An event for every target which was written
+        :rtype: List[BuildEvent]
+        """
+        paths = self.changedSources() if changed is None else {os.fspath(p) for p in changed}
+        loaded: Dict[str, npt.NDArray[np.uint8]] = {}
+        for path in paths:
+            try:
+                loaded[path] = self._load(path)
+            except Exception as ex:
+                if onError is None:
+                    raise
+                onError(path, ex)
+
+        unbuilt = [t for t in self.targets if t.output not in self._states]
+        try:
+            events = self._buildFull(unbuilt, loaded)
+            affected = [
+                self._states[t.output] for t in self.targets
+                if t not in unbuilt and any(sprite.source in loaded for sprite in t.sprites)
+            ]
+            updated = self._map(lambda state: self._update(state, loaded), affected)
+        except:
+            # The images are read again by the next rebuild, as some targets may not have been updated with them
+            for path in loaded:
+                self._signatures.pop(path, None)
+            raise
+        return events + [event for event in updated if event is not None]
+
+
+    def watch(
+            self,
+            interval: float = POLL_INTERVAL,
+            stop: Optional[threading.Event] = None,
+            onBuild: Optional[Callable[[BuildEvent], None]] = None,
+            onError: Optional[Callable[[str, Exception], None]] = None
+        ):
+        """Build every target which has not been built, then poll the source images and manifest for changes, and rebuild what they affect, until `stop` is set.
+
+        :param interval: The number of seconds between polls. defaults to `POLL_INTERVAL`
+        :type interval: float, optional
+        :param stop: An event which ends watching when set. defaults to watching forever
+        :type stop: Optional[threading.Event], optional
+        :param onBuild: Called with each target written. defaults to None
+        :type onBuild: Optional[Callable[[BuildEvent], None]], optional
+        :param onError: Called with the path and exception of each image, manifest or target which fails to build, after which watching continues.
+        If not given, exceptions are raised, ending watching. defaults to None
+        :type onError: Optional[Callable[[str, Exception], None]], optional
+        """
+        stop = threading.Event() if stop is None else stop
+        manifestSignature = self._manifestSignature()
+        while True:
+            events: List[BuildEvent] = []
+            try:
+                signature = self._manifestSignature()
+                if signature != manifestSignature and self.manifestPath is not None:
+                    manifestSignature = signature
+                    events += self.setTargets(loadManifest(self.manifestPath))
+                events += self.rebuild(onError=onError)
+            except Exception as ex:
+                if onError is None:
+                    raise
+                onError(self.manifestPath or "", ex)
+
+            for event in events:
+                if onBuild is not None:
+                    onBuild(event)
+
+            if stop.wait(interval):
+                return
+
+
+    def _manifestSignature(self) -> Optional[Tuple[int, int]]:
+        if self.manifestPath is None:
+            return None
+        try:
+            stat = os.stat(self.manifestPath)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+    def _load(self, path: str) -> npt.NDArray[np.uint8]:
+        # The signature is taken first, so that a change made while reading is picked up by the next poll.
+        # It is recorded even if the image can't be read, so that an unreadable image is not retried until it changes again
+        stat = os.stat(path)
+        self._signatures[path] = (stat.st_mtime_ns, stat.st_size)
+        with Image.open(path) as image:
+            return np.asarray(image.convert("RGBA"))
+
+
+    def _map(self, function: Callable[[_AtlasState], Optional[BuildEvent]], states: List[_AtlasState]) -> List[Optional[BuildEvent]]:
+        # Workers run in a copy of this context, so that instrumentation is collected from them
+        contexts = [copy_context() for _ in states]
+        with ThreadPoolExecutor(self.workers) as executor:
+            return list(executor.map(lambda context, state: context.run(function, state), contexts, states))
+
+
+    def _buildFull(self, targets: List[AtlasTarget], loaded: Optional[Dict[str, npt.NDArray[np.uint8]]] = None) -> List[BuildEvent]:
+        for target in targets:
+            if target.format not in STRIPE_FORMATS:
+                raise ValueError(f"Compression format {target.format.name} can't be encoded a region at a time")
+            if target.mipmapped and not target.format.supportsMipmapping:
+                raise ValueError(f"Compression format {target.format.name} does not support mipmapping")
+
+        loaded = dict(loaded or {})
+        for sprite in (sprite for target in targets for sprite in target.sprites):
+            if sprite.source not in loaded:
+                loaded[sprite.source] = self._load(sprite.source)
+        events = self._map(lambda state: self._buildState(state, loaded), [_AtlasState(target) for target in targets])
+        return [event for event in events if event is not None]
+
+
+    def _buildState(self, state: _AtlasState, loaded: Dict[str, npt.NDArray[np.uint8]]) -> BuildEvent:
+        start = time.perf_counter()
+        target = state.target
+        state.sprites = [loaded[sprite.source] for sprite in target.sprites]
+        for i, pixels in enumerate(state.sprites):
+            _checkInside(target, i, pixels)
+
+        state.levels = [np.zeros((target.height, target.width, 4), dtype=np.uint8)]
+        state.compose((0, 0, target.width, target.height))
+        if target.mipmapped:
+            for _ in imageOps.mipmapShapes(target.width, target.height)[1:]:
+                state.levels.append(imageOps.downsample(state.levels[-1]))
+
+        state.payloads = [bytearray(_encode(level, target)) for level in state.levels]
+        _write(state)
+        self._states[target.output] = state
+
+        encoded = sum(level.shape[0] * level.shape[1] for level in state.levels)
+        return BuildEvent(target, tuple(range(len(target.sprites))), True, encoded, time.perf_counter() - start)
+
+
+    def _update(self, state: _AtlasState, loaded: Dict[str, npt.NDArray[np.uint8]]) -> Optional[BuildEvent]:
+        start = time.perf_counter()
+        target = state.target
+        changed: List[int] = []
+        for i, sprite in enumerate(target.sprites):
+            pixels = loaded.get(sprite.source)
+            if pixels is not None and not np.array_equal(pixels, state.sprites[i]):
+                changed.append(i)
+
+        # Every changed sprite is checked before any is stored, so that a failed update leaves the state matching the output
+        for i in changed:
+            _checkInside(target, i, loaded[target.sprites[i].source])
+
+        dirty: List[_Rect] = []
+        for i in changed:
+            # Both where the sprite was, and where it now is, need redrawing
+            dirty.append(state.rect(i))
+            state.sprites[i] = loaded[target.sprites[i].source]
+            dirty.append(state.rect(i))
+
+        if not dirty:
+            return None
+
+        encoded = 0
+        for rect in dirty:
+            state.compose(rect)
+            for level in range(len(state.levels)):
+                if level > 0:
+                    rect = _downsampleRect(state.levels, level, rect)
+                encoded += _encodeRect(state, level, rect)
+
+        _write(state)
+        return BuildEvent(target, tuple(changed), False, encoded, time.perf_counter() - start)
+
+
+def _checkInside(target: AtlasTarget, index: int, pixels: npt.NDArray[np.uint8]):
+    sprite = target.sprites[index]
+    right, bottom = sprite.x + pixels.shape[1], sprite.y + pixels.shape[0]
+    if sprite.x < 0 or sprite.y < 0 or right > target.width or bottom > target.height:
+        raise ValueError(f"Sprite {sprite.source} at ({sprite.x}, {sprite.y}, {right}, {bottom}) falls outside of {target.output}")
+
+
+def _encode(pixels: npt.NDArray[np.uint8], target: AtlasTarget) -> bytes:
+    image = imageOps.imageFromArray(np.ascontiguousarray(pixels))
+    try:
+        return codec.encodeImage(image, target.format, target.quality)
+    finally:
+        image.close()
+
+
+def _downsampleRect(levels: List[npt.NDArray[np.uint8]], level: int, rect: _Rect) -> _Rect:
+    # Regenerate the region of `level` covering `rect` of the level above it. An axis of length 1 is not halved
+    above, below = levels[level - 1], levels[level]
+    left, top, right, bottom = rect
+    height, width = below.shape[:2]
+    left, right = (left // 2, min(width, -(-right // 2))) if above.shape[1] > 1 else (0, 1)
+    top, bottom = (top // 2, min(height, -(-bottom // 2))) if above.shape[0] > 1 else (0, 1)
+
+    sourceX = slice(2 * left, 2 * right) if above.shape[1] > 1 else slice(0, 1)
+    sourceY = slice(2 * top, 2 * bottom) if above.shape[0] > 1 else slice(0, 1)
+    below[top:bottom, left:right] = imageOps.downsample(above[sourceY, sourceX])
+    return left, top, right, bottom
+
+
+def _encodeRect(state: _AtlasState, level: int, rect: _Rect) -> int:
+    # Encode the whole blocks covering `rect`, and splice them into the image content of the level
+    format = state.target.format
+    pixels = state.levels[level]
+    height, width = pixels.shape[:2]
+    blockWidth, blockHeight = format.blockShape
+    left, top, right, bottom = rect
+    left, top = left // blockWidth * blockWidth, top // blockHeight * blockHeight
+    right, bottom = min(width, -(-right // blockWidth) * blockWidth), min(height, -(-bottom // blockHeight) * blockHeight)
+    if left >= right or top >= bottom:
+        return 0
+
+    blockBytes = blockWidth * blockHeight * format.bitcount // 8
+    gridShape = (-(-height // blockHeight), -(-width // blockWidth), blockBytes)
+    blocks = np.frombuffer(state.payloads[level], dtype=np.uint8).reshape(gridShape)
+    region = np.frombuffer(_encode(pixels[top:bottom, left:right], state.target), dtype=np.uint8)
+    blocks[top // blockHeight : -(-bottom // blockHeight), left // blockWidth : -(-right // blockWidth)] = region.reshape(-1, -(-(right - left) // blockWidth), blockBytes)
+    return (right - left) * (bottom - top)
+
+
+def _write(state: _AtlasState):
+    directory = os.path.dirname(state.target.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    state.compressed().write(state.target.output)
@@ -1,9 +1,11 @@
 from abc import ABC
-from typing import Dict, Optional, Type, TypeVar, Iterable
+from typing import Dict, List, Optional, Tuple, Type, TypeVar, Iterable
 from PIL.Image import Image
 
 from .constants import CompressionFormat, CompressionQuality
 from .exceptions import UnsupportedCompressionFormatException
+from .lib import imageOps
+from .instrumentation import phase
 
 class ImageCodecAdaptor(ABC):
     @classmethod
@@ -34,7 +36,7 @@ class ImageCodecAdaptor(ABC):
         :type width: int
         :param height: The height of the image
         :type height: int
-        :return: `fp`, decompressed into a RGB(A) image
+        :return: `fp`, decompressed into a new RGB(A) image. The caller takes ownership of the image
         :rtype: Image
         """
         raise NotImplementedError(f"Codec {cls.__name__} is not capable of decompression")
@@ -118,3 +120,137 @@ def decompressorFor(format: CompressionFormat) -> Type[ImageCodecAdaptor]:
     if format not in decompressors:
         raise UnsupportedCompressionFormatException(format)
     return decompressors[format]
+
+
+def encodeImage(im: Image, format: CompressionFormat, quality: Optional[CompressionQuality]) -> bytes:
+    """Compress an RGB(A) image into format `format` with the registered compressor.
+    Channel order, pillow mode and block padding are converted as required by `format`. `im` is not altered.
+
+    :param im: The image to compress
+    :type im: Image
+    :param format: The compression format
+    :type format: CompressionFormat
+    :param quality: The compression quality
+    :type quality: Optional[CompressionQuality]
+    :return: `im`, compressed into format `format`
+    :rtype: bytes
+    :raises UnsupportedCompressionFormatException: If no compatible codec is loaded
+    """
+    compressorFor(format)
+    prepared = prepareImage(im, format)
+    try:
+        return encodePrepared(prepared, format, quality)
+    finally:
+        if prepared is not im:
+            prepared.close()
+
+
+def pixelLayout(format: CompressionFormat) -> Tuple[bool, str, Optional[Tuple[int, int]]]:
+    """The pixel layout that `prepareImage` converts images into for `format`.
+    Formats with equal layouts can share the result of `prepareImage`.
+
+    :param format: The compression format
+    :type format: CompressionFormat
+    :return: Whether channels are BGRA, the pillow mode, and the block shape that images are padded to, if any
+    :rtype: Tuple[bool, str, Optional[Tuple[int, int]]]
+    """
+    return (format.isBgra, format.pillowMode, format.blockShape if format.isCompressed else None)
+
+
+def prepareImage(im: Image, format: CompressionFormat) -> Image:
+    """Convert the channel order, pillow mode and block padding of an RGB(A) image as required by `format`, ready for `encodePrepared`.
+    `im` is not altered.
+
+    :param im: The image to convert
+    :type im: Image
+    :param format: The compression format
+    :type format: CompressionFormat
+    :return: `im` if no conversion was required, otherwise a new image, which the caller must close
+    :rtype: Image
+    """
+    converted: List[Image] = []
+    try:
+        if format.isBgra:
+            with phase("swap", _imageBytes(im)):
+                im = imageOps.switchRGBA_BGRA(im)
+                converted.append(im)
+
+        if im.mode != format.pillowMode:
+            with phase("convert", _imageBytes(im)):
+                im = im.convert(format.pillowMode)
+                converted.append(im)
+
+        if format.isCompressed:
+            with phase("pad") as timing:
+                padded = imageOps.padToMultiple(im, format.blockShape)
+                if padded is not im:
+                    im = padded
+                    converted.append(im)
+                    if timing is not None:
+                        timing.bytes = _imageBytes(im)
+
+    except:
+        for intermediate in converted:
+            intermediate.close()
+        raise
+
+    # Only the final image is handed to the caller
+    for intermediate in converted[:-1]:
+        intermediate.close()
+    return im
+
+
+def encodePrepared(im: Image, format: CompressionFormat, quality: Optional[CompressionQuality]) -> bytes:
+    """Compress an image already converted by `prepareImage` into format `format` with the registered compressor.
+
+    :param im: The converted image to compress
+    :type im: Image
+    :param format: The compression format
+    :type format: CompressionFormat
+    :param quality: The compression quality
+    :type quality: Optional[CompressionQuality]
+    :return: `im`, compressed into format `format`
+    :rtype: bytes
+    :raises UnsupportedCompressionFormatException: If no compatible codec is loaded
+    """
+    imageCodec = compressorFor(format)
+    with phase("compress", _imageBytes(im)):
+        return imageCodec.compress(im, format, quality)
+
+
+def decodeImage(fp: bytes, format: CompressionFormat, width: int, height: int, quality: Optional[CompressionQuality]) -> Image:
+    """Decompress a `format`-compressed image with the registered decompressor.
+    Channel order and pillow mode are converted as required by `format`.
+
+    :param fp: The compressed image to decompress
+    :type fp: bytes
+    :param format: The compression format
+    :type format: CompressionFormat
+    :param width: The width of the image
+    :type width: int
+    :param height: The height of the image
+    :type height: int
+    :param quality: The compression quality
+    :type quality: Optional[CompressionQuality]
+    :return: `fp`, decompressed into a new image of mode `format.pillowMode`
+    :rtype: Image
+    :raises UnsupportedCompressionFormatException: If no compatible codec is loaded
+    """
+    imageCodec = decompressorFor(format)
+    with phase("decompress", len(fp)):
+        im = imageCodec.decompress(fp, format, width, height, quality)
+
+    if format.isBgra:
+        with im, phase("swap", _imageBytes(im)):
+            im = imageOps.switchRGBA_BGRA(im)
+
+    if im.mode != format.pillowMode:
+        with im, phase("convert", _imageBytes(im)):
+            im = im.convert(format.pillowMode)
+
+    return im
+
+
+def _imageBytes(im: Image) -> int:
+    # The size of an image's pixel data, assuming 8 bits per band
+    return im.width * im.height * len(im.getbands())
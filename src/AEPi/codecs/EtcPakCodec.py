@@ -14,6 +14,7 @@ except ImportError as e:
 
 
 @supportsFormats(compresses=[
+    CompressionFormat.DXT1,
     CompressionFormat.DXT5,
     CompressionFormat.ETC1,
     CompressionFormat.ETC2
@@ -23,7 +24,10 @@ class EtcPakCodec(ImageCodecAdaptor):
     def compress(cls, im: Image, format: CompressionFormat, quality: Optional[CompressionQuality]) -> bytes:
         imageIn, ctx = cls._ensureRgba(im)
         with ctx:
-            if format is CompressionFormat.DXT5:
+            if format is CompressionFormat.DXT1:
+                return etcpak.compress_to_dxt1(imageIn.tobytes(), imageIn.width, imageIn.height) # type: ignore[reportUnknownVariableType]
+
+            elif format is CompressionFormat.DXT5:
                 return etcpak.compress_to_dxt5(imageIn.tobytes(), imageIn.width, imageIn.height) # type: ignore[reportUnknownVariableType]
 
             elif format is CompressionFormat.ETC1:
@@ -31,7 +31,8 @@ class Tex2ImgCodec(ImageCodecAdaptor):
         if format not in TEX2IMG_FORMAT_MAP:
             raise ValueError(f"Codec {Tex2ImgCodec.__name__} does not support format {format.name}")
         
-        decompressed = tex2img.basisu_decompress(fp, width, height, TEX2IMG_FORMAT_MAP[format]) # type: ignore[reportUnknownMemberType]
+        # tex2img only accepts bytes, not views such as those from CompressedAEI.fromBuffer. bytes are passed through without copying
+        decompressed = tex2img.basisu_decompress(bytes(fp), width, height, TEX2IMG_FORMAT_MAP[format]) # type: ignore[reportUnknownMemberType]
         im = Image.frombytes("RGBA", (width, height), decompressed, "raw") # type: ignore[reportUnknownMemberType]
         
         if format in SWAP_CHANNELS_POST:
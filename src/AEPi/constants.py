@@ -5,6 +5,7 @@ from . import exceptions
 
 FORMAT_PILLOW_MODES: Dict["CompressionFormat", str] = {}
 FORMAT_BITCOUNTS: Dict["CompressionFormat", int] = {}
+FORMAT_BLOCK_SHAPES: Dict["CompressionFormat", Tuple[int, int]] = {}
 BGR_FORMATS: Set["CompressionFormat"] = set()
 MIPMAPPABLE_FORMATS: Set["CompressionFormat"] = set()
 MASK_MIPMAPPED_FLAG = 0b00000010
@@ -64,6 +65,39 @@ class CompressionFormat(Enum):
         return FORMAT_BITCOUNTS[self]
     
     
+    @property
+    def blockShape(self) -> Tuple[int, int]:
+        """The (width, height) in pixels of the blocks which this format compresses.
+        Images are padded to a multiple of this shape before compression.
+        """
+        return FORMAT_BLOCK_SHAPES.get(self, (1, 1))
+
+
+    def imageLength(self, width: int, height: int) -> int:
+        """The exact length in bytes of an image of the given dimensions, compressed in this format.
+        Compressed images are padded to a whole number of blocks.
+
+        :param width: The width of the image
+        :type width: int
+        :param height: The height of the image
+        :type height: int
+        :return: The length of the compressed image content
+        :rtype: int
+        :raises ValueError: If the bit count of this format is unknown
+        """
+        if self not in FORMAT_BITCOUNTS:
+            raise ValueError(f"The bit count of format {self.name} is unknown")
+        
+        blockWidth, blockHeight = self.blockShape
+        blocksX = -(-width // blockWidth)
+        blocksY = -(-height // blockHeight)
+        if self in (CompressionFormat.PVRTC12A, CompressionFormat.PVRTC14A):
+            # PVRTC images are at least 2x2 blocks
+            blocksX, blocksY = max(2, blocksX), max(2, blocksY)
+
+        return blocksX * blocksY * blockWidth * blockHeight * self.bitcount // 8
+
+
     @property
     def supportsMipmapping(self):
         # This will need some more testing to validate
@@ -88,18 +122,30 @@ FORMAT_PILLOW_MODES[CompressionFormat.DXT5] = "RGBA"
 FORMAT_PILLOW_MODES[CompressionFormat.ETC1] = "RGB"
 FORMAT_PILLOW_MODES[CompressionFormat.ETC2] = "RGB"
 
-FORMAT_BITCOUNTS[CompressionFormat.Uncompressed] = 8 # ?
-FORMAT_BITCOUNTS[CompressionFormat.Uncompressed_UI] = 8 # ?
-FORMAT_BITCOUNTS[CompressionFormat.Uncompressed_CubeMap_PC] = 8 # ?
-FORMAT_BITCOUNTS[CompressionFormat.Uncompressed_CubeMap] = 8 # ?
+# Uncompressed AEIs store 8 bits per RGBA channel
+FORMAT_BITCOUNTS[CompressionFormat.Uncompressed] = 32
+FORMAT_BITCOUNTS[CompressionFormat.Uncompressed_UI] = 32
+FORMAT_BITCOUNTS[CompressionFormat.Uncompressed_CubeMap_PC] = 32
+FORMAT_BITCOUNTS[CompressionFormat.Uncompressed_CubeMap] = 32
 FORMAT_BITCOUNTS[CompressionFormat.PVRTC12A] = 2
 FORMAT_BITCOUNTS[CompressionFormat.PVRTC14A] = 4
-FORMAT_BITCOUNTS[CompressionFormat.ATC] = 4
+# ATC in AEIs is ATC RGBA with interpolated alpha
+FORMAT_BITCOUNTS[CompressionFormat.ATC] = 8
 FORMAT_BITCOUNTS[CompressionFormat.DXT1] = 4
 FORMAT_BITCOUNTS[CompressionFormat.DXT3] = 8
 FORMAT_BITCOUNTS[CompressionFormat.DXT5] = 8
 FORMAT_BITCOUNTS[CompressionFormat.ETC1] = 4
-FORMAT_BITCOUNTS[CompressionFormat.ETC2] = 8 # ?
+# ETC2 RGB, which is backwards compatible with ETC1
+FORMAT_BITCOUNTS[CompressionFormat.ETC2] = 4
+
+FORMAT_BLOCK_SHAPES[CompressionFormat.PVRTC12A] = (8, 4)
+FORMAT_BLOCK_SHAPES[CompressionFormat.PVRTC14A] = (4, 4)
+FORMAT_BLOCK_SHAPES[CompressionFormat.ATC] = (4, 4)
+FORMAT_BLOCK_SHAPES[CompressionFormat.DXT1] = (4, 4)
+FORMAT_BLOCK_SHAPES[CompressionFormat.DXT3] = (4, 4)
+FORMAT_BLOCK_SHAPES[CompressionFormat.DXT5] = (4, 4)
+FORMAT_BLOCK_SHAPES[CompressionFormat.ETC1] = (4, 4)
+FORMAT_BLOCK_SHAPES[CompressionFormat.ETC2] = (4, 4)
 
 BGR_FORMATS.add(CompressionFormat.ETC1)
 BGR_FORMATS.add(CompressionFormat.ETC2)
@@ -0,0 +1,4 @@
+from .dds import readDds, writeDds
+from .ktx import readKtx, writeKtx
+
+__all__ = ["readDds", "writeDds", "readKtx", "writeKtx"]
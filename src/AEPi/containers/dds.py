@@ -0,0 +1,124 @@
+import io
+import struct
+from os import PathLike
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from ..constants import CompressionFormat, CompressionQuality
+from ..exceptions import AeiReadException, AeiWriteException, UnsupportedAeiFeatureException, UnsupportedCompressionFormatException
+from ..image.compressedAEI import CompressedAEI
+from ..image.texture import Texture
+from ..lib import imageOps
+
+DDS_MAGIC = b"DDS "
+
+DDSD_CAPS = 0x1
+DDSD_HEIGHT = 0x2
+DDSD_WIDTH = 0x4
+DDSD_PIXELFORMAT = 0x1000
+DDSD_MIPMAPCOUNT = 0x20000
+DDSD_LINEARSIZE = 0x80000
+DDPF_FOURCC = 0x4
+DDSCAPS_COMPLEX = 0x8
+DDSCAPS_TEXTURE = 0x1000
+DDSCAPS_MIPMAP = 0x400000
+
+# magic, then DDS_HEADER: size, flags, height, width, linear size, depth, mip count, 11 reserved,
+# DDS_PIXELFORMAT: size, flags, fourCC, bit count, 4 masks, then caps 1-4 and a reserved field
+_HEADER = struct.Struct("<4s7I44x2I4s5I4I4x")
+
+DDS_FOURCCS: Dict[CompressionFormat, bytes] = {
+    CompressionFormat.DXT1: b"DXT1",
+    CompressionFormat.DXT3: b"DXT3",
+    CompressionFormat.DXT5: b"DXT5"
+}
+
+
+def writeDds(compressed: CompressedAEI, fp: Optional[BinaryIO] = None) -> BinaryIO:
+    """Write the image content of an undecoded AEI into a DDS container, without transcoding.
+    The compressed blocks, including any mip levels, are copied byte-for-byte. Textures, fonts and quality are not kept.
+
+    :param compressed: The undecoded AEI
+    :type compressed: CompressedAEI
+    :param fp: Optional file to write to. If not given, a new one is created. defaults to None
+    :type fp: Optional[BinaryIO], optional
+    :raises UnsupportedCompressionFormatException: If the AEI's format cannot be stored in a DDS
+    :return: A file containing the DDS
+    :rtype: BinaryIO
+    """
+    if compressed.format not in DDS_FOURCCS:
+        raise UnsupportedCompressionFormatException(compressed.format, "DDS containers only support DXT formats.")
+    
+    fp = io.BytesIO() if fp is None else fp
+    numLevels = len(compressed.mipmaps)
+    flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT | DDSD_LINEARSIZE
+    caps = DDSCAPS_TEXTURE
+    if numLevels > 1:
+        flags |= DDSD_MIPMAPCOUNT
+        caps |= DDSCAPS_COMPLEX | DDSCAPS_MIPMAP
+
+    try:
+        fp.write(_HEADER.pack(
+            DDS_MAGIC, 124, flags, compressed.height, compressed.width, len(compressed.mipmaps[0]), 0, numLevels,
+            32, DDPF_FOURCC, DDS_FOURCCS[compressed.format], 0, 0, 0, 0, 0,
+            caps, 0, 0, 0
+        ))
+        fp.writelines(compressed.mipmaps)
+
+    except Exception as ex:
+        raise AeiWriteException(None, ex) from ex
+    
+    return fp
+
+
+def readDds(
+        fp: Union[str, PathLike[Any], BinaryIO],
+        textures: Optional[List[Texture]] = None,
+        fonts: Optional[List[Dict[str, Texture]]] = None,
+        quality: Optional[CompressionQuality] = None
+    ) -> CompressedAEI:
+    """Read the image content of a DXT-compressed DDS into an undecoded AEI, without transcoding.
+    The compressed blocks, including any mip levels, are copied byte-for-byte.
+
+    :param fp: The DDS itself, or a path to a DDS file on disk
+    :type fp: Union[str, PathLike, BinaryIO]
+    :param textures: The texture bounding boxes of the new AEI. defaults to a single texture covering the whole image
+    :type textures: Optional[List[Texture]], optional
+    :param fonts: The symbol maps of the new AEI. defaults to None
+    :type fonts: Optional[List[Dict[str, Texture]]], optional
+    :param quality: The compression quality of the new AEI. defaults to None
+    :type quality: Optional[CompressionQuality], optional
+    :return: An undecoded AEI containing the image content of `fp`
+    :rtype: CompressedAEI
+    """
+    with CompressedAEI._openForRead(fp) as file:
+        try:
+            header = file.read(_HEADER.size)
+            if len(header) != _HEADER.size or header[:4] != DDS_MAGIC:
+                raise ValueError("Given file is not a DDS")
+            
+            fields = _HEADER.unpack(header)
+            height, width, numLevels, fourCC = fields[3], fields[4], fields[7], fields[10]
+            
+            try:
+                format = next(f for f, c in DDS_FOURCCS.items() if c == fourCC)
+            except StopIteration:
+                raise ValueError(f"Unsupported DDS pixel format '{fourCC.decode(errors='replace')}'")
+            
+            shapes = imageOps.mipmapShapes(width, height)
+            numLevels = max(1, numLevels)
+            if numLevels > 1 and numLevels != len(shapes):
+                raise UnsupportedAeiFeatureException("Partial mip chains", f"The DDS has {numLevels} of {len(shapes)} mip levels.")
+            
+            mipmaps: List[bytes] = []
+            for level, (w, h) in enumerate(shapes[:numLevels]):
+                expected = format.imageLength(w, h)
+                data = file.read(expected)
+                if len(data) != expected:
+                    raise ValueError(f"The DDS ended unexpectedly, {expected - len(data)} bytes short of mip level {level}")
+                mipmaps.append(data)
+        
+        except Exception as ex:
+            raise AeiReadException(None, ex) from ex
+    
+    textures = [Texture(0, 0, width, height)] if textures is None else textures
+    return CompressedAEI(format, width, height, mipmaps, textures, fonts, quality, numLevels > 1)
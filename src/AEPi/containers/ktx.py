@@ -0,0 +1,146 @@
+import io
+import struct
+from os import PathLike
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+from ..constants import CompressionFormat, CompressionQuality
+from ..exceptions import AeiReadException, AeiWriteException, UnsupportedAeiFeatureException, UnsupportedCompressionFormatException
+from ..image.compressedAEI import CompressedAEI
+from ..image.texture import Texture
+from ..lib import imageOps, blockOps
+
+KTX_IDENTIFIER = b"\xABKTX 11\xBB\r\n\x1A\n"
+KTX_ENDIANNESS = 0x04030201
+
+GL_RGB = 0x1907
+GL_RGBA = 0x1908
+
+# identifier, endianness, glType, glTypeSize, glFormat, glInternalFormat, glBaseInternalFormat,
+# width, height, depth, array elements, faces, mip levels, key/value data length
+_HEADER = struct.Struct("<12s13I")
+_UINT32 = struct.Struct("<I")
+
+KTX_INTERNAL_FORMATS: Dict[CompressionFormat, int] = {
+    CompressionFormat.PVRTC12A: 0x8C03, # GL_COMPRESSED_RGBA_PVRTC_2BPPV1_IMG
+    CompressionFormat.PVRTC14A: 0x8C02, # GL_COMPRESSED_RGBA_PVRTC_4BPPV1_IMG
+    CompressionFormat.ATC: 0x87EE,      # GL_ATC_RGBA_INTERPOLATED_ALPHA_AMD
+    CompressionFormat.DXT1: 0x83F0,     # GL_COMPRESSED_RGB_S3TC_DXT1_EXT
+    CompressionFormat.DXT3: 0x83F2,     # GL_COMPRESSED_RGBA_S3TC_DXT3_EXT
+    CompressionFormat.DXT5: 0x83F3,     # GL_COMPRESSED_RGBA_S3TC_DXT5_EXT
+    CompressionFormat.ETC1: 0x8D64,     # GL_ETC1_RGB8_OES
+    CompressionFormat.ETC2: 0x9274      # GL_COMPRESSED_RGB8_ETC2
+}
+
+
+def _rgbOrder(compressed: bytes, format: CompressionFormat) -> bytes:
+    # AEIs store ETC images in BGR order, but KTX readers expect RGB. This swap is its own inverse
+    if format.isBgra:
+        return blockOps.swapEtcRedBlue(compressed)
+    return compressed
+
+
+def writeKtx(compressed: CompressedAEI, fp: Optional[BinaryIO] = None) -> BinaryIO:
+    """Write the image content of an undecoded AEI into a KTX (version 1) container, without transcoding.
+    The compressed blocks, including any mip levels, are copied byte-for-byte.
+    The exception is ETC, which AEIs store in BGR order: the red and blue base colours of each block are swapped losslessly.
+    Textures, fonts and quality are not kept.
+
+    :param compressed: The undecoded AEI
+    :type compressed: CompressedAEI
+    :param fp: Optional file to write to. If not given, a new one is created. defaults to None
+    :type fp: Optional[BinaryIO], optional
+    :raises UnsupportedCompressionFormatException: If the AEI's format cannot be stored in a KTX
+    :return: A file containing the KTX
+    :rtype: BinaryIO
+    """
+    format = compressed.format
+    if format not in KTX_INTERNAL_FORMATS:
+        raise UnsupportedCompressionFormatException(format, "KTX containers only support block-compressed formats.")
+    
+    fp = io.BytesIO() if fp is None else fp
+    baseFormat = GL_RGBA if format.pillowMode == "RGBA" else GL_RGB
+
+    try:
+        fp.write(_HEADER.pack(
+            KTX_IDENTIFIER, KTX_ENDIANNESS, 0, 1, 0, KTX_INTERNAL_FORMATS[format], baseFormat,
+            compressed.width, compressed.height, 0, 0, 1, len(compressed.mipmaps), 0
+        ))
+
+        for level in compressed.mipmaps:
+            fp.write(_UINT32.pack(len(level)))
+            fp.write(_rgbOrder(level, format))
+            # Each mip level is padded to 4 bytes
+            fp.write(b"\x00" * (-len(level) % 4))
+
+    except Exception as ex:
+        raise AeiWriteException(None, ex) from ex
+
+    return fp
+
+
+def readKtx(
+        fp: Union[str, PathLike[Any], BinaryIO],
+        textures: Optional[List[Texture]] = None,
+        fonts: Optional[List[Dict[str, Texture]]] = None,
+        quality: Optional[CompressionQuality] = None
+    ) -> CompressedAEI:
+    """Read the image content of a block-compressed KTX (version 1) into an undecoded AEI, without transcoding.
+    The compressed blocks, including any mip levels, are copied byte-for-byte, except for ETC's channel order. See `writeKtx`.
+
+    :param fp: The KTX itself, or a path to a KTX file on disk
+    :type fp: Union[str, PathLike, BinaryIO]
+    :param textures: The texture bounding boxes of the new AEI. defaults to a single texture covering the whole image
+    :type textures: Optional[List[Texture]], optional
+    :param fonts: The symbol maps of the new AEI. defaults to None
+    :type fonts: Optional[List[Dict[str, Texture]]], optional
+    :param quality: The compression quality of the new AEI. defaults to None
+    :type quality: Optional[CompressionQuality], optional
+    :return: An undecoded AEI containing the image content of `fp`
+    :rtype: CompressedAEI
+    """
+    with CompressedAEI._openForRead(fp) as file:
+        try:
+            header = file.read(_HEADER.size)
+            if len(header) != _HEADER.size or header[:12] != KTX_IDENTIFIER:
+                raise ValueError("Given file is not a KTX")
+            
+            (_, endianness, _, _, _, internalFormat, _, width, height, depth, arrayElements, faces, numLevels, keyValueLength) = _HEADER.unpack(header)
+            if endianness != KTX_ENDIANNESS:
+                raise UnsupportedAeiFeatureException("Big-endian KTX files")
+            
+            if depth > 0 or arrayElements > 0 or faces != 1:
+                raise UnsupportedAeiFeatureException("3D, array and cube map KTX files")
+            
+            try:
+                format = next(f for f, i in KTX_INTERNAL_FORMATS.items() if i == internalFormat)
+            except StopIteration:
+                raise ValueError(f"Unsupported KTX internal format {internalFormat:#06x}")
+            
+            shapes = imageOps.mipmapShapes(width, height)
+            numLevels = max(1, numLevels)
+            if numLevels > 1 and numLevels != len(shapes):
+                raise UnsupportedAeiFeatureException("Partial mip chains", f"The KTX has {numLevels} of {len(shapes)} mip levels.")
+            
+            file.read(keyValueLength)
+            mipmaps: List[bytes] = []
+            for level, (w, h) in enumerate(shapes[:numLevels]):
+                lengthBytes = file.read(_UINT32.size)
+                if len(lengthBytes) != _UINT32.size:
+                    raise ValueError(f"The KTX ended unexpectedly, before the length of mip level {level}")
+
+                length = _UINT32.unpack(lengthBytes)[0]
+                expected = format.imageLength(w, h)
+                if length != expected:
+                    raise ValueError(f"Mip level {level} declares {length} bytes of image content, but a {w}x{h} {format.name} image is {expected} bytes")
+
+                data = file.read(length)
+                if len(data) != length:
+                    raise ValueError(f"The KTX ended unexpectedly, {length - len(data)} bytes short of mip level {level}")
+                mipmaps.append(_rgbOrder(data, format))
+                file.read(-length % 4)
+
+        except Exception as ex:
+            raise AeiReadException(None, ex) from ex
+    
+    textures = [Texture(0, 0, width, height)] if textures is None else textures
+    return CompressedAEI(format, width, height, mipmaps, textures, fonts, quality, numLevels > 1)
@@ -0,0 +1,318 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from .image import AEI, Texture
+from .lib import metrics
+from .lib.packing import packShelves
+
+# The number of cells along each side of the grid that sprites are averaged over, to cheaply rule out near-duplicates
+FINGERPRINT_GRID = 8
+# The number of bytes of sprites gathered from an atlas at a time for hashing
+HASH_BATCH_SIZE = 16 * 1024 * 1024
+
+_MAX = 255.0
+
+
+class SpriteRef(NamedTuple):
+    """A texture within one of a collection of atlases.
+    """
+    # The name of the atlas, as given to `findDuplicates`
+    atlas: str
+    # The index of the texture within the atlas's `textures`
+    textureIndex: int
+    texture: Texture
+
+
+class DuplicateGroup(NamedTuple):
+    """Sprites with identical, or near-identical, image content, found by `findDuplicates`.
+    """
+    # In atlas order, then texture order. The first sprite is the one kept by `rebuildAtlases`
+    sprites: List[SpriteRef]
+    # The lowest PSNR of any sprite relative to the first, in decibels. Infinite if every sprite is identical
+    minPsnr: float
+
+    @property
+    def exact(self) -> bool:
+        """Whether every sprite is pixel-identical to the first.
+        """
+        return self.minPsnr == float("inf")
+
+
+    @property
+    def redundantPixels(self) -> int:
+        """The number of pixels which would be saved by storing the group's image content only once.
+        """
+        texture = self.sprites[0].texture
+        return (len(self.sprites) - 1) * texture.width * texture.height
+
+
+class DedupReport(NamedTuple):
+    """The duplicated sprites found across a collection of atlases by `findDuplicates`.
+    """
+    # Ordered by the first sprite of each group
+    groups: List[DuplicateGroup]
+    # The number of sprites that were compared
+    numSprites: int
+
+    @property
+    def redundantPixels(self) -> int:
+        """The number of pixels which would be saved by storing the image content of each group only once.
+        """
+        return sum(group.redundantPixels for group in self.groups)
+
+
+class RebuiltAtlases(NamedTuple):
+    """Atlases rebuilt by `rebuildAtlases` to share duplicated sprites.
+    """
+    # Holds one copy of each group of sprites which appeared in more than one atlas
+    shared: AEI
+    # Each original atlas, holding only the sprites which were not moved to `shared`, by name
+    atlases: Dict[str, AEI]
+    # Where each original texture, given as (atlas name, texture index), now lives
+    locations: Dict[Tuple[str, int], SpriteRef]
+
+
+class _Sprite(NamedTuple):
+    ref: SpriteRef
+    region: npt.NDArray[np.uint8]
+    digest: bytes
+    # Only computed when searching for near-identical sprites
+    fingerprint: Optional[npt.NDArray[np.float64]]
+
+
+def findDuplicates(atlases: Mapping[str, AEI], minPsnr: Optional[float] = None, workers: Optional[int] = None) -> DedupReport:
+    """Find textures with the same image content across a collection of atlases.
+    Each texture is hashed directly from the atlas's image content array, so no per-pixel work is done in python.
+
+    With `minPsnr`, sprites of the same dimensions are also grouped if their PSNR relative to the first sprite of a group is at least `minPsnr`.
+    Each sprite is first compared by its mean colour over a coarse grid of cells, which cheaply rules out most pairs before comparing every pixel.
+
+    ```py
+    report = findDuplicates({path: AEI.read(path) for path in paths}, minPsnr=45)
+    for group in report.groups:
+        print([(sprite.atlas, sprite.textureIndex) for sprite in group.sprites])
+    ```
+
+    :param atlases: The atlases to search, by name
+    :type atlases: Mapping[str, AEI]
+    :param minPsnr: The lowest PSNR, in decibels, at which sprites are considered near-identical. defaults to only identical sprites
+    :type minPsnr: Optional[float], optional
+    :param workers: The number of atlases to hash at once. defaults to the `ThreadPoolExecutor` default
+    :type workers: Optional[int], optional
+    :return: Each group of duplicated sprites
+    :rtype: DedupReport
+    """
+    exact = minPsnr is None or minPsnr == float("inf")
+    # Hashing releases the GIL, so atlases are hashed concurrently
+    with ThreadPoolExecutor(workers) as executor:
+        described = executor.map(_describeSprites, atlases.keys(), atlases.values(), [not exact] * len(atlases))
+        sprites = [sprite for atlasSprites in described for sprite in atlasSprites]
+
+    identical: Dict[Tuple[Tuple[int, ...], bytes], List[_Sprite]] = {}
+    for sprite in sprites:
+        identical.setdefault((sprite.region.shape, sprite.digest), []).append(sprite)
+
+    if exact:
+        clusters = [(members, float("inf")) for members in identical.values()]
+    else:
+        clusters = _clusterNear(list(identical.values()), _MAX * _MAX / 10 ** (minPsnr / 10)) # type: ignore[reportOptionalOperand]
+
+    atlasOrder = {name: i for i, name in enumerate(atlases)}
+    def order(ref: SpriteRef):
+        return (atlasOrder[ref.atlas], ref.textureIndex)
+
+    groups = [
+        DuplicateGroup(sorted((sprite.ref for sprite in members), key=order), psnr)
+        for members, psnr in clusters
+        if len(members) > 1
+    ]
+    groups.sort(key=lambda group: order(group.sprites[0]))
+    return DedupReport(groups, len(sprites))
+
+
+def rebuildAtlases(atlases: Mapping[str, AEI], report: DedupReport, sharedName: str = "shared", alignment: int = 4) -> RebuiltAtlases:
+    """Rebuild a collection of atlases so that each group of duplicated sprites is stored only once.
+    Groups which appear in more than one atlas are moved to a new, shared atlas. Groups within a single atlas are kept once in that atlas.
+    Every sprite in a group is replaced with the first sprite of the group.
+
+    Each atlas is repacked, so the position of every texture changes. The new location of every original texture is given by `RebuiltAtlases.locations`.
+    Rebuilt atlases keep the `format`, `quality` and `mipmapped` of the original. The shared atlas takes them from the atlas of the first shared sprite.
+    The original atlases are not changed.
+
+    :param atlases: The atlases that `report` was made from, by name
+    :type atlases: Mapping[str, AEI]
+    :param report: The duplicated sprites, from `findDuplicates`
+    :type report: DedupReport
+    :param sharedName: The atlas name given to the shared atlas in `RebuiltAtlases.locations`. defaults to "shared"
+    :type sharedName: str, optional
+    :param alignment: The multiple that sprite positions are rounded up to, so that sprites do not share compression blocks. defaults to 4
+    :type alignment: int, optional
+    :raises ValueError: If `sharedName` is the name of an atlas, an atlas has symbol maps, or `report` was not made from `atlases`
+    :return: The rebuilt atlases, and where each texture now lives
+    :rtype: RebuiltAtlases
+    """
+    if sharedName in atlases:
+        raise ValueError(f"An atlas is already called {sharedName!r}")
+    if any(aei.fonts for aei in atlases.values()):
+        raise ValueError("Atlases with symbol maps cannot be rebuilt, as their glyphs would move")
+
+    # The sprite whose image content is kept for each texture, and the atlas it moves to
+    keptAs: Dict[Tuple[str, int], Tuple[str, Tuple[str, int]]] = {}
+    for group in report.groups:
+        kept = group.sprites[0]
+        destination = kept.atlas if all(s.atlas == kept.atlas for s in group.sprites) else sharedName
+        for sprite in group.sprites:
+            if sprite.atlas not in atlases or sprite.textureIndex >= len(atlases[sprite.atlas].textures) or atlases[sprite.atlas].textures[sprite.textureIndex] is not sprite.texture:
+                raise ValueError("The report was not made from these atlases")
+            keptAs[sprite.atlas, sprite.textureIndex] = (destination, (kept.atlas, kept.textureIndex))
+
+    # The sprites placed into each new atlas, in order
+    placed: Dict[str, List[Tuple[str, int]]] = {name: [] for name in [*atlases, sharedName]}
+    for name, aei in atlases.items():
+        for index in range(len(aei.textures)):
+            destination, kept = keptAs.get((name, index), (name, (name, index)))
+            if kept == (name, index):
+                placed[destination].append(kept)
+
+    sharedSource = next((atlases[name] for name, _ in placed[sharedName]), None)
+    rebuilt = {
+        name: _packAtlas(atlases, sprites, atlases.get(name, sharedSource), alignment)
+        for name, sprites in placed.items()
+    }
+
+    newIndices = {kept: i for sprites in placed.values() for i, kept in enumerate(sprites)}
+    locations: Dict[Tuple[str, int], SpriteRef] = {}
+    for name, aei in atlases.items():
+        for index in range(len(aei.textures)):
+            destination, kept = keptAs.get((name, index), (name, (name, index)))
+            newIndex = newIndices[kept]
+            locations[name, index] = SpriteRef(destination, newIndex, rebuilt[destination].textures[newIndex])
+
+    shared = rebuilt.pop(sharedName)
+    return RebuiltAtlases(shared, rebuilt, locations)
+
+
+def _describeSprites(name: str, aei: AEI, fingerprinted: bool) -> List[_Sprite]:
+    # Read without `asArray`, which would convert the caller's AEI to be array-backed
+    canvas = aei._sourceArray()
+    height, width = canvas.shape[:2]
+
+    # Textures of the same shape are copied out of the canvas into batches, which are fingerprinted together
+    byShape: Dict[Tuple[int, int], List[Tuple[int, int, int]]] = {}
+    for index, texture in enumerate(aei.textures):
+        # Matches the clipping of textures which fall partly out of bounds by `AEI.asArray`
+        x0, y0 = max(texture.x, 0), max(texture.y, 0)
+        x1, y1 = min(texture.x + texture.width, width), min(texture.y + texture.height, height)
+        if x0 >= x1 or y0 >= y1:
+            raise ValueError(f"Texture {index} of atlas {name!r} has no common area with the bounds of the AEI")
+        byShape.setdefault((x1 - x0, y1 - y0), []).append((index, x0, y0))
+
+    described: Dict[int, _Sprite] = {}
+    for (w, h), boxes in byShape.items():
+        batchSize = max(1, HASH_BATCH_SIZE // (4 * w * h))
+        for batchStart in range(0, len(boxes), batchSize):
+            batch = boxes[batchStart : batchStart + batchSize]
+            # (sprites, h, w, 4). Slicing copies whole rows at a time, which is much faster than gathering with index arrays
+            regions = np.empty((len(batch), h, w, 4), dtype=np.uint8)
+            for i, (_, x, y) in enumerate(batch):
+                regions[i] = canvas[y : y + h, x : x + w]
+            fingerprints = _fingerprints(regions) if fingerprinted else None
+
+            for i, (index, x, y) in enumerate(batch):
+                described[index] = _Sprite(
+                    SpriteRef(name, index, aei.textures[index]),
+                    canvas[y : y + h, x : x + w],
+                    hashlib.blake2b(regions[i], digest_size=16).digest(),
+                    None if fingerprints is None else fingerprints[i]
+                )
+
+    return [described[index] for index in range(len(aei.textures))]
+
+
+def _fingerprints(regions: npt.NDArray[np.uint8]) -> npt.NDArray[np.float64]:
+    # The mean colour of each cell of a coarse grid over each sprite, weighted so that the squared distance between two fingerprints
+    # is the MSE between the grids of means. By Jensen's inequality, this never exceeds the MSE between the sprites
+    height, width = regions.shape[1:3]
+    rows = np.unique(np.linspace(0, height, FINGERPRINT_GRID + 1).astype(np.intp))[:-1]
+    cols = np.unique(np.linspace(0, width, FINGERPRINT_GRID + 1).astype(np.intp))[:-1]
+    sums = np.add.reduceat(np.add.reduceat(regions, rows, axis=1, dtype=np.uint32), cols, axis=2)
+
+    areas = np.outer(np.diff(rows, append=height), np.diff(cols, append=width))[..., np.newaxis]
+    weighted = sums / areas * np.sqrt(areas / regions[0].size)
+    return weighted.reshape(len(regions), -1)
+
+
+class _Representatives:
+    # The fingerprints of the first sprite of each cluster of one sprite shape, in a buffer which doubles when full
+    def __init__(self, length: int) -> None:
+        self.clusters: List[int] = []
+        self.fingerprints = np.empty((16, length), dtype=np.float64)
+        self.norms = np.empty(16, dtype=np.float64)
+
+
+    def add(self, cluster: int, fingerprint: npt.NDArray[np.float64]):
+        count = len(self.clusters)
+        if count == len(self.norms):
+            self.fingerprints = np.concatenate([self.fingerprints, np.empty_like(self.fingerprints)])
+            self.norms = np.concatenate([self.norms, np.empty_like(self.norms)])
+        self.fingerprints[count] = fingerprint
+        self.norms[count] = fingerprint @ fingerprint
+        self.clusters.append(cluster)
+
+
+    def candidates(self, fingerprint: npt.NDArray[np.float64], maxMse: float) -> List[int]:
+        # Squared distances are expanded into a single matrix-vector product. The tolerance covers rounding error,
+        # as a false candidate only costs a full comparison, but a missed one would split a cluster
+        count = len(self.clusters)
+        norm = fingerprint @ fingerprint
+        bounds = self.norms[:count] + norm - 2 * (self.fingerprints[:count] @ fingerprint)
+        tolerance = 1e-9 * (self.norms[:count] + norm) + 1e-9
+        return [self.clusters[i] for i in np.flatnonzero(bounds <= maxMse + tolerance)]
+
+
+def _clusterNear(identical: List[List[_Sprite]], maxMse: float) -> List[Tuple[List[_Sprite], float]]:
+    # Each set of identical sprites joins the first cluster whose representative it is close enough to.
+    # Comparing only to representatives keeps every sprite within maxMse of the sprite that replaces it
+    clusters: List[Tuple[List[_Sprite], float]] = []
+    representatives: Dict[Tuple[int, ...], _Representatives] = {}
+
+    for members in identical:
+        sprite = members[0]
+        assert sprite.fingerprint is not None
+        shapeRepresentatives = representatives.setdefault(sprite.region.shape, _Representatives(len(sprite.fingerprint)))
+
+        for candidate in shapeRepresentatives.candidates(sprite.fingerprint, maxMse):
+            cluster, psnr = clusters[candidate]
+            error = metrics.mse(cluster[0].region, sprite.region)
+            if error <= maxMse:
+                cluster.extend(members)
+                clusters[candidate] = (cluster, min(psnr, _psnr(error)))
+                break
+        else:
+            shapeRepresentatives.add(len(clusters), sprite.fingerprint)
+            clusters.append((list(members), float("inf")))
+
+    return clusters
+
+
+def _psnr(error: float) -> float:
+    return float(10 * np.log10(_MAX * _MAX / error)) if error else float("inf")
+
+
+def _packAtlas(atlases: Mapping[str, AEI], sprites: List[Tuple[str, int]], source: Optional[AEI], alignment: int) -> AEI:
+    regions = [atlases[name].asArray(atlases[name].textures[index]) for name, index in sprites]
+    positions, (width, height) = packShelves([(r.shape[1], r.shape[0]) for r in regions], alignment)
+
+    canvas = np.zeros((max(height, alignment), max(width, alignment), 4), dtype=np.uint8)
+    for (x, y), region in zip(positions, regions):
+        canvas[y : y + region.shape[0], x : x + region.shape[1]] = region
+
+    aei = AEI.fromArray(canvas, format=None if source is None else source.format, quality=None if source is None else source.quality)
+    aei.mipmapped = source is not None and source.mipmapped
+    for (x, y), region in zip(positions, regions):
+        aei.addTexture(Texture(x, y, region.shape[1], region.shape[0]))
+    return aei
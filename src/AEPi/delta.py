@@ -0,0 +1,201 @@
+import hashlib
+import struct
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from .constants import CompressionFormat, FORMAT_BITCOUNTS
+from .image import CompressedAEI
+from .image.parser import _HEADER
+
+# Identifies AEI patch files
+PATCH_MAGIC = b"AEIpatch"
+PATCH_VERSION = 1
+
+# Magic, version, hash of the old file, hash of the new file
+_PATCH_HEADER = struct.Struct(f"<{len(PATCH_MAGIC)}sB16s16s")
+_UINT16 = struct.Struct("<H")
+_UINT32 = struct.Struct("<I")
+# Kind, then the payload length for full levels, or the block size for delta levels
+_LEVEL = struct.Struct("<BI")
+_LEVEL_FULL = 0
+_LEVEL_DELTA = 1
+
+
+def makePatch(old: CompressedAEI, new: CompressedAEI) -> bytes:
+    """Create a patch which reconstructs `new`, byte for byte, from `old`.
+    Image content is compared one compression block at a time, and only changed blocks are included.
+    Mip levels which can't be compared, for example because the format or dimensions changed, are included in full.
+    Metadata is always included in full, as it is small.
+
+    :param old: The AEI which the patch is applied to
+    :type old: CompressedAEI
+    :param new: The AEI which the patch reconstructs
+    :type new: CompressedAEI
+    :return: The patch, to be applied with `applyPatch`
+    :rtype: bytes
+    """
+    header = new._packHeaderMeta() # type: ignore[reportPrivateUsage]
+    symbols = new._packSymbols() # type: ignore[reportPrivateUsage]
+
+    sections: List[Union[bytes, bytearray]] = [
+        _PATCH_HEADER.pack(PATCH_MAGIC, PATCH_VERSION, _fileHash(old), _fileHash(new)),
+        _UINT32.pack(len(header)), header,
+        _UINT32.pack(len(symbols)), symbols,
+        _UINT16.pack(len(new.mipmaps))
+    ]
+
+    for level, payload in enumerate(new.mipmaps):
+        base = _comparableLevel(old, new, level)
+        delta = None if base is None else _blockDelta(base, payload, _blockBytes(new.format))
+        if delta is not None and sum(len(s) for s in delta) < len(payload):
+            sections += delta
+        else:
+            sections += [_LEVEL.pack(_LEVEL_FULL, len(payload)), payload]
+
+    return b"".join(sections)
+
+
+def applyPatch(old: CompressedAEI, patch: bytes) -> bytes:
+    """Reconstruct an AEI file from the AEI that a patch was made against.
+
+    :param old: The AEI which the patch was made against, with `makePatch`
+    :type old: CompressedAEI
+    :param patch: The patch
+    :type patch: bytes
+    :raises ValueError: If `patch` is not a valid patch, or was not made against `old`
+    :return: The contents of the new AEI file
+    :rtype: bytes
+    """
+    try:
+        magic, version, oldHash, newHash = _PATCH_HEADER.unpack_from(patch, 0)
+        if magic != PATCH_MAGIC or version != PATCH_VERSION:
+            raise ValueError("The data is not a supported AEI patch")
+        if oldHash != _fileHash(old):
+            raise ValueError("The patch was not made against this AEI")
+
+        reader = _PatchReader(patch, _PATCH_HEADER.size)
+        header = reader.take(reader.unpack(_UINT32))
+        symbols = reader.take(reader.unpack(_UINT32))
+        format, _ = CompressionFormat.fromBinary(_HEADER.unpack_from(header, 0)[1])
+
+        sections: List[bytes] = [header]
+        for level in range(reader.unpack(_UINT16)):
+            kind, value = _LEVEL.unpack(reader.take(_LEVEL.size))
+            if kind == _LEVEL_FULL:
+                payload = reader.take(value)
+            elif kind == _LEVEL_DELTA:
+                payload = _applyBlockDelta(old.mipmaps[level], value, reader)
+            else:
+                raise ValueError(f"Unknown patch level kind {kind}")
+
+            # image length only appears in compressed AEIs
+            if format.isCompressed:
+                sections.append(_UINT32.pack(len(payload)))
+            sections.append(payload)
+
+        sections.append(symbols)
+        if reader.offset != len(patch):
+            raise ValueError("The patch has unexpected trailing data")
+
+    except (struct.error, IndexError) as ex:
+        raise ValueError("The patch is malformed") from ex
+
+    result = b"".join(sections)
+    if hashlib.blake2b(result, digest_size=16).digest() != newHash:
+        raise ValueError("The patched AEI does not match the patch's checksum")
+    return result
+
+
+class _PatchReader:
+    def __init__(self, patch: bytes, offset: int) -> None:
+        self.view = memoryview(patch)
+        self.offset = offset
+
+
+    def take(self, length: int) -> bytes:
+        if self.offset + length > len(self.view):
+            raise ValueError("The patch ended unexpectedly")
+        section = self.view[self.offset : self.offset + length].tobytes()
+        self.offset += length
+        return section
+
+
+    def unpack(self, fmt: struct.Struct) -> int:
+        return fmt.unpack(self.take(fmt.size))[0]
+
+
+def _fileHash(aei: CompressedAEI) -> bytes:
+    # Hashes the file sections exactly as CompressedAEI.write would write them
+    fileHash = hashlib.blake2b(digest_size=16)
+    fileHash.update(aei._packHeaderMeta()) # type: ignore[reportPrivateUsage]
+    for section in aei._imageContentSections(): # type: ignore[reportPrivateUsage]
+        fileHash.update(section)
+    fileHash.update(aei._packSymbols()) # type: ignore[reportPrivateUsage]
+    return fileHash.digest()
+
+
+def _blockBytes(format: CompressionFormat) -> int:
+    # The size of one compression block. Uncompressed formats are compared a pixel at a time
+    width, height = format.blockShape
+    return format.bitcount * width * height // 8
+
+
+def _comparableLevel(old: CompressedAEI, new: CompressedAEI, level: int) -> Optional[bytes]:
+    if old.format != new.format or new.format not in FORMAT_BITCOUNTS or level >= len(old.mipmaps) or old.mipmapShapes[level] != new.mipmapShapes[level]:
+        return None
+    base = old.mipmaps[level]
+    return base if len(base) == len(new.mipmaps[level]) else None
+
+
+def _asBlocks(payload: bytes, blockBytes: int) -> npt.NDArray[np.uint8]:
+    return np.frombuffer(payload, dtype=np.uint8).reshape(-1, blockBytes)
+
+
+def _changedRuns(old: bytes, new: bytes, blockBytes: int) -> Tuple[npt.NDArray[np.uint32], npt.NDArray[np.uint32]]:
+    # Compare whole words at a time where the block size allows
+    wordType = np.uint64 if blockBytes % 8 == 0 else np.uint32 if blockBytes % 4 == 0 else np.uint8
+    words = blockBytes // np.dtype(wordType).itemsize
+    changed = (np.frombuffer(old, dtype=wordType).reshape(-1, words) != np.frombuffer(new, dtype=wordType).reshape(-1, words)).any(axis=1)
+
+    # Run starts and ends are where the changed flag flips
+    edges = np.diff(changed.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1).astype(np.uint32)
+    ends = np.flatnonzero(edges == -1).astype(np.uint32)
+    return starts, ends - starts
+
+
+def _runIndices(starts: npt.NDArray[np.uint32], counts: npt.NDArray[np.uint32]) -> npt.NDArray[np.intp]:
+    # The index of every block covered by the runs, without a python loop per run
+    runLengths = counts.astype(np.intp)
+    runOffsets = np.repeat(np.cumsum(runLengths) - runLengths, runLengths)
+    return np.arange(runLengths.sum(), dtype=np.intp) - runOffsets + np.repeat(starts.astype(np.intp), runLengths)
+
+
+def _blockDelta(old: bytes, new: bytes, blockBytes: int) -> Optional[List[bytes]]:
+    if len(new) % blockBytes:
+        return None
+
+    starts, counts = _changedRuns(old, new, blockBytes)
+    changedBlocks = _asBlocks(new, blockBytes)[_runIndices(starts, counts)]
+    runs = np.empty(2 * len(starts), dtype="<u4")
+    runs[0::2] = starts
+    runs[1::2] = counts
+    return [_LEVEL.pack(_LEVEL_DELTA, blockBytes), _UINT32.pack(len(starts)), runs.tobytes(), changedBlocks.tobytes()]
+
+
+def _applyBlockDelta(old: bytes, blockBytes: int, reader: _PatchReader) -> bytes:
+    if blockBytes == 0 or len(old) % blockBytes:
+        raise ValueError("The patch's block size does not match the AEI")
+
+    numRuns = reader.unpack(_UINT32)
+    runs = np.frombuffer(reader.take(8 * numRuns), dtype="<u4")
+    starts, counts = runs[0::2], runs[1::2]
+    indices = _runIndices(starts, counts)
+
+    blocks = _asBlocks(old, blockBytes).copy()
+    if len(indices) and indices.max() >= len(blocks):
+        raise ValueError("The patch changes blocks beyond the end of the image content")
+    blocks[indices] = _asBlocks(reader.take(len(indices) * blockBytes), blockBytes)
+    return blocks.tobytes()
@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from .constants import CompressionFormat, CompressionQuality
+from .image import AEI, CompressedAEI, Texture
+from .lib import imageOps
+from .lib.imageOps import MipmapFilter
+
+
+class Variant(NamedTuple):
+    """The settings of one resolution tier produced by `makeVariants`.
+    `format`, `quality` and `mipmapped` default to the settings of the source AEI.
+    """
+    # The factor that the source is scaled down by. Must be a power of two
+    downscale: int = 1
+    format: Optional[CompressionFormat] = None
+    quality: Optional[CompressionQuality] = None
+    mipmapped: Optional[bool] = None
+
+
+# Full, half and quarter resolution tiers
+DEFAULT_VARIANTS: Dict[str, Variant] = {
+    "HD": Variant(1),
+    "SD": Variant(2),
+    "LD": Variant(4)
+}
+
+
+def scaleTexture(texture: Texture, downscale: int, shape: Tuple[int, int], blockShape: Tuple[int, int] = (1, 1)) -> Texture:
+    """Scale a texture bounding box down to a smaller copy of its AEI.
+    The box is grown to cover every pixel that the texture contributes to, and then outwards to the edges of the blocks it touches,
+    so that no part of the texture shares a compression block with pixels outside of the box.
+    Textures placed at multiples of `downscale` times the block size in the source are therefore scaled exactly.
+
+    :param texture: The texture in the source AEI
+    :type texture: Texture
+    :param downscale: The factor that the AEI is scaled down by
+    :type downscale: int
+    :param shape: The (width, height) of the scaled AEI
+    :type shape: Tuple[int, int]
+    :param blockShape: The (width, height) of the blocks to snap to. defaults to (1, 1)
+    :type blockShape: Tuple[int, int], optional
+    :return: The scaled texture
+    :rtype: Texture
+    """
+    (blockWidth, blockHeight), (width, height) = blockShape, shape
+    left = texture.x // downscale // blockWidth * blockWidth
+    top = texture.y // downscale // blockHeight * blockHeight
+    right = min(width, _ceilDiv(_ceilDiv(texture.x + texture.width, downscale), blockWidth) * blockWidth)
+    bottom = min(height, _ceilDiv(_ceilDiv(texture.y + texture.height, downscale), blockHeight) * blockHeight)
+    left, top = min(left, width - 1), min(top, height - 1)
+    return Texture(left, top, max(1, right - left), max(1, bottom - top))
+
+
+def makeVariants(
+        aei: AEI,
+        variants: Mapping[str, Variant] = DEFAULT_VARIANTS,
+        mipmapFilter: MipmapFilter = "box",
+        workers: Optional[int] = None
+    ) -> Dict[str, CompressedAEI]:
+    """Produce several resolution tiers of an AEI in one pass, such as for devices of different capabilities.
+
+    The source is downsampled once per halving, with `mipmapFilter`, and each tier takes the level it needs, so tiers share the work of smaller tiers.
+    Texture and symbol map bounding boxes are scaled with `scaleTexture`, snapped to the blocks of each tier's format.
+    Tiers are then compressed concurrently.
+
+    ```py
+    with AEI.read("path/to/ui.aei") as aei:
+        for name, variant in makeVariants(aei).items():
+            variant.write(f"path/to/{name}/ui.aei")
+    ```
+
+    :param aei: The source AEI, which is not altered
+    :type aei: AEI
+    :param variants: The settings of each tier, by name. defaults to `DEFAULT_VARIANTS`
+    :type variants: Mapping[str, Variant], optional
+    :param mipmapFilter: The filter used to downsample the source, and to generate mip chains. defaults to "box"
+    :type mipmapFilter: MipmapFilter, optional
+    :param workers: The number of tiers to compress at once. defaults to the `ThreadPoolExecutor` default
+    :type workers: Optional[int], optional
+    :raises ValueError: If a `downscale` is not a power of two, or a tier has no format and the source has no format set
+    :raises ValueError: If mipmapping is requested for a tier whose format does not support mipmapping
+    :raises AeiWriteException: If compression fails
+    :return: The compressed AEI of each tier, by name
+    :rtype: Dict[str, CompressedAEI]
+    """
+    for name, variant in variants.items():
+        if variant.downscale < 1 or variant.downscale & (variant.downscale - 1):
+            raise ValueError(f"The downscale of variant {name!r} must be a power of two, but {variant.downscale} was given")
+        if variant.format is None and aei.format is None:
+            raise ValueError(f"Variant {name!r} has no format, and the source AEI has no format set")
+
+    # Read without `asArray`, which would convert the caller's AEI to be array-backed
+    levels = _downsampledLevels(aei._sourceArray(), max((v.downscale for v in variants.values()), default=1).bit_length() - 1, mipmapFilter)
+
+    def compress(variant: Variant) -> CompressedAEI:
+        format = variant.format or aei.format
+        assert format is not None
+        quality = aei.quality if variant.quality is None else variant.quality
+        mipmapped = aei.mipmapped if variant.mipmapped is None else variant.mipmapped
+
+        array = levels[variant.downscale.bit_length() - 1]
+        shape = (array.shape[1], array.shape[0])
+        blockShape = format.blockShape if format.isCompressed else (1, 1)
+        with AEI.fromArray(array) as tier:
+            compressed = tier.compress(format, quality, mipmapped, mipmapFilter)
+
+        # Boxes are replaced after compressing, as `AEI.addTexture` would warn about boxes which coincide once scaled down
+        if aei.textures:
+            compressed.textures = [scaleTexture(t, variant.downscale, shape, blockShape) for t in aei.textures]
+        compressed.fonts = [
+            {glyph: scaleTexture(box, variant.downscale, shape, blockShape) for glyph, box in font.items()}
+            for font in aei.fonts
+        ]
+        return compressed
+
+    # Workers run in a copy of this context, so that instrumentation is collected from them
+    contexts = [copy_context() for _ in variants]
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(lambda context, variant: context.run(compress, variant), contexts, variants.values()))
+
+    return dict(zip(variants, results))
+
+
+def _downsampledLevels(array: npt.NDArray[np.uint8], halvings: int, mipmapFilter: MipmapFilter) -> List[npt.NDArray[np.uint8]]:
+    # The source, then each successive halving of it. Only halvings that some tier needs are made
+    levels = [array]
+    for _ in range(halvings):
+        levels.append(imageOps.downsample(levels[-1], mipmapFilter))
+    return levels
+
+
+def _ceilDiv(a: int, b: int) -> int:
+    return -(-a // b)
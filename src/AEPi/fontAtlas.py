@@ -0,0 +1,175 @@
+import io
+import math
+from concurrent.futures import ProcessPoolExecutor
+from os import PathLike
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+from PIL import Image, ImageDraw, ImageFont
+
+from .constants import CompressionFormat, CompressionQuality
+from .image import AEI, Texture
+from .lib.packing import packShelves
+
+# The number of glyphs rasterized by each task handed to a worker process
+GLYPH_BATCH_SIZE = 512
+# Texture bounding boxes, and so AEI dimensions, are stored as uint16
+MAX_ATLAS_SIZE = 0xFFFF
+
+# A path to a TrueType or OpenType font file, or the contents of one
+FontSource = Union[str, PathLike[Any], bytes]
+
+# The font loaded by each worker process, by `_loadWorkerFont`
+_workerFont: Optional[ImageFont.FreeTypeFont] = None
+
+
+def _openFont(font: FontSource, size: int, index: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(io.BytesIO(font) if isinstance(font, bytes) else font, size, index)
+
+
+def _loadWorkerFont(font: FontSource, size: int, index: int):
+    global _workerFont
+    _workerFont = _openFont(font, size, index)
+
+
+def _rasterizeBatch(characters: str) -> List[npt.NDArray[np.uint8]]:
+    assert _workerFont is not None
+    return _rasterize(_workerFont, characters)
+
+
+def _rasterize(font: ImageFont.FreeTypeFont, characters: str) -> List[npt.NDArray[np.uint8]]:
+    # Each glyph is drawn into a cell as wide as its advance, and as high as the line, with the top of the cell at the ascender
+    ascent, descent = font.getmetrics()
+    cells: List[npt.NDArray[np.uint8]] = []
+    for character in characters:
+        cell = Image.new("L", (max(1, math.ceil(font.getlength(character))), ascent + descent))
+        ImageDraw.Draw(cell).text((0, 0), character, font=font, fill=255)
+        cells.append(np.asarray(cell))
+    return cells
+
+
+def rasterizeGlyphs(
+        font: FontSource,
+        size: int,
+        characters: Iterable[str],
+        index: int = 0,
+        workers: Optional[int] = None,
+        batchSize: int = GLYPH_BATCH_SIZE
+    ) -> Dict[str, npt.NDArray[np.uint8]]:
+    """Rasterize a character set from a TrueType or OpenType font, in batches spread across worker processes.
+    Pillow holds the GIL while rendering text, so processes are used rather than threads. Each worker loads the font once.
+
+    Each glyph is drawn into a cell as wide as its advance, and as high as the font's line (ascent plus descent),
+    so that glyphs placed side by side at the widths of their cells are spaced as the font intends. Ink falling outside of the cell is clipped.
+
+    :param font: The path to the font file, or its contents
+    :type font: FontSource
+    :param size: The size of the font, in pixels
+    :type size: int
+    :param characters: The characters to rasterize. Duplicates are rasterized once
+    :type characters: Iterable[str]
+    :param index: The index of the font to use, in a font collection file. defaults to 0
+    :type index: int, optional
+    :param workers: The number of processes to rasterize with. 1 rasterizes in this process. defaults to the `ProcessPoolExecutor` default
+    :type workers: Optional[int], optional
+    :param batchSize: The number of glyphs rasterized in each task. defaults to `GLYPH_BATCH_SIZE`
+    :type batchSize: int, optional
+    :raises ValueError: If a character is not a single UTF-16 code unit, as symbol maps store each glyph as one
+    :raises OSError: If the font can't be read
+    :return: The coverage of each glyph's cell, as a `(height, width)` uint8 array, by character
+    :rtype: Dict[str, npt.NDArray[np.uint8]]
+    """
+    characters = list(dict.fromkeys(characters))
+    for character in characters:
+        if len(character) != 1 or len(character.encode("utf-16le")) != 2:
+            raise ValueError(f"Glyphs must each be a single UTF-16 code unit, but {character!r} was given")
+    unique = "".join(characters)
+
+    batches = [unique[i : i + batchSize] for i in range(0, len(unique), batchSize)]
+    if workers == 1 or len(batches) <= 1:
+        cells = _rasterize(_openFont(font, size, index), unique)
+    else:
+        with ProcessPoolExecutor(workers, initializer=_loadWorkerFont, initargs=(font, size, index)) as executor:
+            cells = [cell for batch in executor.map(_rasterizeBatch, batches) for cell in batch]
+
+    return dict(zip(unique, cells))
+
+
+def buildFontAtlas(
+        font: FontSource,
+        size: int,
+        characters: Iterable[str],
+        format: Optional[CompressionFormat] = None,
+        quality: Optional[CompressionQuality] = None,
+        colour: Tuple[int, int, int] = (255, 255, 255),
+        padding: int = 1,
+        alignment: int = 1,
+        maxWidth: Optional[int] = None,
+        index: int = 0,
+        workers: Optional[int] = None
+    ) -> AEI:
+    """Rasterize a character set from a TrueType or OpenType font with `rasterizeGlyphs`, and pack the glyphs into a new AEI with a symbol map.
+
+    Glyphs are packed into shelves with `lib.packing.packShelves`. As every glyph is the height of the font's line, shelves are filled with no wasted height.
+    Every pixel has the RGB of `colour`, and the alpha of the glyph coverage, so that filtering does not darken the edges of glyphs.
+
+    ```py
+    with open("lang/zh.txt", encoding="utf-8") as file:
+        characters = set(file.read()) - {"\\n"}
+
+    with buildFontAtlas("NotoSansSC-Regular.otf", 32, characters, CompressionFormat.DXT5) as atlas:
+        atlas.write("fonts/zh.aei")
+    ```
+
+    :param font: The path to the font file, or its contents
+    :type font: FontSource
+    :param size: The size of the font, in pixels
+    :type size: int
+    :param characters: The characters to include. Duplicates are included once
+    :type characters: Iterable[str]
+    :param format: The compression format of the AEI. defaults to None
+    :type format: Optional[CompressionFormat], optional
+    :param quality: The compression quality of the AEI. defaults to None
+    :type quality: Optional[CompressionQuality], optional
+    :param colour: The RGB colour of the glyphs. defaults to white
+    :type colour: Tuple[int, int, int], optional
+    :param padding: The number of empty pixels between glyphs. defaults to 1
+    :type padding: int, optional
+    :param alignment: The multiple that glyph positions are rounded up to. Use the block size of `format` to stop glyphs sharing compression blocks. defaults to 1
+    :type alignment: int, optional
+    :param maxWidth: The maximum width of the AEI. defaults to roughly square
+    :type maxWidth: Optional[int], optional
+    :param index: The index of the font to use, in a font collection file. defaults to 0
+    :type index: int, optional
+    :param workers: The number of processes to rasterize with. defaults to the `ProcessPoolExecutor` default
+    :type workers: Optional[int], optional
+    :raises ValueError: If no characters are given, a character is not a single UTF-16 code unit, or the glyphs do not fit in the largest AEI
+    :raises OSError: If the font can't be read
+    :return: A new AEI, with a single symbol map holding every glyph
+    :rtype: AEI
+    """
+    if padding < 0:
+        raise ValueError(f"padding must not be negative, but {padding} was given")
+
+    glyphs = rasterizeGlyphs(font, size, characters, index, workers)
+    if not glyphs:
+        raise ValueError("No characters were given")
+
+    cells = list(glyphs.values())
+    positions, (width, height) = packShelves([(c.shape[1] + padding, c.shape[0] + padding) for c in cells], alignment, maxWidth)
+    if width > MAX_ATLAS_SIZE or height > MAX_ATLAS_SIZE:
+        raise ValueError(f"The glyphs need a {width}x{height} AEI, but AEIs can be at most {MAX_ATLAS_SIZE}x{MAX_ATLAS_SIZE}")
+
+    canvas = np.empty((height, width, 4), dtype=np.uint8)
+    canvas[..., :3] = colour
+    canvas[..., 3] = 0
+    symbols: Dict[str, Texture] = {}
+    for character, cell, (x, y) in zip(glyphs, cells, positions):
+        cellHeight, cellWidth = cell.shape
+        canvas[y : y + cellHeight, x : x + cellWidth, 3] = cell
+        symbols[character] = Texture(x, y, cellWidth, cellHeight)
+
+    aei = AEI.fromArray(canvas, format=format, quality=quality)
+    aei.fonts.append(symbols)
+    return aei
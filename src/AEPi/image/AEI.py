@@ -1,20 +1,91 @@
 import io
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, suppress
+from contextvars import copy_context
+from multiprocessing.shared_memory import SharedMemory
 from typing import Any, BinaryIO
 from os import PathLike
 from types import TracebackType
-from typing import Any, List, Optional, Set, Tuple, Type, TypeVar, Union, cast, overload
+from typing import Any, Dict, Iterable, List, Mapping, Literal, NamedTuple, Optional, Set, Tuple, Type, TypeVar, Union, overload
 from PIL import Image
-from contextlib import nullcontext
+import numpy as np
+import numpy.typing as npt
 
-from ..lib import imageOps
-from ..lib.binaryio import uint8, uint16, uint32, readUInt8, readUInt16, readUInt32
+from ..lib import imageOps, blockOps, metrics
+from ..lib.imageOps import AlphaUsage, MipmapFilter
+from ..lib.locking import ReadWriteLock, readLocked, writeLocked
 
-from ..constants import CompressionFormat, FILE_TYPE_HEADER, ENDIANNESS, CompressionQuality
+from ..constants import CompressionFormat, CompressionQuality
 from .. import codec
 from .texture import Texture
-from ..exceptions import UnsupportedAeiFeatureException, AeiReadException, AeiWriteException
+from .mipmap import Mipmap
+from .compressedAEI import CompressedAEI, READ_CHUNK_SIZE
+from ..exceptions import AeiReadException, AeiWriteException
+from ..instrumentation import phase
 
 TException = TypeVar("TException", bound=Exception)
+AutoFormat = Literal["auto"]
+
+ETC_FORMATS = {CompressionFormat.ETC1, CompressionFormat.ETC2}
+
+# Formats which `AEI.optimizeFormat` tries by default. Cube map formats are excluded
+OPTIMIZABLE_FORMATS = [
+    CompressionFormat.PVRTC12A,
+    CompressionFormat.PVRTC14A,
+    CompressionFormat.DXT1,
+    CompressionFormat.ETC1,
+    CompressionFormat.ETC2,
+    CompressionFormat.ATC,
+    CompressionFormat.DXT3,
+    CompressionFormat.DXT5,
+    CompressionFormat.Uncompressed_UI
+]
+
+
+class SizeEstimate(NamedTuple):
+    """The sizes of an AEI once encoded, as estimated by `AEI.estimate`.
+    All values are in bytes.
+    """
+    # The exact length of the compressed image content, including all mip levels
+    payloadBytes: int
+    # The exact length of the AEI file
+    fileBytes: int
+    # The estimated peak memory allocated by `AEI.read` while reading the file
+    readMemory: int
+    # The estimated peak memory allocated by `AEI.write` while writing the file to a `BytesIO`.
+    # Writing to a path allocates `fileBytes` less
+    writeMemory: int
+
+
+class EncodeTrial(NamedTuple):
+    """An AEI encoded in one format and quality, and the error introduced by the encode, as measured by `AEI.measureEncode`.
+    Error is measured between the AEI and its decoded encode, in RGBA.
+    """
+    # The encoded AEI, without mipmaps
+    compressed: CompressedAEI
+    # The PSNR of the whole AEI, in decibels
+    psnr: float
+    # The SSIM of the whole AEI
+    ssim: float
+    # The PSNR of each texture, in the order of `AEI.textures`
+    texturePsnr: List[float]
+    # The SSIM of each texture, in the order of `AEI.textures`
+    textureSsim: List[float]
+
+
+    def meets(self, minPsnr: Optional[float] = None, minSsim: Optional[float] = None) -> bool:
+        """Decide whether the whole AEI, and every texture, meet an error budget.
+
+        :param minPsnr: The lowest acceptable PSNR, in decibels. defaults to no limit
+        :type minPsnr: Optional[float], optional
+        :param minSsim: The lowest acceptable SSIM. defaults to no limit
+        :type minSsim: Optional[float], optional
+        :return: Whether the encode meets both limits
+        :rtype: bool
+        """
+        return (minPsnr is None or min([self.psnr, *self.texturePsnr]) >= minPsnr) \
+            and (minSsim is None or min([self.ssim, *self.textureSsim]) >= minSsim)
+
 
 class AEI:
     """An Abyss Engine Image file.
@@ -23,9 +94,12 @@ class AEI:
     The AEI shape is mutable, through the `shape` property.
     The coordinate origin (0, 0) is the top-left of the AEI.
 
-    An AEI can be constructed either with its dimensions, or with an image.
+    An AEI can be constructed either with its dimensions, with an image, or with a numpy array.
     If an image is used, the AEI is created with a copy of the image.
+    To avoid this copy, pass `copy=False`. The AEI will then share the image, and copy it only on first mutation.
+    If an array is used, the AEI shares memory with the array. See `AEI.fromArray`.
     `format` and `quality` can be set in the constructor, or on call of `AEI.write`.
+    `mipmapped` can be set on the AEI, or on call of `AEI.write`.
 
     Use the `addTexture` and `removeTexture` helper methods for texture management.
 
@@ -39,18 +113,40 @@ class AEI:
     def __init__(self, shape: Tuple[int, int], /, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None) -> None: ...
     
     @overload
-    def __init__(self, image: Image.Image, /, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None) -> None: ...
+    def __init__(self, image: Image.Image, /, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None, *, copy: bool = True) -> None: ...
 
-    def __init__(self, val1: Union[Image.Image, Tuple[int, int]], /, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None):
+    @overload
+    def __init__(self, array: npt.NDArray[np.uint8], /, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None) -> None: ...
+
+    def __init__(self, val1: Union[Image.Image, npt.NDArray[np.uint8], Tuple[int, int]], /, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None, *, copy: bool = True):
         self._textures: List[Texture] = []
         self._texturesWithoutImages: Set[Texture] = set()
         self.format = format
         self.quality: Optional[CompressionQuality] = quality
         self.fonts: list[dict[str, Texture]] = []
-
-        if isinstance(val1, Image.Image):
+        self.mipmapped: bool = False
+        self._mipmaps: List[Mipmap] = []
+        self._array: Optional[npt.NDArray[np.uint8]] = None
+        # True if self._image is owned by someone else, and must be copied before mutation
+        self._imageShared = False
+        # The shared memory block backing self._array, if any. Only the AEI which created the block frees it
+        self._sharedMemory: Optional[SharedMemory] = None
+        self._ownsSharedMemory = False
+        # Guards the image content and textures. getTexture can be called concurrently, while changes to textures are exclusive
+        self._lock = ReadWriteLock()
+
+        if isinstance(val1, np.ndarray):
+            self._image = imageOps.imageFromArray(val1)
+            # read-only arrays are copied by pillow on mutation, so can't be handed out as views
+            self._array = val1 if val1.flags.writeable else None
+            self._shape = self._image.size
+        elif isinstance(val1, Image.Image):
             self._shape = val1.size
-            self._image = val1.copy()
+            if copy:
+                self._image = val1.copy()
+            else:
+                self._image = val1
+                self._imageShared = True
         else:
             self._shape = val1
             self._image = Image.new("RGBA", self._shape)
@@ -67,6 +163,7 @@ class AEI:
     
 
     @shape.setter
+    @writeLocked
     def shape(self, value: Tuple[int, int]):
         widthShrunk = value[0] < self.shape[0]
         heightShrunk = value[1] < self.shape[1]
@@ -111,6 +208,18 @@ class AEI:
         return self._textures
     
 
+    @property
+    def mipmaps(self):
+        """The reduced-resolution levels of the mip chain that this AEI was read with, from level 1 downwards.
+        Mipmaps are decoded lazily, with `Mipmap.decode`.
+        These are not updated when the AEI is changed. On `write`, the mip chain is regenerated from the AEI's image content.
+
+        :return: The mipmaps of the AEI
+        :rtype: List[Mipmap]
+        """
+        return self._mipmaps
+    
+
     def _validateBoundingBox(self, val1: Union[Texture, int], y: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None) -> Tuple[int, int, int, int]:
         if isinstance(val1, Texture):
             y = val1.y
@@ -177,6 +286,7 @@ class AEI:
         :raises ValueError: If the bounding box falls out of bounds of the AEI
         """
 
+    @writeLocked
     def addTexture(self, val1: Union[Image.Image, Texture, int], val2: Optional[int] = None, val3: Optional[int] = None, val4: Optional[int] = None, /):
         if isinstance(val1, Texture):
             image = None
@@ -205,11 +315,13 @@ class AEI:
             if image.mode != "RGBA":
                 raise ValueError(f"image must be mode RGBA, but {image.mode} was given")
             
+            self._ensureImageOwned()
             self._image.paste(image, (texture.x, texture.y), image)
         
         self.textures.append(texture)
 
 
+    @writeLocked
     def replaceTexture(self, image: Image.Image, texture: Texture):
         """Replace a texture in this AEI.
         `image` is not retained, and can be closed after passing to this method without side effects.
@@ -232,6 +344,7 @@ class AEI:
         if image.mode != "RGBA":
             raise ValueError(f"image must be mode RGBA, but {image.mode} was given")
         
+        self._ensureImageOwned()
         self._image.paste(image, (texture.x, texture.y), image)
 
 
@@ -241,6 +354,7 @@ class AEI:
     @overload
     def removeTexture(self, x: int, y: int, width: int, height: int, /, *, clearImage: Optional[bool] = None) -> None: ...
 
+    @writeLocked
     def removeTexture(self, val1: Union[Texture, int], y: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, /, *, clearImage: Optional[bool] = None):
         """Remove a texture from this AEI, by its bounding box.
 
@@ -253,6 +367,7 @@ class AEI:
         
         if clearImage is not None and clearImage or clearImage is None and texture not in self._texturesWithoutImages:
             # Clear the area that the texture occupied
+            self._ensureImageOwned()
             self._image.paste(
                 (0, 0, 0, 0),
                 (texture.x, texture.y, texture.x + texture.width, texture.y + texture.height)
@@ -267,6 +382,7 @@ class AEI:
     @overload
     def getTexture(self, x: int, y: int, width: int, height: int, /) -> Image.Image: ...
 
+    @readLocked
     def getTexture(self, val1: Union[Texture, int], y: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, /) -> Image.Image:
         """Get a copy of the image defined by the provided bounding box.
 
@@ -280,235 +396,658 @@ class AEI:
 
 
     @classmethod
-    def read(cls, fp: Union[str, PathLike[Any], io.BytesIO]) -> "AEI":
+    def fromArray(cls, array: npt.NDArray[np.uint8], /, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None) -> "AEI":
+        """Create an AEI whose image content is backed by `array`, without copying.
+        Changes made to `array` are visible to the AEI (including `write`), and vice versa.
+        If `array` is read-only, the AEI will copy it on its first mutation.
+
+        :param array: The image content of the AEI, as a C-contiguous `(height, width, 4)` uint8 array in RGBA channel order
+        :type array: npt.NDArray[np.uint8]
+        :param format: The compression format. defaults to None
+        :type format: Optional[CompressionFormat], optional
+        :param quality: The compression quality. defaults to None
+        :type quality: Optional[CompressionQuality], optional
+        :raises ValueError: If `array` is not a C-contiguous `(height, width, 4)` uint8 array
+        :return: A new AEI sharing memory with `array`
+        :rtype: AEI
+        """
+        return cls(array, format=format, quality=quality)
+    
+
+    def _ensureImageOwned(self):
+        """Copy the image if it is shared, so that it can be mutated.
+        """
+        if self._imageShared:
+            self._image = self._image.copy()
+            self._imageShared = False
+
+
+    @writeLocked
+    def _ensureArrayBacked(self) -> npt.NDArray[np.uint8]:
+        if self._array is None:
+            array = imageOps.arrayFromImage(self._image)
+            if not self._imageShared:
+                self._image.close()
+            
+            self._image = imageOps.imageFromArray(array)
+            self._array = array
+            self._imageShared = False
+        
+        return self._array
+
+
+    @overload
+    def asArray(self, /) -> npt.NDArray[np.uint8]: ...
+
+    @overload
+    def asArray(self, texture: Texture, /) -> npt.NDArray[np.uint8]: ...
+
+    @overload
+    def asArray(self, x: int, y: int, width: int, height: int, /) -> npt.NDArray[np.uint8]: ...
+
+    def asArray(self, val1: Union[Texture, int, None] = None, y: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, /) -> npt.NDArray[np.uint8]:
+        """Get a writeable `(height, width, 4)` uint8 view of the AEI's image content, in RGBA channel order.
+        If a bounding box is given, the view covers only that region.
+        Changes made through the view are visible to the AEI (including `write`), and vice versa.
+
+        The first call may copy the image content into a new array, if the AEI was not created with `AEI.fromArray`.
+        Subsequent calls do not copy.
+
+        :returns: A view of the AEI's image content
+        :rtype: npt.NDArray[np.uint8]
+        :raises ValueError: The provided bounding box falls out of bounds of the AEI
+        """
+        # Converting to an array-backed image replaces it, so is done under the write lock
+        array = self._array if self._array is not None else self._ensureArrayBacked()
+        if val1 is None:
+            return array
+        
+        x, y, width, height = self._validateBoundingBox(val1, y, width, height)
+        return array[y : y + height, x : x + width]
+
+
+    @writeLocked
+    def share(self) -> str:
+        """Move the image content of this AEI into a new block of shared memory, so that other processes can read and write it without copying.
+        Once shared, pickling this AEI ships only its metadata and the name of the block, and unpickled copies attach to the same block.
+        Changes to image content made by any process are visible to all of them. Calling `share` on an AEI which is already shared does nothing.
+
+        The block is freed when this AEI is closed, so it must be kept open until every other process has finished with its copy.
+        Views from `asArray` keep the block mapped in this process until they are released.
+
+        :return: The name of the shared memory block
+        :rtype: str
+        """
+        if self._sharedMemory is not None:
+            return self._sharedMemory.name
+        
+        source = self._sourceArray()
+        block = SharedMemory(create=True, size=source.nbytes)
+        array: npt.NDArray[np.uint8] = np.ndarray(source.shape, dtype=np.uint8, buffer=block.buf)
+        array[...] = source
+
+        if not self._imageShared:
+            self._image.close()
+        
+        self._image = imageOps.imageFromArray(array)
+        self._array = array
+        self._imageShared = False
+        self._sharedMemory = block
+        self._ownsSharedMemory = True
+        return block.name
+
+
+    @property
+    def sharedMemoryName(self) -> Optional[str]:
+        """The name of the shared memory block holding this AEI's image content, if it has been shared with `share`.
+
+        :return: The name of the block, or `None` if the AEI is not shared
+        :rtype: Optional[str]
+        """
+        return None if self._sharedMemory is None else self._sharedMemory.name
+
+
+    @overload
+    def alphaUsage(self, /) -> AlphaUsage: ...
+
+    @overload
+    def alphaUsage(self, texture: Texture, /) -> AlphaUsage: ...
+
+    @overload
+    def alphaUsage(self, x: int, y: int, width: int, height: int, /) -> AlphaUsage: ...
+
+    @readLocked
+    def alphaUsage(self, val1: Union[Texture, int, None] = None, y: Optional[int] = None, width: Optional[int] = None, height: Optional[int] = None, /) -> AlphaUsage:
+        """Find how the AEI's image content, or a single region of it, uses its alpha channel.
+        The image is scanned in place. Only a region of an AEI which is not array-backed is copied.
+        See `imageOps.alphaUsage`.
+
+        :returns: `opaque`, `binary` or `graded`
+        :rtype: AlphaUsage
+        :raises ValueError: The provided bounding box falls out of bounds of the AEI
+        """
+        if self._array is not None:
+            return imageOps.alphaUsage(self.asArray(val1, y, width, height)) # type: ignore[reportCallIssue, reportArgumentType]
+        
+        if val1 is None:
+            return imageOps.alphaUsage(self._image)
+        
+        with self.getTexture(val1, y, width, height) as region: # type: ignore[reportCallIssue, reportArgumentType]
+            return imageOps.alphaUsage(region)
+
+
+    def _resolveFormat(self, format: Union[CompressionFormat, AutoFormat, None]) -> Optional[CompressionFormat]:
+        if format != "auto":
+            return format or self.format
+        
+        # Alpha is stored at full cost by DXT5, so is dropped when unused
+        if self.alphaUsage() == "opaque":
+            return CompressionFormat.ETC1 if self.format in ETC_FORMATS else CompressionFormat.DXT1
+        return CompressionFormat.DXT5
+
+
+    @classmethod
+    def read(cls, fp: Union[str, PathLike[Any], io.BytesIO], strict: bool = False) -> "AEI":
         """Read an AEI file from bytes, or a file.
         `fp` can be a path to a file, or an in-memory buffer containing the contents of an encoded AEI file, including metadata.
+        Reading stops at the end of the AEI, so `fp` may hold other data after it.
+
+        If the AEI is mipmapped, the reduced-resolution mip levels are not decoded. They are available through `AEI.mipmaps`.
 
         :param fp: The AEI itself, or a path to an AEI file on disk
         :type fp: Union[str, PathLike, io.BytesIO]
+        :param strict: Whether to reject any data following the AEI. defaults to False
+        :type strict: bool, optional
         :return: A new AEI file object, containing the decoded contents of `fp`
         :rtype: AEI
         """
-        if isinstance(fp, io.StringIO):
-            raise ValueError("fp must be of binary type, not StringIO")
-        
-        file: Union[io.BufferedReader, io.BytesIO]
+        return cls.fromCompressed(CompressedAEI.read(fp, strict))
+    
 
-        if tempFp := (not isinstance(fp, io.BytesIO)):
-            file = open(fp, "rb")
-        elif isinstance(fp, (str, PathLike)):
-            file = open(fp, mode="rb")
-        else:
-            file = fp
+    @classmethod
+    def fromCompressed(cls, compressed: CompressedAEI) -> "AEI":
+        """Decode the image content of an undecoded AEI.
+        Only the full-size image is decoded. Mip levels are available through `AEI.mipmaps`, and decoded lazily.
+
+        :param compressed: The undecoded AEI
+        :type compressed: CompressedAEI
+        :return: A new AEI file object, containing the decoded contents of `compressed`
+        :rtype: AEI
+        """
+        format = compressed.format
+        quality = compressed.quality
 
         try:
-            bFileType = file.read(len(FILE_TYPE_HEADER))
-            if bFileType != FILE_TYPE_HEADER:
-                raise ValueError(f"Given file is of unknown type '{str(bFileType, encoding='utf-8')}' expected '{str(FILE_TYPE_HEADER, encoding='utf-8')}'")
-
-            formatId = readUInt8(file, ENDIANNESS)
-            format, mipmapped = CompressionFormat.fromBinary(formatId)
-            # if mipmapped:
-            #     raise UnsupportedAeiFeatureException("Mipmapped textures")
+            imageContent = codec.decodeImage(compressed.mipmaps[0], format, compressed.width, compressed.height, quality)
+        except Exception as ex:
+            raise AeiReadException(None, ex) from ex
+        
+        # The decoded image is private to this AEI, so can be adopted outright
+        aei = AEI(imageContent, format=format, quality=quality, copy=False)
+        aei._imageShared = False
+        with phase("textures", 8 * len(compressed.textures)):
+            for tex in compressed.textures:
+                aei.addTexture(tex)
+        aei.fonts = compressed.fonts
+        aei.mipmapped = compressed.mipmapped
+        aei._mipmaps = [
+            Mipmap(level, w, h, format, mipCompressed, quality)
+            for level, ((w, h), mipCompressed) in enumerate(zip(compressed.mipmapShapes[1:], compressed.mipmaps[1:]), start=1)
+        ]
+
+        return aei
+    
+
+    @classmethod
+    def readMipmap(cls, fp: Union[str, PathLike[Any], io.BytesIO], level: int) -> Image.Image:
+        """Decode a single mip level of an AEI file, without decoding any other levels.
+        Level 0 is the full-size image. This is useful for creating previews of large AEIs.
+
+        :param fp: The AEI itself, or a path to an AEI file on disk
+        :type fp: Union[str, PathLike, io.BytesIO]
+        :param level: The mip level to decode
+        :type level: int
+        :return: The decoded mip level, in mode `format.pillowMode`
+        :rtype: Image.Image
+        :raises IndexError: If the AEI does not have mip level `level`
+        """
+        with CompressedAEI._openForRead(fp) as file:
+            try:
+                format, mipmapped, width, height, _ = CompressedAEI._readHeaderMeta(file)
+                codec.decompressorFor(format)
+
+                shapes = imageOps.mipmapShapes(width, height) if mipmapped else [(width, height)]
+                if not 0 <= level < len(shapes):
+                    raise IndexError(f"mip level {level} requested, but the AEI has {len(shapes)} levels")
+
+                compressed, quality = CompressedAEI._readMipLevel(file, format, shapes, level)
+
+            except IndexError:
+                raise
+
+            except Exception as ex:
+                raise AeiReadException(None, ex) from ex
             
-            imageCodec = codec.decompressorFor(format)
-
-            width = readUInt16(file, ENDIANNESS)
-            height = readUInt16(file, ENDIANNESS)
-            numTextures = readUInt16(file, ENDIANNESS)
-
-            textures: list[Texture] = []
-            for _ in range(numTextures):
-                x = readUInt16(file, ENDIANNESS)
-                y = readUInt16(file, ENDIANNESS)
-                w = readUInt16(file, ENDIANNESS)
-                h = readUInt16(file, ENDIANNESS)
-                textures.append(Texture(x, y, w, h))
-
-            if format.isCompressed:
-                imageLength = readUInt32(file, ENDIANNESS)
-            else:
-                imageLength = 4 * width * height
+        return codec.decodeImage(compressed, format, *shapes[level], quality)
+    
+
+    @classmethod
+    def thumbnail(cls, fp: Union[str, PathLike[Any], io.BytesIO], scale: int = 4) -> Image.Image:
+        """Create a reduced-resolution preview of an AEI file, as quickly as possible.
+        For block-compressed formats (see `blockOps.BLOCK_COLOUR_FORMATS`), the preview is approximated directly from
+        the colour endpoints of each compressed 4x4 block, without decoding the image.
+        If the AEI is mipmapped, the smallest suitable mip level is used.
+        Other formats are fully decoded, and then downscaled.
+
+        :param fp: The AEI itself, or a path to an AEI file on disk
+        :type fp: Union[str, PathLike, io.BytesIO]
+        :param scale: The factor by which to reduce the AEI's dimensions. Must be a multiple of 4. defaults to 4
+        :type scale: int
+        :return: An approximate, reduced-resolution RGB(A) image of the AEI
+        :rtype: Image.Image
+        :raises ValueError: If `scale` is not a positive multiple of 4
+        """
+        if scale < blockOps.BLOCK_SIZE or scale % blockOps.BLOCK_SIZE != 0:
+            raise ValueError(f"scale must be a positive multiple of {blockOps.BLOCK_SIZE}, but {scale} was given")
 
-            compressed = file.read(imageLength)
+        with CompressedAEI._openForRead(fp) as file:
+            try:
+                format, mipmapped, width, height, _ = CompressedAEI._readHeaderMeta(file)
+                if format.isCompressed and format not in blockOps.BLOCK_COLOUR_FORMATS:
+                    codec.decompressorFor(format)
 
-            fontsNum = readUInt16(file, ENDIANNESS)
-            fonts: list = []
+                shapes = imageOps.mipmapShapes(width, height) if mipmapped else [(width, height)]
+                # Each mip level halves the remaining scale, but at least one block's worth must remain
+                level = 0
+                while level + 1 < len(shapes) and scale % 2 ** (level + 1) == 0 and scale // 2 ** (level + 1) >= blockOps.BLOCK_SIZE:
+                    level += 1
 
-            for _ in range(fontsNum):
-                fontLen = readUInt16(file, ENDIANNESS)
-                font: dict[str,Texture] = {}
-                symbols: list[str] = []
-                for _ in range(fontLen):
-                    glyph = file.read(2).decode("utf-16le")
-                    symbols.append(glyph)
+                compressed, quality = CompressedAEI._readMipLevel(file, format, shapes, level)
 
-                for glyph in symbols:
-                    x = readUInt16(file, ENDIANNESS)
-                    y = readUInt16(file, ENDIANNESS)
-                    w = readUInt16(file, ENDIANNESS)
-                    h = readUInt16(file, ENDIANNESS)
-                    font[glyph] = Texture(x, y, w, h)
+            except Exception as ex:
+                raise AeiReadException(None, ex) from ex
+
+        levelWidth, levelHeight = shapes[level]
+        remainingScale = scale // 2 ** level
+
+        if format in blockOps.BLOCK_COLOUR_FORMATS:
+            im = Image.fromarray(blockOps.blockColours(compressed, format, levelWidth, levelHeight), "RGBA")
+            if format.isBgra:
+                with im:
+                    im = imageOps.switchRGBA_BGRA(im)
+            remainingScale //= blockOps.BLOCK_SIZE
+
+        elif not format.isCompressed:
+            pixels = np.frombuffer(compressed, dtype=np.uint8).reshape(levelHeight, levelWidth, 4)
+            im = Image.fromarray(np.ascontiguousarray(pixels[::remainingScale, ::remainingScale]), "RGBA")
+            remainingScale = 1
+
+        else:
+            im = codec.decodeImage(compressed, format, levelWidth, levelHeight, quality)
+
+        if remainingScale > 1:
+            with im:
+                im = im.reduce(remainingScale)
+
+        return im
+    
 
-                fonts.append(font)
+    @readLocked
+    def estimate(self, format: Union[CompressionFormat, AutoFormat, None] = None, quality: Optional[CompressionQuality] = None, mipmapped: Optional[bool] = None) -> SizeEstimate:
+        """Calculate the size of this AEI once encoded, and estimate the memory needed to read and write it, without encoding it.
+        Payload and file sizes are exact. Memory estimates count the images and buffers allocated by AEPi,
+        and assume that codecs allocate one RGBA copy of their input image. They do not include the AEI itself.
+
+        :param format: Override for the compression format, or "auto" to choose DXT1 or ETC1 if the AEI is fully opaque, and DXT5 otherwise. defaults to the setting on the AEI
+        :type format: Union[CompressionFormat, "auto", None], optional
+        :param quality: Override for the compression quality. defaults to the setting on the AEI
+        :type quality: Optional[CompressionQuality], optional
+        :param mipmapped: Override for whether to generate a mip chain. defaults to the setting on the AEI
+        :type mipmapped: Optional[bool], optional
+        :raises ValueError: If format is omitted and no format is set on the AEI
+        :raises ValueError: If mipmapping is requested, but `format` does not support mipmapping
+        :raises ValueError: If the bit count of `format` is unknown
+        :return: The estimated sizes
+        :rtype: SizeEstimate
+        """
+        format = self._resolveFormat(format)
+        quality = self.quality if quality is None else quality
+        mipmapped = self.mipmapped if mipmapped is None else mipmapped
+
+        if format is None:
+            raise ValueError("This AEI has no compression format specified. Set self.format, or specify the format in the format kwarg")
+        
+        if mipmapped and not format.supportsMipmapping:
+            raise ValueError(f"Compression format {format.name} does not support mipmapping")
         
-            # for i, font in enumerate(fonts):
-            #     print(font {i}.)
-            #     for key, value in font.items():
-            #         print(f" {key} {value}")
+        shapes = imageOps.mipmapShapes(self.width, self.height) if mipmapped else [self.shape]
+        levelLengths = [format.imageLength(w, h) for w, h in shapes]
+        payloadBytes = sum(levelLengths)
+
+        # Length prefixes only appear in compressed AEIs. AEIs must contain at least one texture
+        numTextures = max(1, len(self.textures)) if len(self.fonts) == 0 else len(self.textures)
+        fileBytes = CompressedAEI._headerLength(numTextures) \
+            + payloadBytes + (4 * len(shapes) if format.isCompressed else 0) \
+            + CompressedAEI._symbolsLength(self.fonts, quality)
+
+        bands = len(format.pillowMode)
+        converts = format.pillowMode != "RGBA"
+
+        def encodeMemory(w: int, h: int, imageLength: int) -> int:
+            # Intermediate images are all held until the compressor returns
+            blockWidth, blockHeight = format.blockShape
+            paddedArea = -(-w // blockWidth) * blockWidth * -(-h // blockHeight) * blockHeight
+            return (format.isBgra * 4 * w * h) \
+                + (converts * bands * w * h) \
+                + ((paddedArea != w * h) * bands * paddedArea) \
+                + 4 * paddedArea \
+                + imageLength
         
-            bQuality = readUInt8(file, ENDIANNESS, None)
-            quality = cast(Optional[CompressionQuality], bQuality) 
+        # Mip levels are downsampled from an array of the full-size image, and are encoded concurrently
+        mipMemory = 0
+        if mipmapped:
+            mipMemory = (self._array is None) * 4 * self.width * self.height + sum(4 * w * h for w, h in shapes[1:])
+        
+        writeMemory = mipMemory + sum(encodeMemory(w, h, n) for (w, h), n in zip(shapes, levelLengths)) + fileBytes
 
-            decompressed = imageCodec.decompress(compressed, format, width, height, quality)
+        # The parser buffers each section before copying it out, then the full-size image is decoded.
+        # Each conversion holds the old and new image at once
+        parseMemory = 2 * levelLengths[0] + READ_CHUNK_SIZE
+        decodedBytes = 4 * self.width * self.height
+        decodeMemory = decodedBytes + max(format.isBgra * decodedBytes, converts * bands * self.width * self.height)
+        readMemory = payloadBytes + max(parseMemory, decodeMemory)
 
-            if format.isBgra:
-                with decompressed:
-                    imageContent = imageOps.switchRGBA_BGRA(decompressed)
-            else:
-                imageContent = decompressed
+        return SizeEstimate(payloadBytes, fileBytes, readMemory, writeMemory)
 
-            if imageContent.mode != format.pillowMode:
-                with imageContent:
-                    imageContent = imageContent.convert(format.pillowMode)
 
-        except Exception as ex:
-            raise AeiReadException(None, ex) from ex
+    def measureEncode(self, format: Union[CompressionFormat, AutoFormat, None] = None, quality: Optional[CompressionQuality] = None) -> EncodeTrial:
+        """Encode this AEI without mipmaps, decode the result, and measure the PSNR and SSIM of the whole AEI and of each texture.
 
-        finally:
-            if tempFp:
-                file.close()
+        :param format: Override for the compression format, or "auto". defaults to the setting on the AEI
+        :type format: Union[CompressionFormat, "auto", None], optional
+        :param quality: Override for the compression quality. defaults to the setting on the AEI
+        :type quality: Optional[CompressionQuality], optional
+        :raises ValueError: If format is omitted and no format is set on the AEI
+        :raises UnsupportedCompressionFormatException: If no codec is loaded which can decompress `format`
+        :return: The encoded AEI, and its error
+        :rtype: EncodeTrial
+        """
+        return self._trialEncode(self._sourceArray(), format, quality)
+
+
+    def optimizeFormat(
+            self,
+            minPsnr: Optional[float] = None,
+            minSsim: Optional[float] = None,
+            formats: Optional[Iterable[CompressionFormat]] = None,
+            qualities: Optional[Iterable[Optional[CompressionQuality]]] = None
+        ) -> EncodeTrial:
+        """Find the format and quality with the smallest image content, whose encode meets an error budget for the whole AEI and every texture.
+        Every candidate is encoded and measured concurrently. Candidates of equal size are preferred in the order given.
+
+        :param minPsnr: The lowest acceptable PSNR, in decibels. defaults to no limit
+        :type minPsnr: Optional[float], optional
+        :param minSsim: The lowest acceptable SSIM. defaults to no limit
+        :type minSsim: Optional[float], optional
+        :param formats: The formats to try. defaults to every format in `OPTIMIZABLE_FORMATS` which can be both compressed and decompressed
+        :type formats: Optional[Iterable[CompressionFormat]], optional
+        :param qualities: The qualities to try with each format. defaults to the setting on the AEI
+        :type qualities: Optional[Iterable[Optional[CompressionQuality]]], optional
+        :raises ValueError: If neither `minPsnr` nor `minSsim` is given
+        :raises ValueError: If no candidate meets the error budget
+        :return: The smallest encode which meets the error budget
+        :rtype: EncodeTrial
+        """
+        if minPsnr is None and minSsim is None:
+            raise ValueError("At least one of minPsnr and minSsim must be given")
         
-        aei = AEI(imageContent, format=format, quality=quality)
-        for tex in textures:
-            aei.addTexture(tex)
-        aei.fonts = fonts
+        if formats is None:
+            formats = [f for f in OPTIMIZABLE_FORMATS if f in codec.compressors and f in codec.decompressors]
+        qualities = [self.quality] if qualities is None else list(qualities)
 
-        return aei
-    
+        candidates = sorted(
+            ((f, q) for f in formats for q in qualities),
+            key=lambda c: (c[0].imageLength(self.width, self.height), c[1] or 0)
+        )
 
-    def write(self, fp: Optional[BinaryIO] = None, format: Optional[CompressionFormat] = None, quality: Optional[CompressionQuality] = None) -> BinaryIO:
-        """Write this AEI to a BytesIO file.
+        source = self._sourceArray()
+        # Trial encodes are independent, so are run concurrently. Workers run in a copy of this context, for instrumentation
+        contexts = [copy_context() for _ in candidates]
+        with ThreadPoolExecutor() as executor:
+            trials = executor.map(lambda context, c: context.run(self._trialEncode, source, *c), contexts, candidates)
 
-        :param fp: Optional file to write to. If not given, a new one is created. defaults to None
-        :type fp: Optional[io.BytesIO], optional
-        :param format: Override for the compression format. defaults to the setting on the AEI
-        :type format: Optional[CompressionFormat], optional
+            for trial in trials:
+                if trial.meets(minPsnr, minSsim):
+                    return trial
+        
+        raise ValueError("No candidate format and quality meets the error budget")
+
+
+    def _sourceArray(self) -> npt.NDArray[np.uint8]:
+        return self._array if self._array is not None else imageOps.arrayFromImage(self._image)
+
+
+    def _trialEncode(self, source: npt.NDArray[np.uint8], format: Union[CompressionFormat, AutoFormat, None], quality: Optional[CompressionQuality]) -> EncodeTrial:
+        compressed = self.compress(format, quality, mipmapped=False)
+        with codec.decodeImage(compressed.mipmaps[0], compressed.format, self.width, self.height, compressed.quality) as im:
+            decoded = imageOps.arrayFromImage(im)
+        
+        texturePsnr: List[float] = []
+        textureSsim: List[float] = []
+        for texture in self.textures:
+            x, y, width, height = self._validateBoundingBox(texture)
+            region = (slice(max(0, y), y + height), slice(max(0, x), x + width))
+            texturePsnr.append(metrics.psnr(source[region], decoded[region]))
+            textureSsim.append(metrics.ssim(source[region], decoded[region]))
+        
+        return EncodeTrial(compressed, metrics.psnr(source, decoded), metrics.ssim(source, decoded), texturePsnr, textureSsim)
+
+
+    @readLocked
+    def compress(self, format: Union[CompressionFormat, AutoFormat, None] = None, quality: Optional[CompressionQuality] = None, mipmapped: Optional[bool] = None, mipmapFilter: MipmapFilter = "box") -> CompressedAEI:
+        """Encode the image content of this AEI, without writing it to a file.
+
+        :param format: Override for the compression format, or "auto" to choose DXT1 or ETC1 if the AEI is fully opaque, and DXT5 otherwise. defaults to the setting on the AEI
+        :type format: Union[CompressionFormat, "auto", None], optional
         :param quality: Override for the compression quality. defaults to the setting on the AEI
         :type quality: Optional[CompressionQuality], optional
+        :param mipmapped: Override for whether to generate a mip chain. defaults to the setting on the AEI
+        :type mipmapped: Optional[bool], optional
+        :param mipmapFilter: The downsampling filter used to generate the mip chain. defaults to "box"
+        :type mipmapFilter: MipmapFilter, optional
         :raises ValueError: If format is omitted and no format is set on the AEI
-        :raises ValueError: If the AEI has no textures
-        :return: A file containing the AEI, including the compressed image and full metadata
-        :rtype: io.BytesIO
+        :raises ValueError: If mipmapping is requested, but `format` does not support mipmapping
+        :return: The AEI, with its image content compressed
+        :rtype: CompressedAEI
         """
-        format = format or self.format
+        format = self._resolveFormat(format)
         quality = self.quality if quality is None else quality
+        mipmapped = self.mipmapped if mipmapped is None else mipmapped
 
         if format is None:
             raise ValueError("This AEI has no compression format specified. Set self.format, or specify the format in the self.toFile.format kwarg")
-
-        fp = io.BytesIO() if fp is None else fp
+        
+        if mipmapped and not format.supportsMipmapping:
+            raise ValueError(f"Compression format {format.name} does not support mipmapping")
 
         # AEIs must contain at least one texture
-        if tempTexture := (len(self.textures) == 0 and len(self.fonts) == 0):
-            self.addTexture(Texture(0, 0, self.width, self.height))
+        textures = list(self.textures)
+        if len(textures) == 0 and len(self.fonts) == 0:
+            textures.append(Texture(0, 0, self.width, self.height))
 
         try:
-            self._writeHeaderMeta(fp, format)
-            self._writeImageContent(fp, format, quality)
-            self._writeSymbols(fp)
-            self._writeFooterMeta(fp, quality)
+            if mipmapped:
+                mipmaps = self._encodeMany([format], quality, True, mipmapFilter)[format]
+            else:
+                mipmaps = [codec.encodeImage(self._image, format, quality)]
 
         except Exception as ex:
             raise AeiWriteException(None, ex) from ex
-        
-        finally:
-            if tempTexture:
-                self.removeTexture(0, 0, self.width, self.height)
 
-        return fp
-    
-#region write-util
-    
-    def _writeHeaderMeta(self, fp: BinaryIO, format: CompressionFormat):
-        fp.write(FILE_TYPE_HEADER)
-        fp.write(uint8(format.value, ENDIANNESS))
-
-        def writeUInt16(*values: int):
-            for v in values:
-                fp.write(uint16(v, ENDIANNESS))
-
-        # AEI dimensions and texture count
-        writeUInt16(
-            self.width,
-            self.height,
-            len(self.textures)
-        )
+        return CompressedAEI(format, self.width, self.height, mipmaps, textures, list(self.fonts), quality, mipmapped)
 
-        # texture bounding boxes
-        for texture in self.textures:
-            writeUInt16(
-                texture.x,
-                texture.y,
-                texture.width,
-                texture.height
-            )
-    
 
-    def _writeImageContent(self, fp: BinaryIO, format: CompressionFormat, quality: Optional[CompressionQuality]):
-        imageCodec = codec.compressorFor(format)
-
-        if format.isBgra:
-            imageContent = imageOps.switchRGBA_BGRA(self._image)
-            ctx = imageContent
-        else:
-            imageContent = self._image
-            ctx = nullcontext()
+    @overload
+    def write(self, fp: Optional[BinaryIO] = None, format: Union[CompressionFormat, AutoFormat, None] = None, quality: Optional[CompressionQuality] = None, mipmapped: Optional[bool] = None, mipmapFilter: MipmapFilter = "box") -> BinaryIO:
+        """Write this AEI to a BytesIO file.
 
-        with ctx:
-            if imageContent.mode != format.pillowMode:
-                imageContent = imageContent.convert(format.pillowMode)
-                ctx = imageContent
-            else:
-                ctx = nullcontext()
+        :param fp: Optional file to write to. If not given, a new one is created. defaults to None
+        :type fp: Optional[io.BytesIO], optional
+        :param format: Override for the compression format, or "auto" to choose DXT1 or ETC1 if the AEI is fully opaque, and DXT5 otherwise. defaults to the setting on the AEI
+        :type format: Union[CompressionFormat, "auto", None], optional
+        :param quality: Override for the compression quality. defaults to the setting on the AEI
+        :type quality: Optional[CompressionQuality], optional
+        :param mipmapped: Override for whether to generate and write a mip chain. defaults to the setting on the AEI
+        :type mipmapped: Optional[bool], optional
+        :param mipmapFilter: The downsampling filter used to generate the mip chain. defaults to "box"
+        :type mipmapFilter: MipmapFilter, optional
+        :raises ValueError: If format is omitted and no format is set on the AEI
+        :raises ValueError: If mipmapping is requested, but `format` does not support mipmapping
+        :return: A file containing the AEI, including the compressed image and full metadata
+        :rtype: io.BytesIO
+        """
 
-            with ctx:
-                compressed = imageCodec.compress(imageContent, format, quality)
+    @overload
+    def write(self, fp: Union[str, PathLike[Any]], format: Union[CompressionFormat, AutoFormat, None] = None, quality: Optional[CompressionQuality] = None, mipmapped: Optional[bool] = None, mipmapFilter: MipmapFilter = "box") -> None:
+        """Write this AEI to a file on disk.
+        The AEI is written without an intermediate in-memory copy of the file, and `fp` is replaced atomically.
+
+        :param fp: The path to write to
+        :type fp: Union[str, PathLike]
+        :param format: Override for the compression format, or "auto" to choose DXT1 or ETC1 if the AEI is fully opaque, and DXT5 otherwise. defaults to the setting on the AEI
+        :type format: Union[CompressionFormat, "auto", None], optional
+        :param quality: Override for the compression quality. defaults to the setting on the AEI
+        :type quality: Optional[CompressionQuality], optional
+        :param mipmapped: Override for whether to generate and write a mip chain. defaults to the setting on the AEI
+        :type mipmapped: Optional[bool], optional
+        :param mipmapFilter: The downsampling filter used to generate the mip chain. defaults to "box"
+        :type mipmapFilter: MipmapFilter, optional
+        :raises ValueError: If format is omitted and no format is set on the AEI
+        :raises ValueError: If mipmapping is requested, but `format` does not support mipmapping
+        """
 
-        # image length only appears in compressed AEIs
-        if format.isCompressed:
-            fp.write(uint32(len(compressed), ENDIANNESS))
+    def write(self, fp: Union[str, PathLike[Any], BinaryIO, None] = None, format: Union[CompressionFormat, AutoFormat, None] = None, quality: Optional[CompressionQuality] = None, mipmapped: Optional[bool] = None, mipmapFilter: MipmapFilter = "box") -> Optional[BinaryIO]:
+        return self.compress(format, quality, mipmapped, mipmapFilter).write(fp)
+    
 
-        fp.write(compressed)
+    @readLocked
+    def writeMany(
+            self,
+            targets: Mapping[CompressionFormat, Union[str, PathLike[Any], BinaryIO, None]],
+            quality: Optional[CompressionQuality] = None,
+            mipmapped: Optional[bool] = None,
+            mipmapFilter: MipmapFilter = "box"
+        ) -> Dict[CompressionFormat, Optional[BinaryIO]]:
+        """Encode this AEI into several formats, and write each to its own file.
+        The mip chain is generated once, channel swapping, mode conversion and padding are shared between formats with the same pixel layout,
+        and every format and mip level is compressed concurrently. No file is written unless every format encodes successfully.
+
+        ```py
+        aei.writeMany({
+            CompressionFormat.DXT5: "pc/atlas.aei",
+            CompressionFormat.ETC1: "android/atlas.aei",
+            CompressionFormat.Uncompressed_UI: None
+        })
+        ```
+
+        :param targets: The file to write each format to, as accepted by `write`. `None` writes to a new BytesIO
+        :type targets: Mapping[CompressionFormat, Union[str, PathLike, BinaryIO, None]]
+        :param quality: Override for the compression quality. defaults to the setting on the AEI
+        :type quality: Optional[CompressionQuality], optional
+        :param mipmapped: Override for whether to generate and write a mip chain. defaults to the setting on the AEI
+        :type mipmapped: Optional[bool], optional
+        :param mipmapFilter: The downsampling filter used to generate the mip chain. defaults to "box"
+        :type mipmapFilter: MipmapFilter, optional
+        :raises ValueError: If mipmapping is requested, but a format does not support mipmapping
+        :raises AeiWriteException: If any format fails to encode
+        :return: The result of `write` for each format: the written file, or `None` for paths
+        :rtype: Dict[CompressionFormat, Optional[BinaryIO]]
+        """
+        quality = self.quality if quality is None else quality
+        mipmapped = self.mipmapped if mipmapped is None else mipmapped
 
+        for format in targets:
+            if mipmapped and not format.supportsMipmapping:
+                raise ValueError(f"Compression format {format.name} does not support mipmapping")
 
-    def _writeSymbols(self, fp: BinaryIO):
-        fp.write(uint16(len(self.fonts), ENDIANNESS)) # number of symbol groups
-        
-        for font in self.fonts:
-            symbols = io.BytesIO()
-            glyphs = io.BytesIO()
-            for s, g in font.items():
-                symbols.write(s.encode("utf-16le"))
-                glyphs.write(uint16(g.x,      ENDIANNESS))
-                glyphs.write(uint16(g.y,      ENDIANNESS))
-                glyphs.write(uint16(g.width,  ENDIANNESS))
-                glyphs.write(uint16(g.height, ENDIANNESS))
-            
-            fp.write(uint16(len(font), ENDIANNESS))
-            fp.write(symbols.getvalue())
-            fp.write(glyphs.getvalue())
+        try:
+            encoded = self._encodeMany(list(targets), quality, mipmapped, mipmapFilter)
+        except Exception as ex:
+            raise AeiWriteException(None, ex) from ex
 
-    def _writeFooterMeta(self, fp: BinaryIO, quality: Optional[CompressionQuality]):
-        if quality is not None:
-            fp.write(uint8(quality, ENDIANNESS))
+        textures = list(self.textures)
+        if len(textures) == 0 and len(self.fonts) == 0:
+            textures.append(Texture(0, 0, self.width, self.height))
 
-#endregion write-util
+        return {
+            format: CompressedAEI(format, self.width, self.height, encoded[format], textures, list(self.fonts), quality, mipmapped).write(fp)
+            for format, fp in targets.items()
+        }
+    
 
+    def _encodeMany(self, formats: List[CompressionFormat], quality: Optional[CompressionQuality], mipmapped: bool, mipmapFilter: MipmapFilter) -> Dict[CompressionFormat, List[bytes]]:
+        images = [self._image]
+        if mipmapped:
+            base = self._array if self._array is not None else imageOps.arrayFromImage(self._image)
+            levels = [base]
+            for _ in imageOps.mipmapShapes(base.shape[1], base.shape[0])[1:]:
+                levels.append(imageOps.downsample(levels[-1], mipmapFilter))
+            images += [imageOps.imageFromArray(level) for level in levels[1:]]
+
+        for format in formats:
+            codec.compressorFor(format)
+
+        with ExitStack() as stack:
+            # Formats with the same pixel layout share one conversion of each level
+            prepared: Dict[Tuple[bool, str, Optional[Tuple[int, int]]], List[Image.Image]] = {}
+            for format in formats:
+                layout = codec.pixelLayout(format)
+                if layout not in prepared:
+                    prepared[layout] = [codec.prepareImage(im, format) for im in images]
+                    for original, converted in zip(images, prepared[layout]):
+                        if converted is not original:
+                            stack.callback(converted.close)
+
+            tasks = [(format, im) for format in formats for im in prepared[codec.pixelLayout(format)]]
+            # Each format and level is independent once converted, so all are compressed concurrently.
+            # Workers run in a copy of this context, so that instrumentation is collected from them
+            contexts = [copy_context() for _ in tasks]
+            with ThreadPoolExecutor() as executor:
+                results = iter(executor.map(lambda context, task: context.run(codec.encodePrepared, task[1], task[0], quality), contexts, tasks))
+                return {format: [next(results) for _ in images] for format in formats}
+
+
+    @writeLocked
     def close(self):
         """Close the underlying image.
+        Shared images are not closed, as they are owned by the caller.
+        If this AEI created a shared memory block with `share`, the block is freed.
+        """
+        if not self._imageShared:
+            self._image.close()
+
+        self._array = None
+        if self._sharedMemory is not None:
+            # The block stays mapped while views from asArray are alive, but can always be unlinked
+            with suppress(BufferError):
+                self._sharedMemory.close()
+            if self._ownsSharedMemory:
+                self._sharedMemory.unlink()
+            self._sharedMemory = None
+
+
+    @readLocked
+    def __reduce__(self):
+        """Pickle this AEI as its metadata, plus either the name of its shared memory block, or its image content as an RGBA array.
         """
-        self._image.close()
+        state = (self._shape, self.format, self.quality, self.mipmapped, self._textures, self._texturesWithoutImages, self.fonts, self._mipmaps)
+        if self._sharedMemory is not None:
+            return (_attachShared, (self._sharedMemory.name, self._image.size, state))
+        return (_fromPickledArray, (self._sourceArray(), state))
+
+
+    def _restoreState(self, state: Tuple[Any, ...]):
+        self._shape, self.format, self.quality, self.mipmapped, self._textures, self._texturesWithoutImages, self.fonts, self._mipmaps = state
 
 
     def __enter__(self):
@@ -524,3 +1063,19 @@ class AEI:
             self.close()
         except:
             pass
+
+
+def _fromPickledArray(array: npt.NDArray[np.uint8], state: Tuple[Any, ...]) -> AEI:
+    aei = AEI.fromArray(array)
+    aei._restoreState(state) # type: ignore[reportPrivateUsage]
+    return aei
+
+
+def _attachShared(name: str, size: Tuple[int, int], state: Tuple[Any, ...]) -> AEI:
+    block = SharedMemory(name)
+    array: npt.NDArray[np.uint8] = np.ndarray((size[1], size[0], 4), dtype=np.uint8, buffer=block.buf)
+    aei = AEI.fromArray(array)
+    # Attached copies leave the block for its creator to free
+    aei._sharedMemory = block # type: ignore[reportPrivateUsage]
+    aei._restoreState(state) # type: ignore[reportPrivateUsage]
+    return aei
@@ -1,4 +1,8 @@
 from .texture import Texture
-from .AEI import AEI
+from .mipmap import Mipmap
+from .parser import AeiParser
+from .compressedAEI import CompressedAEI, AeiMetadata
+from .AEI import AEI, SizeEstimate, EncodeTrial
+from .cubeMap import CubeMap, CubeFace, CUBE_FACES
 
-__all__ = ["Texture", "AEI"]
\ No newline at end of file
+__all__ = ["Texture", "Mipmap", "AeiParser", "CompressedAEI", "AeiMetadata", "AEI", "SizeEstimate", "EncodeTrial", "CubeMap", "CubeFace", "CUBE_FACES"]
\ No newline at end of file
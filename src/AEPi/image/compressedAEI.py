@@ -0,0 +1,535 @@
+import io
+import os
+from mmap import mmap
+from contextlib import contextmanager, suppress
+from os import PathLike
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union, cast, overload
+
+from ..lib import imageOps
+from ..lib.binaryio import readUInt8, readUInt16, readUInt32
+from ..constants import CompressionFormat, FILE_TYPE_HEADER, ENDIANNESS, MASK_MIPMAPPED_FLAG, CompressionQuality
+from ..exceptions import AeiReadException, AeiWriteException
+from ..instrumentation import phase
+from .texture import Texture
+from .parser import AeiParser, AeiEvent, HeaderEvent, TexturesEvent, PayloadEvent, FontEvent, _HEADER, _UINT16, _UINT32, _BOX, _validateImageLength
+
+# The size of each read from AEI files
+READ_CHUNK_SIZE = 1024 * 1024
+
+# The most buffers that os.writev accepts in one call, on all platforms which support it
+_IOV_MAX = 1024
+# Flags for creating temporary files in `_atomicFile`. O_BINARY only exists on Windows
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+
+
+class AeiMetadata(NamedTuple):
+    """The contents of an AEI file other than its image content, as read by `CompressedAEI.readMetadata`.
+    """
+    format: CompressionFormat
+    mipmapped: bool
+    width: int
+    height: int
+    textures: List[Texture]
+    fonts: List[Dict[str, Texture]]
+    quality: Optional[CompressionQuality]
+    # The length of the image content of each mip level, in bytes. Level 0 is the full-size image
+    imageLengths: List[int]
+
+
+class CompressedAEI:
+    """The undecoded contents of an AEI file.
+    Image content is kept exactly as it is stored in the file, compressed in `format`.
+    This is useful for inspecting or re-packaging AEIs without decoding them.
+
+    To decode into an `AEI`, use `AEI.fromCompressed`. To encode an `AEI`, use `AEI.compress`.
+
+    :var CompressionFormat format: The compression format of the image content
+    :var int width: The width of the AEI, in pixels
+    :var int height: The height of the AEI, in pixels
+    :var List[bytes] mipmaps: The compressed image content of each mip level. Level 0 is the full-size image
+    :var bool mipmapped: Whether the AEI has a mip chain. If so, `mipmaps` has an entry for every level of `mipmapShapes`
+    :var List[Texture] textures: The texture bounding boxes
+    :var List[Dict[str, Texture]] fonts: The symbol maps
+    :var Optional[CompressionQuality] quality: The compression quality
+    """
+    def __init__(
+            self,
+            format: CompressionFormat,
+            width: int,
+            height: int,
+            mipmaps: List[bytes],
+            textures: Optional[List[Texture]] = None,
+            fonts: Optional[List[Dict[str, Texture]]] = None,
+            quality: Optional[CompressionQuality] = None,
+            mipmapped: bool = False
+        ) -> None:
+        self.format = format
+        self.width = width
+        self.height = height
+        self.mipmaps = mipmaps
+        self.textures: List[Texture] = [] if textures is None else textures
+        self.fonts: List[Dict[str, Texture]] = [] if fonts is None else fonts
+        self.quality: Optional[CompressionQuality] = quality
+        self.mipmapped = mipmapped
+
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """The dimensions of the AEI, in pixels.
+
+        :return: (width, height)
+        :rtype: Tuple[int, int]
+        """
+        return (self.width, self.height)
+
+
+    @property
+    def mipmapShapes(self) -> List[Tuple[int, int]]:
+        """The dimensions of each mip level, in pixels. Level 0 is the full-size image.
+
+        :return: The (width, height) of each mip level
+        :rtype: List[Tuple[int, int]]
+        """
+        if self.mipmapped:
+            return imageOps.mipmapShapes(self.width, self.height)
+        return [self.shape]
+
+
+    @classmethod
+    @contextmanager
+    def _openForRead(cls, fp: Union[str, PathLike[Any], BinaryIO]) -> Iterator[BinaryIO]:
+        if isinstance(fp, io.StringIO):
+            raise ValueError("fp must be of binary type, not StringIO")
+
+        if isinstance(fp, (str, PathLike)):
+            with open(fp, "rb") as file:
+                yield file
+        else:
+            yield fp
+
+#region read-util
+
+    @classmethod
+    def _readHeaderMeta(cls, file: BinaryIO) -> Tuple[CompressionFormat, bool, int, int, List[Texture]]:
+        bFileType = file.read(len(FILE_TYPE_HEADER))
+        if bFileType != FILE_TYPE_HEADER:
+            raise ValueError(f"Given file is of unknown type '{str(bFileType, encoding='utf-8')}' expected '{str(FILE_TYPE_HEADER, encoding='utf-8')}'")
+
+        formatId = readUInt8(file, ENDIANNESS)
+        format, mipmapped = CompressionFormat.fromBinary(formatId)
+
+        width = readUInt16(file, ENDIANNESS)
+        height = readUInt16(file, ENDIANNESS)
+        numTextures = readUInt16(file, ENDIANNESS)
+
+        textures: list[Texture] = []
+        for _ in range(numTextures):
+            x = readUInt16(file, ENDIANNESS)
+            y = readUInt16(file, ENDIANNESS)
+            w = readUInt16(file, ENDIANNESS)
+            h = readUInt16(file, ENDIANNESS)
+            textures.append(Texture(x, y, w, h))
+
+        return format, mipmapped, width, height, textures
+
+
+    @classmethod
+    def _readImageLength(cls, file: BinaryIO, format: CompressionFormat, level: int, width: int, height: int) -> int:
+        # image length only appears in compressed AEIs
+        if format.isCompressed:
+            imageLength = readUInt32(file, ENDIANNESS)
+            _validateImageLength(format, level, width, height, imageLength)
+            return imageLength
+        return 4 * width * height
+
+
+    @classmethod
+    def _readImageContent(cls, file: BinaryIO, format: CompressionFormat, level: int, width: int, height: int) -> bytes:
+        imageLength = cls._readImageLength(file, format, level, width, height)
+        return file.read(imageLength)
+
+
+    @classmethod
+    def _skipImageContent(cls, file: BinaryIO, format: CompressionFormat, level: int, width: int, height: int):
+        imageLength = cls._readImageLength(file, format, level, width, height)
+        cls._skipBytes(file, imageLength)
+
+
+    @classmethod
+    def _skipBytes(cls, file: BinaryIO, length: int):
+        if file.seekable():
+            file.seek(length, io.SEEK_CUR)
+        else:
+            file.read(length)
+
+
+    @classmethod
+    def _feedImageContent(cls, file: BinaryIO, length: int, onImageContent: Callable[[bytes], Any]):
+        # Image content is read in chunks, so that large payloads are never held in memory at once
+        while length > 0:
+            chunk = file.read(min(length, READ_CHUNK_SIZE))
+            if not chunk:
+                raise ValueError("The AEI ended unexpectedly")
+            onImageContent(chunk)
+            length -= len(chunk)
+
+
+    @classmethod
+    def _readSymbols(cls, file: BinaryIO) -> List[Dict[str, Texture]]:
+        fontsNum = readUInt16(file, ENDIANNESS)
+        fonts: list[dict[str, Texture]] = []
+
+        for _ in range(fontsNum):
+            fontLen = readUInt16(file, ENDIANNESS)
+            font: dict[str,Texture] = {}
+            symbols: list[str] = []
+            for _ in range(fontLen):
+                glyph = file.read(2).decode("utf-16le")
+                symbols.append(glyph)
+
+            for glyph in symbols:
+                x = readUInt16(file, ENDIANNESS)
+                y = readUInt16(file, ENDIANNESS)
+                w = readUInt16(file, ENDIANNESS)
+                h = readUInt16(file, ENDIANNESS)
+                font[glyph] = Texture(x, y, w, h)
+
+            fonts.append(font)
+
+        return fonts
+
+
+    @classmethod
+    def _readFooterMeta(cls, file: BinaryIO) -> Optional[CompressionQuality]:
+        bQuality = readUInt8(file, ENDIANNESS, None)
+        return cast(Optional[CompressionQuality], bQuality)
+
+
+    @classmethod
+    def _readMipLevel(cls, file: BinaryIO, format: CompressionFormat, shapes: List[Tuple[int, int]], level: int) -> Tuple[bytes, Optional[CompressionQuality]]:
+        # Read the image content of a single mip level, skipping all others
+        compressed = b""
+        for i, (w, h) in enumerate(shapes):
+            if i == level:
+                compressed = cls._readImageContent(file, format, i, w, h)
+            else:
+                cls._skipImageContent(file, format, i, w, h)
+
+        cls._readSymbols(file)
+        return compressed, cls._readFooterMeta(file)
+
+#endregion read-util
+
+    @classmethod
+    def readMetadata(cls, fp: Union[str, PathLike[Any], BinaryIO], onImageContent: Optional[Callable[[bytes], Any]] = None) -> "AeiMetadata":
+        """Read the metadata of an AEI file, without reading its image content.
+        Image content is skipped by seeking, if `fp` is seekable.
+        This is much faster than `read` for inspecting or indexing many AEIs.
+
+        If `onImageContent` is given, the image content is instead read in chunks, and each chunk is passed to `onImageContent` in file order.
+        This allows hashing image content without holding it in memory:
+
+        ```py
+        payloadHash = hashlib.blake2b()
+        metadata = CompressedAEI.readMetadata("my.aei", payloadHash.update)
+        ```
+
+        :param fp: The AEI itself, or a path to an AEI file on disk
+        :type fp: Union[str, PathLike, BinaryIO]
+        :param onImageContent: Called with each chunk of image content. defaults to None
+        :type onImageContent: Optional[Callable[[bytes], Any]], optional
+        :raises AeiReadException: If the AEI is malformed
+        :return: The metadata of `fp`
+        :rtype: AeiMetadata
+        """
+        try:
+            with cls._openForRead(fp) as file:
+                format, mipmapped, width, height, textures = cls._readHeaderMeta(file)
+                shapes = imageOps.mipmapShapes(width, height) if mipmapped else [(width, height)]
+
+                imageLengths: List[int] = []
+                for level, (w, h) in enumerate(shapes):
+                    imageLength = cls._readImageLength(file, format, level, w, h)
+                    if onImageContent is None:
+                        cls._skipBytes(file, imageLength)
+                    else:
+                        cls._feedImageContent(file, imageLength, onImageContent)
+                    imageLengths.append(imageLength)
+
+                fonts = cls._readSymbols(file)
+                quality = cls._readFooterMeta(file)
+
+        except Exception as ex:
+            raise AeiReadException(None, ex) from ex
+
+        return AeiMetadata(format, mipmapped, width, height, textures, fonts, quality, imageLengths)
+
+
+    @classmethod
+    def read(cls, fp: Union[str, PathLike[Any], BinaryIO], strict: bool = False) -> "CompressedAEI":
+        """Read an AEI file from bytes, or a file, without decoding its image content.
+        `fp` is read sequentially, and so does not need to be seekable.
+        Reading stops at the end of the AEI, so an AEI can be read from within a larger file, which is left positioned after the AEI.
+
+        :param fp: The AEI itself, or a path to an AEI file on disk
+        :type fp: Union[str, PathLike, BinaryIO]
+        :param strict: Whether to read `fp` to its end, and reject any data following the AEI. defaults to False
+        :type strict: bool, optional
+        :return: The undecoded contents of `fp`
+        :rtype: CompressedAEI
+        """
+        parser = AeiParser(strict)
+        with cls._openForRead(fp) as file:
+            try:
+                events: List[AeiEvent] = []
+                while parser.bytesNeeded or strict:
+                    with phase("read") as timing:
+                        chunk = file.read(READ_CHUNK_SIZE if strict else min(parser.bytesNeeded, READ_CHUNK_SIZE))
+                        if timing is not None:
+                            timing.bytes = len(chunk)
+                    if not chunk:
+                        break
+                    events += parser.feed(chunk)
+                events += parser.close()
+            except Exception as ex:
+                raise AeiReadException(None, ex) from ex
+
+        return cls._fromEvents(events)
+
+
+    @classmethod
+    def fromChunks(cls, chunks: Iterable[bytes], strict: bool = False) -> "CompressedAEI":
+        """Read an AEI file from a stream of byte chunks of any size, such as from a pipe or socket, without decoding its image content.
+        No more chunks are taken once the AEI is complete.
+        To handle each section of the AEI as soon as it arrives, use `AeiParser` directly.
+
+        :param chunks: The contents of the AEI file, in order
+        :type chunks: Iterable[bytes]
+        :param strict: Whether to take every chunk, and reject any data following the AEI. defaults to False
+        :type strict: bool, optional
+        :return: The undecoded contents of `chunks`
+        :rtype: CompressedAEI
+        """
+        parser = AeiParser(strict)
+        try:
+            events: List[AeiEvent] = []
+            for chunk in chunks:
+                events += parser.feed(chunk)
+                if not (parser.bytesNeeded or strict):
+                    break
+            events += parser.close()
+        except Exception as ex:
+            raise AeiReadException(None, ex) from ex
+
+        return cls._fromEvents(events)
+
+
+    @classmethod
+    def fromBuffer(cls, buffer: Union[bytes, bytearray, memoryview, mmap], strict: bool = False) -> "CompressedAEI":
+        """Read an AEI file held in memory, such as a memory-mapped file, without copying its image content.
+        Each entry of `mipmaps` is a read-only memoryview of `buffer`, so `buffer` must not be altered while the AEI is in use.
+
+        :param buffer: The contents of the AEI file, which may be followed by other data
+        :type buffer: Union[bytes, bytearray, memoryview, mmap]
+        :param strict: Whether to reject any data following the AEI. defaults to False
+        :type strict: bool, optional
+        :return: The undecoded contents of `buffer`
+        :rtype: CompressedAEI
+        """
+        try:
+            events = AeiParser.parseBuffer(buffer, strict)
+        except Exception as ex:
+            raise AeiReadException(None, ex) from ex
+
+        return cls._fromEvents(events)
+
+
+    @classmethod
+    def _fromEvents(cls, events: Iterable[AeiEvent]) -> "CompressedAEI":
+        mipmaps: List[bytes] = []
+        fonts: List[Dict[str, Texture]] = []
+        for event in events:
+            if isinstance(event, HeaderEvent):
+                header = event
+            elif isinstance(event, TexturesEvent):
+                textures = event.textures
+            elif isinstance(event, PayloadEvent):
+                mipmaps.append(event.compressed)
+            elif isinstance(event, FontEvent):
+                fonts.append(event.font)
+            else:
+                quality = event.quality
+
+        return CompressedAEI(header.format, header.width, header.height, mipmaps, textures, fonts, quality, header.mipmapped) # type: ignore[reportPossiblyUnbound]
+
+
+    @overload
+    def write(self, fp: Optional[BinaryIO] = None) -> BinaryIO:
+        """Write this AEI to a BytesIO file, exactly as stored.
+
+        :param fp: Optional file to write to. If not given, a new one is created. defaults to None
+        :type fp: Optional[io.BytesIO], optional
+        :raises ValueError: If the AEI is mipmapped, but `format` does not support mipmapping
+        :raises ValueError: If the number of mip levels in `mipmaps` is incorrect
+        :return: A file containing the AEI, including the compressed image and full metadata
+        :rtype: io.BytesIO
+        """
+
+    @overload
+    def write(self, fp: Union[str, PathLike[Any]]) -> None:
+        """Write this AEI to a file on disk, exactly as stored.
+        The file is written to a temporary file in the same directory, and then renamed to `fp`.
+        `fp` is therefore either replaced in full, or not at all.
+
+        :param fp: The path to write to
+        :type fp: Union[str, PathLike]
+        :raises ValueError: If the AEI is mipmapped, but `format` does not support mipmapping
+        :raises ValueError: If the number of mip levels in `mipmaps` is incorrect
+        """
+
+    def write(self, fp: Union[str, PathLike[Any], BinaryIO, None] = None) -> Optional[BinaryIO]:
+        if self.mipmapped and not self.format.supportsMipmapping:
+            raise ValueError(f"Compression format {self.format.name} does not support mipmapping")
+
+        if len(self.mipmaps) != len(self.mipmapShapes):
+            raise ValueError(f"The AEI should have {len(self.mipmapShapes)} mip levels, but {len(self.mipmaps)} were given")
+
+        try:
+            with phase("metadata") as timing:
+                header = self._packHeaderMeta()
+                symbols = self._packSymbols()
+                if timing is not None:
+                    timing.bytes = len(header) + len(symbols)
+
+            sections = [header, *self._imageContentSections(), symbols]
+            
+            with phase("write", sum(len(s) for s in sections)):
+                if isinstance(fp, (str, PathLike)):
+                    _writeAtomic(fp, sections)
+                    return None
+                
+                fp = io.BytesIO() if fp is None else fp
+                fp.writelines(sections)
+
+        except Exception as ex:
+            raise AeiWriteException(None, ex) from ex
+
+        return fp
+
+#region write-util
+
+    def _packHeaderMeta(self) -> bytearray:
+        formatId = self.format.value | MASK_MIPMAPPED_FLAG if self.mipmapped else self.format.value
+        header = bytearray(self._headerLength(len(self.textures)))
+
+        # AEI format, dimensions and texture count
+        _HEADER.pack_into(header, 0, FILE_TYPE_HEADER, formatId, self.width, self.height, len(self.textures))
+
+        # texture bounding boxes
+        for i, texture in enumerate(self.textures):
+            _BOX.pack_into(header, _HEADER.size + _BOX.size * i, texture.x, texture.y, texture.width, texture.height)
+
+        return header
+
+
+    def _imageContentSections(self) -> List[bytes]:
+        sections: List[bytes] = []
+        for compressed in self.mipmaps:
+            # image length only appears in compressed AEIs
+            if self.format.isCompressed:
+                sections.append(_UINT32.pack(len(compressed)))
+
+            sections.append(compressed)
+
+        return sections
+
+
+    def _packSymbols(self) -> bytearray:
+        symbols = bytearray(self._symbolsLength(self.fonts, self.quality))
+
+        _UINT16.pack_into(symbols, 0, len(self.fonts)) # number of symbol groups
+        offset = _UINT16.size
+
+        for font in self.fonts:
+            _UINT16.pack_into(symbols, offset, len(font))
+            offset += _UINT16.size
+
+            glyphs = "".join(font.keys()).encode("utf-16le")
+            if len(glyphs) != 2 * len(font):
+                raise ValueError("Font symbols must each be a single UTF-16 code unit")
+
+            symbols[offset : offset + len(glyphs)] = glyphs
+            offset += len(glyphs)
+
+            for g in font.values():
+                _BOX.pack_into(symbols, offset, g.x, g.y, g.width, g.height)
+                offset += _BOX.size
+
+        if self.quality is not None:
+            symbols[offset] = self.quality
+
+        return symbols
+
+
+    @classmethod
+    def _headerLength(cls, numTextures: int) -> int:
+        return _HEADER.size + _BOX.size * numTextures
+
+
+    @classmethod
+    def _symbolsLength(cls, fonts: List[Dict[str, Texture]], quality: Optional[CompressionQuality]) -> int:
+        # font count, then per font: symbol count, and a utf-16 symbol and bounding box per glyph.
+        # The compression quality is an optional trailing byte
+        return _UINT16.size + sum(_UINT16.size + (2 + _BOX.size) * len(font) for font in fonts) + (quality is not None)
+
+#endregion write-util
+
+
+@contextmanager
+def _atomicFile(path: Union[str, PathLike[Any]]) -> Iterator[BinaryIO]:
+    # Write to a temporary file in the destination directory, so that the final rename is atomic.
+    # If the `with` block raises, the temporary file is removed and `path` is untouched
+    directory, name = os.path.split(os.fspath(path))
+    fd, tempPath = _createTempFile(directory, name)
+    try:
+        with open(fd, "wb") as file:
+            yield file
+
+        os.replace(tempPath, path)
+
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tempPath)
+        raise
+
+
+def _createTempFile(directory: str, name: str) -> Tuple[int, str]:
+    # Unlike mkstemp, which creates files readable only by the owner, the kernel applies the umask to the 0o666 mode,
+    # so the file gets the same permissions as one created with `open`
+    while True:
+        tempPath = os.path.join(directory, f".{name}.{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(tempPath, _TEMP_FLAGS, 0o666), tempPath
+        except FileExistsError:
+            continue
+
+
+def _writeAtomic(path: Union[str, PathLike[Any]], sections: List[bytes]):
+    with _atomicFile(path) as file:
+        _writeAll(file.fileno(), sections)
+
+
+def _writeAll(fd: int, sections: List[bytes]):
+    if not hasattr(os, "writev"):
+        with open(fd, "wb", closefd=False) as file:
+            file.writelines(sections)
+        return
+
+    views = [memoryview(s) for s in sections if len(s)]
+    while views:
+        # writev may write only some of the buffers, and is limited in how many buffers it accepts per call
+        written = os.writev(fd, views[:_IOV_MAX])
+        while views and written >= len(views[0]):
+            written -= len(views.pop(0))
+        if views:
+            views[0] = views[0][written:]
@@ -0,0 +1,275 @@
+import mmap
+from contextlib import ExitStack, suppress
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from os import PathLike
+from types import TracebackType
+from typing import Any, BinaryIO, Callable, List, Literal, Optional, Sequence, Tuple, Type, TypeVar, Union, get_args, overload
+from PIL import Image
+import numpy as np
+import numpy.typing as npt
+
+from ..constants import CompressionFormat, CompressionQuality
+from ..lib import imageOps
+from .. import codec
+from .texture import Texture
+from .compressedAEI import CompressedAEI
+
+TException = TypeVar("TException", bound=Exception)
+CubeFace = Literal["+x", "-x", "+y", "-y", "+z", "-z"]
+
+# The order in which faces are stored
+CUBE_FACES: Tuple[CubeFace, ...] = get_args(CubeFace)
+CUBE_MAP_FORMATS = {CompressionFormat.Uncompressed_CubeMap, CompressionFormat.Uncompressed_CubeMap_PC}
+
+
+class CubeMap:
+    """The six square faces of a cube map AEI, each of which can be decoded or replaced on its own.
+
+    Faces are stored one after another, in the order of `CUBE_FACES`. Decoded as a flat image, a cube map AEI is therefore a vertical strip of six faces,
+    `faceSize` pixels wide and `6 * faceSize` pixels high.
+    Faces are views of the image content, so accessing one face never copies or decodes the others.
+
+    ```py
+    with CubeMap.open("skybox.aei", writable=True) as cube:
+        with cube.decodeFace("+y") as sky:
+            cube.replaceFace("+y", brighten(sky))
+    ```
+
+    :param compressed: A cube map AEI
+    :type compressed: CompressedAEI
+    :raises ValueError: If `compressed` is not in a cube map format, or is not six square faces high
+    """
+    def __init__(self, compressed: CompressedAEI) -> None:
+        if compressed.format not in CUBE_MAP_FORMATS:
+            raise ValueError(f"Compression format {compressed.format.name} is not a cube map format")
+        if compressed.height != 6 * compressed.width:
+            raise ValueError(f"A cube map must be six square faces high, but the AEI is {compressed.width}x{compressed.height}")
+        if len(compressed.mipmaps) == 0 or len(compressed.mipmaps[0]) != compressed.format.imageLength(compressed.width, compressed.height):
+            raise ValueError("The image content of the cube map is the wrong length")
+
+        self.compressed = compressed
+        # The memory map of the file opened with `open`, and the view of its image content
+        self._map: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._file: Optional[BinaryIO] = None
+        self._writable = False
+
+
+    @classmethod
+    def open(cls, path: Union[str, PathLike[Any]], writable: bool = False) -> "CubeMap":
+        """Open a cube map AEI file by memory mapping it, so that only the faces which are accessed are read from disk.
+        If `writable`, `replaceFace` writes directly into the file, without rewriting the other faces. Changes are saved on `close`.
+
+        :param path: The path to the AEI file
+        :type path: Union[str, PathLike]
+        :param writable: Whether to write replaced faces into the file. defaults to False
+        :type writable: bool, optional
+        :raises AeiReadException: If the file is not a valid AEI
+        :raises ValueError: If the AEI is not a cube map
+        :return: The cube map, which must be closed when no longer needed
+        :rtype: CubeMap
+        """
+        metadata = CompressedAEI.readMetadata(path)
+        # Everything opened is released if the file is not a cube map, and kept by the cube map otherwise
+        with ExitStack() as stack:
+            file = stack.enter_context(open(path, "r+b" if writable else "rb"))
+            fileMap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+            stack.callback(_suppressBufferError, fileMap.close)
+            # Cube map formats are uncompressed, so image content directly follows the texture bounding boxes
+            offset = CompressedAEI._headerLength(len(metadata.textures)) # type: ignore[reportPrivateUsage]
+            content = memoryview(fileMap)[offset : offset + metadata.imageLengths[0]]
+            stack.callback(_suppressBufferError, content.release)
+
+            compressed = CompressedAEI(metadata.format, metadata.width, metadata.height, [content], metadata.textures, metadata.fonts, metadata.quality, metadata.mipmapped) # type: ignore[reportArgumentType]
+            cube = cls(compressed)
+            stack.pop_all()
+
+        cube._map = fileMap
+        cube._view = content
+        cube._file = file
+        cube._writable = writable
+        return cube
+
+
+    @overload
+    @classmethod
+    def fromFaces(cls, faces: Sequence[Image.Image], format: CompressionFormat = CompressionFormat.Uncompressed_CubeMap, quality: Optional[CompressionQuality] = None, workers: Optional[int] = None) -> "CubeMap": ...
+
+    @overload
+    @classmethod
+    def fromFaces(cls, faces: Sequence[npt.NDArray[np.uint8]], format: CompressionFormat = CompressionFormat.Uncompressed_CubeMap, quality: Optional[CompressionQuality] = None, workers: Optional[int] = None) -> "CubeMap": ...
+
+    @classmethod
+    def fromFaces(cls, faces: Union[Sequence[Image.Image], Sequence[npt.NDArray[np.uint8]]], format: CompressionFormat = CompressionFormat.Uncompressed_CubeMap, quality: Optional[CompressionQuality] = None, workers: Optional[int] = None) -> "CubeMap":
+        """Create a cube map from six faces, which are encoded concurrently.
+
+        :param faces: The RGBA image, or `(size, size, 4)` uint8 array, of each face, in the order of `CUBE_FACES`
+        :type faces: Union[Sequence[Image.Image], Sequence[npt.NDArray[np.uint8]]]
+        :param format: The cube map format. defaults to CompressionFormat.Uncompressed_CubeMap
+        :type format: CompressionFormat, optional
+        :param quality: The compression quality. defaults to None
+        :type quality: Optional[CompressionQuality], optional
+        :param workers: The number of faces to encode at once. defaults to the `ThreadPoolExecutor` default
+        :type workers: Optional[int], optional
+        :raises ValueError: If there are not six faces, or they are not all the same square size
+        :return: A new cube map
+        :rtype: CubeMap
+        """
+        if len(faces) != len(CUBE_FACES):
+            raise ValueError(f"A cube map has {len(CUBE_FACES)} faces, but {len(faces)} were given")
+        if format not in CUBE_MAP_FORMATS:
+            raise ValueError(f"Compression format {format.name} is not a cube map format")
+
+        size = _faceSize(faces[0])
+        if any(_faceSize(face) != size for face in faces):
+            raise ValueError("Every face must be the same square size")
+
+        encoded = _encodeFaces(list(faces), format, quality, workers)
+        return cls(CompressedAEI(format, size, len(CUBE_FACES) * size, [b"".join(encoded)], [Texture(0, 0, size, len(CUBE_FACES) * size)], quality=quality))
+
+
+    @property
+    def format(self) -> CompressionFormat:
+        return self.compressed.format
+
+
+    @property
+    def faceSize(self) -> int:
+        """The width and height of each face, in pixels.
+        """
+        return self.compressed.width
+
+
+    def _faceRange(self, face: Union[CubeFace, int]) -> Tuple[int, int]:
+        if isinstance(face, str):
+            if face not in CUBE_FACES:
+                raise KeyError(f"Unknown cube face {face!r}, expected one of {', '.join(CUBE_FACES)}")
+            face = CUBE_FACES.index(face)
+        elif not 0 <= face < len(CUBE_FACES):
+            raise KeyError(f"Cube face index {face} is out of range")
+
+        length = self.format.imageLength(self.faceSize, self.faceSize)
+        return face * length, (face + 1) * length
+
+
+    def faceContent(self, face: Union[CubeFace, int]) -> memoryview:
+        """Get a read-only view of the stored image content of one face, without copying it.
+
+        :param face: The name of the face, or its index in `CUBE_FACES`
+        :type face: Union[CubeFace, int]
+        :raises KeyError: If `face` is not a cube face
+        :return: The stored image content of the face
+        :rtype: memoryview
+        """
+        start, end = self._faceRange(face)
+        return memoryview(self.compressed.mipmaps[0]).toreadonly()[start:end]
+
+
+    def decodeFace(self, face: Union[CubeFace, int]) -> Image.Image:
+        """Decode a single face into a new image. The other faces are not read.
+
+        :param face: The name of the face, or its index in `CUBE_FACES`
+        :type face: Union[CubeFace, int]
+        :raises KeyError: If `face` is not a cube face
+        :return: The face, in mode `format.pillowMode`
+        :rtype: Image.Image
+        """
+        return codec.decodeImage(self.faceContent(face), self.format, self.faceSize, self.faceSize, self.compressed.quality) # type: ignore[reportArgumentType]
+
+
+    def decodeFaces(self, workers: Optional[int] = None) -> List[Image.Image]:
+        """Decode every face concurrently.
+
+        :param workers: The number of faces to decode at once. defaults to the `ThreadPoolExecutor` default
+        :type workers: Optional[int], optional
+        :return: Each face, in the order of `CUBE_FACES`
+        :rtype: List[Image.Image]
+        """
+        # Workers run in a copy of this context, so that instrumentation is collected from them
+        contexts = [copy_context() for _ in CUBE_FACES]
+        with ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(lambda context, face: context.run(self.decodeFace, face), contexts, range(len(CUBE_FACES))))
+
+
+    @overload
+    def replaceFace(self, face: Union[CubeFace, int], image: Image.Image, /) -> None: ...
+
+    @overload
+    def replaceFace(self, face: Union[CubeFace, int], image: npt.NDArray[np.uint8], /) -> None: ...
+
+    def replaceFace(self, face: Union[CubeFace, int], image: Union[Image.Image, npt.NDArray[np.uint8]], /):
+        """Encode a single face, and replace it in the image content. The other faces are not touched.
+        If the cube map was opened with `open(writable=True)`, the face is written directly into the file.
+        Otherwise, the image content is copied into a mutable buffer on the first replacement.
+
+        :param face: The name of the face, or its index in `CUBE_FACES`
+        :type face: Union[CubeFace, int]
+        :param image: The new RGBA image, or `(size, size, 4)` uint8 array, of the face
+        :type image: Union[Image.Image, npt.NDArray[np.uint8]]
+        :raises KeyError: If `face` is not a cube face
+        :raises ValueError: If `image` is not `faceSize` pixels square
+        """
+        start, end = self._faceRange(face)
+        if _faceSize(image) != self.faceSize:
+            raise ValueError(f"The face must be {self.faceSize}x{self.faceSize} pixels")
+
+        encoded = _encodeFaces([image], self.format, self.compressed.quality, 1)[0]
+        content = self.compressed.mipmaps[0]
+        if isinstance(content, memoryview) and content.readonly or isinstance(content, bytes):
+            content = bytearray(content)
+            self.compressed.mipmaps[0] = content # type: ignore[reportArgumentType]
+        content[start:end] = encoded # type: ignore[reportIndexIssue]
+
+
+    def close(self):
+        """Save any replaced faces to the file, if opened with `open(writable=True)`, and close it.
+        """
+        if self._map is None or self._file is None or self._view is None:
+            return
+
+        if self._writable:
+            self._map.flush()
+        self._view.release()
+        # Views of faces which are still referenced keep the memory map open until they are released
+        with suppress(BufferError):
+            self._map.close()
+        self._file.close()
+        self._map = self._view = self._file = None
+
+
+    def __enter__(self):
+        """This method is called when entering a `with` statement.
+        """
+        return self
+
+
+    def __exit__(self, exceptionType: Type[TException], exception: TException, trace: TracebackType):
+        """This method is called when exiting a `with` statement.
+        """
+        self.close()
+
+
+def _faceSize(face: Union[Image.Image, npt.NDArray[np.uint8]]) -> int:
+    width, height = face.size if isinstance(face, Image.Image) else (face.shape[1], face.shape[0])
+    if width != height:
+        raise ValueError(f"Cube faces must be square, but a {width}x{height} face was given")
+    return width
+
+
+def _suppressBufferError(release: Callable[[], Any]):
+    # Views which are still referenced keep a memory map open until they are released
+    with suppress(BufferError):
+        release()
+
+
+def _encodeFaces(faces: List[Union[Image.Image, npt.NDArray[np.uint8]]], format: CompressionFormat, quality: Optional[CompressionQuality], workers: Optional[int]) -> List[bytes]:
+    images = [imageOps.imageFromArray(np.ascontiguousarray(face)) if isinstance(face, np.ndarray) else face for face in faces]
+    for image in images:
+        if image.mode != "RGBA":
+            raise ValueError(f"Faces must be mode RGBA, but {image.mode} was given")
+
+    # Workers run in a copy of this context, so that instrumentation is collected from them
+    contexts = [copy_context() for _ in images]
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(lambda context, image: context.run(codec.encodeImage, image, format, quality), contexts, images))
@@ -0,0 +1,47 @@
+from typing import Optional, Tuple
+from PIL import Image
+
+from ..constants import CompressionFormat, CompressionQuality
+from .. import codec
+
+
+class Mipmap:
+    """A single, reduced-resolution level of a mipmapped AEI.
+    The image content is kept compressed, and is only decoded on call of `decode`.
+
+    :var int level: The level of this mipmap in the mip chain. The AEI itself is level 0
+    :var CompressionFormat format: The compression format of `compressed`
+    :var bytes compressed: The compressed image content
+    :var Optional[CompressionQuality] quality: The compression quality of `compressed`
+    """
+    def __init__(self, level: int, width: int, height: int, format: CompressionFormat, compressed: bytes, quality: Optional[CompressionQuality] = None) -> None:
+        self.level = level
+        self.width = width
+        self.height = height
+        self.format = format
+        self.compressed = compressed
+        self.quality: Optional[CompressionQuality] = quality
+
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """The dimensions of the mipmap, in pixels.
+
+        :return: (width, height)
+        :rtype: Tuple[int, int]
+        """
+        return (self.width, self.height)
+
+
+    def decode(self) -> Image.Image:
+        """Decompress the mipmap into a new image.
+
+        :return: The image content of the mipmap, in mode `format.pillowMode`
+        :rtype: Image.Image
+        :raises UnsupportedCompressionFormatException: If no codec is loaded which can decompress `format`
+        """
+        return codec.decodeImage(self.compressed, self.format, self.width, self.height, self.quality)
+
+
+    def __str__(self):
+        return f"Mipmap: level: {self.level}, w: {self.width}, h: {self.height}, format: {self.format.name}"
@@ -0,0 +1,301 @@
+import struct
+from mmap import mmap
+from typing import Callable, Dict, Generator, List, NamedTuple, Optional, Union, cast
+
+from ..lib import imageOps
+from ..constants import CompressionFormat, CompressionQuality, FILE_TYPE_HEADER, ENDIANNESS, FORMAT_BITCOUNTS
+from ..instrumentation import phase
+from .texture import Texture
+
+_HEADER = struct.Struct(f"{ENDIANNESS.short}{len(FILE_TYPE_HEADER)}sB3H")
+_UINT16 = struct.Struct(f"{ENDIANNESS.short}H")
+_UINT32 = struct.Struct(f"{ENDIANNESS.short}I")
+_BOX = struct.Struct(f"{ENDIANNESS.short}4H")
+
+
+class HeaderEvent(NamedTuple):
+    """The AEI header has been parsed.
+    """
+    format: CompressionFormat
+    mipmapped: bool
+    width: int
+    height: int
+
+
+class TexturesEvent(NamedTuple):
+    """The texture table has been parsed.
+    """
+    textures: List[Texture]
+
+
+class PayloadEvent(NamedTuple):
+    """The compressed image content of a mip level has been received in full. Level 0 is the full-size image.
+    """
+    level: int
+    width: int
+    height: int
+    compressed: bytes
+
+
+class FontEvent(NamedTuple):
+    """A symbol map has been parsed.
+    """
+    # The position of the symbol map among the symbol maps of the AEI
+    fontIndex: int
+    font: Dict[str, Texture]
+
+
+class EndEvent(NamedTuple):
+    """The AEI has been parsed in full. Only emitted by `AeiParser.close`.
+    """
+    quality: Optional[CompressionQuality]
+
+
+AeiEvent = Union[HeaderEvent, TexturesEvent, PayloadEvent, FontEvent, EndEvent]
+
+
+def _validateImageLength(format: CompressionFormat, level: int, width: int, height: int, imageLength: int):
+    # Fail before reading or decoding image content of the wrong size
+    if format in FORMAT_BITCOUNTS and imageLength != format.imageLength(width, height):
+        raise ValueError(f"Mip level {level} declares {imageLength} bytes of image content, but a {width}x{height} {format.name} image is {format.imageLength(width, height)} bytes")
+
+# The parser generator yields the number of bytes it needs next, and is sent exactly that many bytes
+_Parse = Generator[int, bytes, None]
+
+
+class AeiParser:
+    """An incremental AEI parser, which does no I/O of its own.
+    Bytes are pushed into the parser with `feed` as they arrive, in chunks of any size,
+    and events are returned as soon as each section of the AEI has been received.
+    This allows AEIs to be parsed from non-seekable streams, and image content to be decoded before the rest of the file arrives.
+
+    ```py
+    parser = AeiParser()
+    for chunk in stream:
+        for event in parser.feed(chunk):
+            ...
+    for event in parser.close():
+        ...
+    ```
+
+    Parsing stops after the optional compression quality byte, so an AEI can be read from the start of a larger stream.
+    Bytes fed after the end of the AEI are kept in `unusedData`, and are rejected by `close` if `strict`.
+
+    Problems which parsing can continue past, such as a declared image length which does not match the dimensions of the AEI, raise `ValueError`,
+    unless `onProblem` is given. `onProblem` is then called with a description of each, and parsing continues, so that every problem in an AEI can be found.
+
+    :param strict: Whether `close` should reject data following the AEI. defaults to False
+    :type strict: bool, optional
+    :param onProblem: Called with a description of each problem which parsing can continue past, instead of raising. defaults to None
+    :type onProblem: Optional[Callable[[str], None]], optional
+    :var bool finished: Whether every section of the AEI has been received, except the optional compression quality
+    """
+    def __init__(self, strict: bool = False, onProblem: Optional[Callable[[str], None]] = None) -> None:
+        self.strict = strict
+        self.onProblem = onProblem
+        self._buffer = bytearray()
+        self._offset = 0
+        self._events: List[AeiEvent] = []
+        self._closed = False
+        self.finished = False
+        # Whether the compression quality byte has been received, after which no more bytes are parsed
+        self._done = False
+        self._quality: Optional[CompressionQuality] = None
+
+        self._parser = self._parse()
+        self._needed = next(self._parser)
+
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]) -> List[AeiEvent]:
+        """Push the next chunk of the AEI into the parser.
+
+        :param data: The next bytes of the AEI
+        :type data: Union[bytes, bytearray, memoryview]
+        :return: The events completed by `data`, in file order
+        :rtype: List[AeiEvent]
+        :raises ValueError: If the parser has been closed
+        :raises ValueError: If the AEI is malformed
+        """
+        if self._closed:
+            raise ValueError("Cannot feed a closed parser")
+
+        self._buffer += data
+
+        while not self._done and len(self._buffer) - self._offset >= self._needed:
+            start = self._offset
+            self._offset += self._needed
+            with memoryview(self._buffer) as view, view[start : self._offset] as sectionView:
+                section = sectionView.tobytes()
+
+            self._send(section)
+
+        # Drop consumed bytes, so the buffer only holds the section currently being received
+        del self._buffer[:self._offset]
+        self._offset = 0
+
+        events, self._events = self._events, []
+        return events
+
+
+    @property
+    def bytesNeeded(self) -> int:
+        """The number of bytes needed to complete the section currently being received, or 0 once the AEI has been parsed in full.
+        Reading no more than this many bytes at a time from a stream leaves the stream positioned at the end of the AEI.
+        Once `finished`, the AEI may also end here, without its optional compression quality byte.
+        """
+        return 0 if self._done else self._needed - (len(self._buffer) - self._offset)
+
+
+    @property
+    def unusedData(self) -> bytes:
+        """The bytes fed after the end of the AEI.
+        """
+        return bytes(self._buffer) if self._done else b""
+
+
+    @classmethod
+    def parseBuffer(cls, buffer: Union[bytes, bytearray, memoryview, mmap], strict: bool = False, onProblem: Optional[Callable[[str], None]] = None) -> List[AeiEvent]:
+        """Parse a complete AEI held in memory, such as a memory-mapped file, without copying its image content.
+        The `compressed` content of each `PayloadEvent` is a read-only memoryview of `buffer`, so `buffer` must not be altered while they are in use.
+
+        :param buffer: The whole AEI
+        :type buffer: Union[bytes, bytearray, memoryview, mmap]
+        :param strict: Whether to reject data following the AEI. defaults to False
+        :type strict: bool, optional
+        :param onProblem: Called with a description of each problem which parsing can continue past, instead of raising. defaults to None
+        :type onProblem: Optional[Callable[[str], None]], optional
+        :return: Every event of the AEI, in file order, ending with `EndEvent`
+        :rtype: List[AeiEvent]
+        :raises ValueError: If the AEI is malformed or incomplete, or has trailing data when `strict`
+        """
+        return list(cls.iterBuffer(buffer, strict, onProblem))
+
+
+    @classmethod
+    def iterBuffer(cls, buffer: Union[bytes, bytearray, memoryview, mmap], strict: bool = False, onProblem: Optional[Callable[[str], None]] = None) -> Generator[AeiEvent, None, None]:
+        """Parse a complete AEI held in memory like `parseBuffer`, yielding each event as soon as it has been parsed.
+        Events before a problem which stops parsing are yielded before the problem is raised.
+
+        :param buffer: The whole AEI
+        :type buffer: Union[bytes, bytearray, memoryview, mmap]
+        :param strict: Whether to reject data following the AEI. defaults to False
+        :type strict: bool, optional
+        :param onProblem: Called with a description of each problem which parsing can continue past, instead of raising. defaults to None
+        :type onProblem: Optional[Callable[[str], None]], optional
+        :return: Every event of the AEI, in file order, ending with `EndEvent`
+        :rtype: Generator[AeiEvent, None, None]
+        :raises ValueError: If the AEI is malformed or incomplete, or has trailing data when `strict`
+        """
+        parser = cls(strict, onProblem)
+        view = memoryview(buffer).toreadonly()
+        offset = 0
+        try:
+            # Sections are sent as views, rather than copied through the feed buffer
+            while not parser._done:
+                if offset + parser._needed > len(view):
+                    if parser.finished:
+                        # The AEI has no compression quality byte
+                        break
+                    raise ValueError("The AEI ended unexpectedly")
+
+                section = view[offset : offset + parser._needed]
+                offset += parser._needed
+                parser._send(section) # type: ignore[reportArgumentType]
+                yield from parser._events
+                parser._events.clear()
+
+            parser._buffer += view[offset:]
+            yield from parser.close()
+        finally:
+            # The section parser refers back to the parser, so would otherwise hold its last view of buffer until garbage collection
+            parser._parser.close()
+
+
+    def close(self) -> List[AeiEvent]:
+        """Signal the end of the AEI.
+
+        :return: The final events, ending with `EndEvent`
+        :rtype: List[AeiEvent]
+        :raises ValueError: If the AEI was incomplete, or has trailing data when `strict`
+        """
+        self._closed = True
+        if not self.finished:
+            raise ValueError("The AEI ended unexpectedly")
+
+        if self.strict and self._done and self._buffer:
+            self._problem(f"The AEI has {len(self._buffer)} bytes of unexpected trailing data")
+
+        return [EndEvent(self._quality)]
+
+
+    def _problem(self, message: str):
+        if self.onProblem is None:
+            raise ValueError(message)
+        self.onProblem(message)
+
+
+    def _send(self, section: bytes):
+        try:
+            self._needed = self._parser.send(section)
+        except StopIteration:
+            self._done = True
+
+
+    def _parse(self) -> _Parse:
+        header = yield _HEADER.size
+        with phase("header", _HEADER.size):
+            bFileType, formatId, width, height, numTextures = _HEADER.unpack(header)
+            if bFileType != FILE_TYPE_HEADER:
+                raise ValueError(f"Given file is of unknown type '{str(bFileType, encoding='utf-8', errors='replace')}' expected '{str(FILE_TYPE_HEADER, encoding='utf-8')}'")
+
+            format, mipmapped = CompressionFormat.fromBinary(formatId)
+            self._events.append(HeaderEvent(format, mipmapped, width, height))
+
+        boxes = yield _BOX.size * numTextures
+        with phase("header", len(boxes)):
+            self._events.append(TexturesEvent([Texture(*box) for box in _BOX.iter_unpack(boxes)]))
+
+        # Mipmaps are stored after the full-size image, in decreasing size order
+        shapes = imageOps.mipmapShapes(width, height) if mipmapped else [(width, height)]
+        for level, (w, h) in enumerate(shapes):
+            # image length only appears in compressed AEIs
+            if format.isCompressed:
+                imageLength = _UINT32.unpack((yield _UINT32.size))[0]
+                try:
+                    _validateImageLength(format, level, w, h, imageLength)
+                except ValueError as ex:
+                    # Parsing can continue with the declared length
+                    self._problem(str(ex))
+            else:
+                imageLength = 4 * w * h
+
+            compressed = yield imageLength
+            self._events.append(PayloadEvent(level, w, h, compressed))
+
+        yield from self._parseSymbols()
+
+        # The compression quality is an optional trailing byte, so the AEI may end before it
+        self.finished = True
+        self._quality = cast(CompressionQuality, (yield 1)[0])
+
+
+    def _parseSymbols(self) -> _Parse:
+        numFonts = _UINT16.unpack((yield _UINT16.size))[0]
+
+        for index in range(numFonts):
+            fontLen = _UINT16.unpack((yield _UINT16.size))[0]
+            symbols = yield 2 * fontLen
+            boxes = yield _BOX.size * fontLen
+
+            with phase("metadata", 2 + len(symbols) + len(boxes)):
+                try:
+                    glyphs = [str(symbols[i : i + 2], "utf-16le") for i in range(0, len(symbols), 2)]
+                except UnicodeDecodeError as ex:
+                    self._problem(f"Symbol map {index} is not valid UTF-16: {ex}")
+                    glyphs = [str(symbols[i : i + 2], "utf-16le", "surrogatepass") for i in range(0, len(symbols), 2)]
+
+                font = {glyph: Texture(*box) for glyph, box in zip(glyphs, _BOX.iter_unpack(boxes))}
+                # Later duplicates replace earlier ones, so are only a problem when problems are being collected
+                if len(font) != fontLen and self.onProblem is not None:
+                    self.onProblem(f"Symbol map {index} has duplicate glyphs")
+                self._events.append(FontEvent(index, font))
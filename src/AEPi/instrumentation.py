@@ -0,0 +1,141 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+
+class PhaseTiming:
+    """The cost of a single phase of reading or writing an AEI.
+
+    :var str name: The name of the phase
+    :var float seconds: The wall time spent in the phase, in seconds
+    :var int bytes: The number of bytes processed by the phase
+    """
+    __slots__ = ("name", "seconds", "bytes")
+
+    def __init__(self, name: str, seconds: float = 0.0, bytes: int = 0) -> None:
+        self.name = name
+        self.seconds = seconds
+        self.bytes = bytes
+
+
+    def __str__(self):
+        return f"PhaseTiming: {self.name}, {self.seconds * 1000:.3f}ms, {self.bytes} bytes"
+
+
+class PhaseStats:
+    """The phases recorded while collecting stats with `collectStats`, in the order that they finished.
+
+    Phases recorded when reading an AEI are:
+    - `read`: Reading each chunk of the file
+    - `header`: Parsing the format, dimensions and texture bounding boxes
+    - `metadata`: Parsing the symbol maps
+    - `decompress`: Decompressing the image content with the registered codec
+    - `swap`: Switching between RGBA and BGRA, for formats which store BGRA
+    - `convert`: Converting to or from the pillow mode of the compression format
+    - `textures`: Registering the textures on the new AEI
+
+    Phases recorded when writing an AEI are:
+    - `swap` and `convert`, as above
+    - `pad`: Padding the image to a whole number of compression blocks
+    - `compress`: Compressing the image content with the registered codec
+    - `metadata`: Packing the header, texture bounding boxes, symbol maps and compression quality
+    - `write`: Writing the whole AEI to the file
+
+    Phases may be recorded more than once, for example once for each mip level.
+
+    :var List[PhaseTiming] phases: Every recorded phase
+    """
+    def __init__(self, callback: Optional[Callable[[PhaseTiming], None]] = None) -> None:
+        self.phases: List[PhaseTiming] = []
+        self._callback = callback
+
+
+    def _record(self, timing: PhaseTiming):
+        self.phases.append(timing)
+        if self._callback is not None:
+            self._callback(timing)
+
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """The total time and bytes for each phase name, over all recorded phases.
+
+        :return: A mapping from phase name to (seconds, bytes)
+        :rtype: Dict[str, Tuple[float, int]]
+        """
+        totals: Dict[str, Tuple[float, int]] = {}
+        for timing in self.phases:
+            seconds, numBytes = totals.get(timing.name, (0.0, 0))
+            totals[timing.name] = (seconds + timing.seconds, numBytes + timing.bytes)
+        return totals
+
+
+    def seconds(self, name: str) -> float:
+        """The total time spent in all phases named `name`, in seconds.
+        """
+        return sum(t.seconds for t in self.phases if t.name == name)
+
+
+    def bytes(self, name: str) -> int:
+        """The total bytes processed by all phases named `name`.
+        """
+        return sum(t.bytes for t in self.phases if t.name == name)
+
+
+# The stats objects collecting phases in the current context. Empty when instrumentation is disabled
+_activeStats: ContextVar[Tuple[PhaseStats, ...]] = ContextVar("_activeStats", default=())
+_DISABLED: ContextManager[Optional[PhaseTiming]] = nullcontext(None)
+
+
+@contextmanager
+def collectStats(callback: Optional[Callable[[PhaseTiming], None]] = None) -> Iterator[PhaseStats]:
+    """Record the time and bytes of every phase of reading and writing AEIs within the `with` block.
+    Collection is scoped to the current thread or async task, and is nestable.
+
+    ```py
+    with collectStats() as stats:
+        aei = AEI.read("my.aei")
+
+    print(stats.totals())
+    ```
+
+    :param callback: Called with each phase as it finishes. defaults to None
+    :type callback: Optional[Callable[[PhaseTiming], None]], optional
+    :return: A stats object which is populated as phases finish
+    :rtype: Iterator[PhaseStats]
+    """
+    stats = PhaseStats(callback)
+    token = _activeStats.set(_activeStats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _activeStats.reset(token)
+
+
+def phase(name: str, bytes: int = 0) -> ContextManager[Optional[PhaseTiming]]:
+    """Time the body of a `with` block as a phase, if stats are being collected.
+    The context manager yields the `PhaseTiming`, whose `bytes` can be updated within the block,
+    or `None` if stats are not being collected.
+
+    :param name: The name of the phase
+    :type name: str
+    :param bytes: The number of bytes processed by the phase, if known in advance. defaults to 0
+    :type bytes: int, optional
+    :return: A context manager timing the phase
+    :rtype: ContextManager[Optional[PhaseTiming]]
+    """
+    active = _activeStats.get()
+    if not active:
+        return _DISABLED
+    return _timePhase(PhaseTiming(name, bytes=bytes), active)
+
+
+@contextmanager
+def _timePhase(timing: PhaseTiming, active: Tuple[PhaseStats, ...]) -> Iterator[PhaseTiming]:
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        timing.seconds = time.perf_counter() - start
+        for stats in active:
+            stats._record(timing) # type: ignore[reportPrivateUsage]
@@ -0,0 +1,142 @@
+import os
+from collections import deque
+from mmap import mmap, ACCESS_READ
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import PathLike
+from typing import Any, BinaryIO, Deque, Iterable, Iterator, List, NamedTuple, Optional, Union, get_args
+
+from .constants import CompressionQuality
+from .image import Texture
+from .image.parser import AeiParser, AeiEvent, HeaderEvent, TexturesEvent, PayloadEvent, FontEvent
+from . import codec
+
+_QUALITIES = set(get_args(CompressionQuality))
+
+
+class IntegrityReport(NamedTuple):
+    """The result of checking a single AEI file with `checkFile`.
+    """
+    path: str
+    # A description of each problem found, in file order. Empty if the file is valid
+    problems: List[str]
+
+    @property
+    def ok(self) -> bool:
+        """Whether no problems were found.
+        """
+        return not self.problems
+
+
+def checkFile(path: Union[str, PathLike[Any]], decode: bool = False) -> IntegrityReport:
+    """Check that an AEI file is well-formed. Image content is skipped, unless `decode` is given.
+    Unlike `AEI.read`, checking continues past problems wherever the rest of the file can still be located, so that every problem is reported.
+
+    The checks are:
+    - The file type header
+    - The format id, with `CompressionFormat.fromBinary`
+    - That every texture is non-empty and lies within the AEI
+    - That the length of each mip level matches its dimensions and format
+    - That symbol maps are valid UTF-16, have no duplicate glyphs, and every glyph lies within the AEI
+    - That the file ends with at most a single, valid compression quality byte
+
+    :param path: The path to the AEI file
+    :type path: Union[str, PathLike]
+    :param decode: Also decode the full-size image with the registered codec. defaults to False
+    :type decode: bool, optional
+    :return: The problems found in the file
+    :rtype: IntegrityReport
+    """
+    problems: List[str] = []
+    try:
+        with open(path, "rb") as file:
+            _checkContents(file, decode, problems)
+    except OSError as ex:
+        problems.append(f"The file could not be read: {ex}")
+
+    return IntegrityReport(os.fspath(path), problems)
+
+
+def checkFiles(paths: Iterable[Union[str, PathLike[Any]]], decode: bool = False, workers: Optional[int] = None) -> Iterator[IntegrityReport]:
+    """Check many AEI files concurrently with `checkFile`.
+    Reports are yielded in the order of `paths`. `paths` is consumed lazily, and only a few files per worker are in flight at once,
+    so memory use does not grow with the number of files.
+
+    ```py
+    for report in checkFiles(Path("assets").rglob("*.aei")):
+        if not report.ok:
+            print(report.path, report.problems)
+    ```
+
+    :param paths: The paths to the AEI files
+    :type paths: Iterable[Union[str, PathLike]]
+    :param decode: Also decode the full-size image of each file with the registered codec. defaults to False
+    :type decode: bool, optional
+    :param workers: The number of files to check at once. defaults to the `ThreadPoolExecutor` default
+    :type workers: Optional[int], optional
+    :return: A report for each file
+    :rtype: Iterator[IntegrityReport]
+    """
+    # Matches the ThreadPoolExecutor default
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    window = 2 * workers
+
+    with ThreadPoolExecutor(workers) as executor:
+        pending: Deque[Future[IntegrityReport]] = deque()
+        for path in paths:
+            pending.append(executor.submit(checkFile, path, decode))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _checkContents(file: BinaryIO, decode: bool, problems: List[str]):
+    if os.fstat(file.fileno()).st_size == 0:
+        problems.append("The AEI ended unexpectedly")
+        return
+
+    # Memory mapping lets image content be skipped without reading it, as the parser only takes views of it
+    with mmap(file.fileno(), 0, access=ACCESS_READ) as fileMap:
+        events = AeiParser.iterBuffer(fileMap, strict=True, onProblem=problems.append)
+        try:
+            _checkEvents(events, decode, problems)
+        except Exception as ex:
+            problems.append(str(ex))
+        finally:
+            # The parser holds a view of the memory map until it is closed
+            events.close()
+
+
+def _checkEvents(events: Iterable[AeiEvent], decode: bool, problems: List[str]):
+    width = height = 0
+    def checkBox(kind: str, box: Texture):
+        if box.width == 0 or box.height == 0:
+            problems.append(f"{kind} is empty")
+        elif box.x + box.width > width or box.y + box.height > height:
+            problems.append(f"{kind} ({box.x}, {box.y}, {box.width}, {box.height}) falls outside of the {width}x{height} AEI")
+
+    payload: Optional[bytes] = None
+    for event in events:
+        if isinstance(event, HeaderEvent):
+            format, width, height = event.format, event.width, event.height
+        elif isinstance(event, TexturesEvent):
+            for i, texture in enumerate(event.textures):
+                checkBox(f"Texture {i}", texture)
+        elif isinstance(event, PayloadEvent):
+            if event.level == 0 and decode:
+                payload = bytes(event.compressed)
+        elif isinstance(event, FontEvent):
+            for glyph, box in event.font.items():
+                checkBox(f"Glyph {glyph!r} of symbol map {event.fontIndex}", box)
+        elif event.quality is not None and event.quality not in _QUALITIES:
+            problems.append(f"Unknown compression quality {event.quality}")
+
+        # Payload events are views of the memory map, which must be released before it is closed
+        del event
+
+    if payload is not None and not problems:
+        try:
+            codec.decodeImage(payload, format, width, height, None).close() # type: ignore[reportPossiblyUnbound]
+        except Exception as ex:
+            problems.append(f"The image content could not be decoded: {ex}")
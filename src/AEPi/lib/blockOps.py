@@ -0,0 +1,224 @@
+from typing import Tuple
+import numpy as np
+import numpy.typing as npt
+
+from ..constants import CompressionFormat
+
+# The formats which `blockColours` can approximate
+BLOCK_COLOUR_FORMATS = {
+    CompressionFormat.ATC,
+    CompressionFormat.DXT1,
+    CompressionFormat.DXT3,
+    CompressionFormat.DXT5,
+    CompressionFormat.ETC1,
+    CompressionFormat.ETC2
+}
+
+BLOCK_SIZE = 4
+
+# Per-texel-index weights of the two endpoint colours, for each block mode.
+# DXT: mode 0 is 4-colour, mode 1 is 3-colour with transparent black (DXT1 only)
+_DXT_WEIGHTS_C0 = np.array([[1, 0, 2/3, 1/3], [1, 0, 1/2, 0]], dtype=np.float32)
+_DXT_WEIGHTS_C1 = np.array([[0, 1, 1/3, 2/3], [0, 1, 1/2, 0]], dtype=np.float32)
+_DXT_WEIGHTS_ALPHA = np.array([[1, 1, 1, 1], [1, 1, 1, 0]], dtype=np.float32)
+
+# ATC: mode 0 interpolates, mode 1 extrapolates from colour 0 with black
+_ATC_WEIGHTS_C0 = np.array([[1, 2/3, 1/3, 0], [0, 1, 1, 0]], dtype=np.float32)
+_ATC_WEIGHTS_C1 = np.array([[0, 1/3, 2/3, 1], [0, -1/4, 0, 1]], dtype=np.float32)
+
+# Interpolated alpha: mode 0 has 8 alpha values, mode 1 has 6 plus 0 and 255
+_ALPHA_WEIGHTS_A0 = np.array([[1, 0, 6/7, 5/7, 4/7, 3/7, 2/7, 1/7], [1, 0, 4/5, 3/5, 2/5, 1/5, 0, 0]], dtype=np.float32)
+_ALPHA_WEIGHTS_A1 = np.array([[0, 1, 1/7, 2/7, 3/7, 4/7, 5/7, 6/7], [0, 1, 1/5, 2/5, 3/5, 4/5, 0, 0]], dtype=np.float32)
+_ALPHA_CONSTANTS = np.array([[0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 255]], dtype=np.float32)
+
+_TEXELS = np.arange(BLOCK_SIZE * BLOCK_SIZE, dtype=np.uint64)
+
+
+def blockGridShape(width: int, height: int) -> Tuple[int, int]:
+    """Get the number of 4x4 blocks needed to cover an image, as a (width, height) tuple.
+
+    :param width: The width of the image
+    :type width: int
+    :param height: The height of the image
+    :type height: int
+    :return: (blocks wide, blocks high)
+    :rtype: Tuple[int, int]
+    """
+    return (-(-width // BLOCK_SIZE), -(-height // BLOCK_SIZE))
+
+
+def _uint(blocks: npt.NDArray[np.uint8], start: int, stop: int, dtype: str) -> npt.NDArray[np.uint64]:
+    # Little-endian unsigned integers from a byte range of every block
+    return np.ascontiguousarray(blocks[:, start:stop]).view(dtype)[:, 0].astype(np.uint64)
+
+
+def _texelIndices(packed: npt.NDArray[np.uint64], bits: int) -> npt.NDArray[np.intp]:
+    return ((packed[:, None] >> (_TEXELS * np.uint64(bits))) & np.uint64((1 << bits) - 1)).astype(np.intp)
+
+
+def _rgb565(colour: npt.NDArray[np.uint64]) -> npt.NDArray[np.float32]:
+    return np.stack([
+        ((colour >> np.uint64(11)) & np.uint64(0x1F)) * (255 / 31),
+        ((colour >> np.uint64(5)) & np.uint64(0x3F)) * (255 / 63),
+        (colour & np.uint64(0x1F)) * (255 / 31)
+    ], axis=-1).astype(np.float32)
+
+
+def _rgb555(colour: npt.NDArray[np.uint64]) -> npt.NDArray[np.float32]:
+    return np.stack([
+        ((colour >> np.uint64(10)) & np.uint64(0x1F)) * (255 / 31),
+        ((colour >> np.uint64(5)) & np.uint64(0x1F)) * (255 / 31),
+        (colour & np.uint64(0x1F)) * (255 / 31)
+    ], axis=-1).astype(np.float32)
+
+
+def _meanWeights(table: npt.NDArray[np.float32], modes: npt.NDArray[np.intp], indices: npt.NDArray[np.intp]) -> npt.NDArray[np.float32]:
+    return table[modes[:, None], indices].mean(axis=1)
+
+
+def _dxtColours(blocks: npt.NDArray[np.uint8], punchThrough: bool) -> Tuple[npt.NDArray[np.float32], npt.NDArray[np.float32]]:
+    c0 = _uint(blocks, 0, 2, "<u2")
+    c1 = _uint(blocks, 2, 4, "<u2")
+    indices = _texelIndices(_uint(blocks, 4, 8, "<u4"), 2)
+    modes = ((c0 <= c1) & punchThrough).astype(np.intp)
+
+    rgb = _meanWeights(_DXT_WEIGHTS_C0, modes, indices)[:, None] * _rgb565(c0) \
+        + _meanWeights(_DXT_WEIGHTS_C1, modes, indices)[:, None] * _rgb565(c1)
+    alpha = _meanWeights(_DXT_WEIGHTS_ALPHA, modes, indices) * np.float32(255)
+    # The arithmetic is already float32, so these don't copy
+    return rgb.astype(np.float32, copy=False), alpha.astype(np.float32, copy=False)
+
+
+def _atcColours(blocks: npt.NDArray[np.uint8]) -> npt.NDArray[np.float32]:
+    c0 = _uint(blocks, 0, 2, "<u2")
+    c1 = _uint(blocks, 2, 4, "<u2")
+    indices = _texelIndices(_uint(blocks, 4, 8, "<u4"), 2)
+    modes = (c0 >> np.uint64(15)).astype(np.intp)
+
+    rgb = _meanWeights(_ATC_WEIGHTS_C0, modes, indices)[:, None] * _rgb555(c0) \
+        + _meanWeights(_ATC_WEIGHTS_C1, modes, indices)[:, None] * _rgb565(c1)
+    return rgb.astype(np.float32, copy=False)
+
+
+def _interpolatedAlpha(blocks: npt.NDArray[np.uint8]) -> npt.NDArray[np.float32]:
+    a0 = blocks[:, 0].astype(np.float32)
+    a1 = blocks[:, 1].astype(np.float32)
+    packed = np.zeros((len(blocks), 8), dtype=np.uint8)
+    packed[:, :6] = blocks[:, 2:8]
+    indices = _texelIndices(_uint(packed, 0, 8, "<u8"), 3)
+    modes = (a0 <= a1).astype(np.intp)
+
+    alpha = _meanWeights(_ALPHA_WEIGHTS_A0, modes, indices) * a0 \
+        + _meanWeights(_ALPHA_WEIGHTS_A1, modes, indices) * a1 \
+        + _meanWeights(_ALPHA_CONSTANTS, modes, indices)
+    return alpha.astype(np.float32, copy=False)
+
+
+def _explicitAlpha(blocks: npt.NDArray[np.uint8]) -> npt.NDArray[np.float32]:
+    alphas = blocks[:, :8]
+    return ((alphas & 0x0F).sum(axis=1) + (alphas >> 4).sum(axis=1)).astype(np.float32) * (17 / 16)
+
+
+def _etcColours(blocks: npt.NDArray[np.uint8]) -> npt.NDArray[np.float32]:
+    channels = blocks[:, :3].astype(np.int16)
+    differential = (blocks[:, 3] & 0b10).astype(bool)[:, None]
+
+    # Individual mode: two 4-bit base colours
+    individual0 = (channels >> 4) * 17
+    individual1 = (channels & 0x0F) * 17
+
+    # Differential mode: a 5-bit base colour, and a 3-bit signed offset for the second
+    base = channels >> 3
+    delta = channels & 0b111
+    delta = np.where(delta >= 4, delta - 8, delta)
+    # ETC2 stores its extra modes in out-of-range offsets, these are approximated by clamping
+    offset = np.clip(base + delta, 0, 31)
+    differential0 = (base << 3) | (base >> 2)
+    differential1 = (offset << 3) | (offset >> 2)
+
+    colour0 = np.where(differential, differential0, individual0)
+    colour1 = np.where(differential, differential1, individual1)
+    # Intensity modifiers are symmetric around the base colours, so are ignored
+    return (colour0 + colour1).astype(np.float32) * 0.5
+
+
+def blockColours(compressed: bytes, format: CompressionFormat, width: int, height: int) -> npt.NDArray[np.uint8]:
+    """Approximate the average colour of every 4x4 block of a compressed image, directly from the block endpoints.
+    This does not decode the image, and so is much faster than decompressing, at the cost of accuracy.
+    The result is a `(ceil(height / 4), ceil(width / 4), 4)` uint8 array, in the channel order of the compressed image.
+
+    :param compressed: The compressed image content
+    :type compressed: bytes
+    :param format: The compression format of `compressed`. Must be in `BLOCK_COLOUR_FORMATS`
+    :type format: CompressionFormat
+    :param width: The width of the image
+    :type width: int
+    :param height: The height of the image
+    :type height: int
+    :return: The approximate colour of each block
+    :rtype: npt.NDArray[np.uint8]
+    :raises ValueError: If `format` is not in `BLOCK_COLOUR_FORMATS`, or `compressed` is not a whole number of blocks
+    """
+    if format not in BLOCK_COLOUR_FORMATS:
+        raise ValueError(f"Block colours cannot be approximated for format {format.name}")
+
+    blocksX, blocksY = blockGridShape(width, height)
+    numBlocks = blocksX * blocksY
+    if numBlocks == 0 or len(compressed) % numBlocks != 0 or len(compressed) // numBlocks not in (8, 16):
+        raise ValueError(f"Compressed image of {len(compressed)} bytes does not contain {numBlocks} blocks")
+
+    blocks = np.frombuffer(compressed, dtype=np.uint8).reshape(numBlocks, -1)
+    alpha = np.full(numBlocks, 255, dtype=np.float32)
+
+    if format is CompressionFormat.DXT1:
+        rgb, alpha = _dxtColours(blocks, punchThrough=True)
+    elif format is CompressionFormat.DXT3:
+        rgb, _ = _dxtColours(blocks[:, 8:], punchThrough=False)
+        alpha = _explicitAlpha(blocks)
+    elif format is CompressionFormat.DXT5:
+        rgb, _ = _dxtColours(blocks[:, 8:], punchThrough=False)
+        alpha = _interpolatedAlpha(blocks)
+    elif format is CompressionFormat.ATC:
+        if blocks.shape[1] == 16:
+            rgb = _atcColours(blocks[:, 8:])
+            alpha = _interpolatedAlpha(blocks)
+        else:
+            rgb = _atcColours(blocks)
+    else:
+        if blocks.shape[1] == 16:
+            # EAC alpha precedes the colour block, and its base codeword approximates the block's alpha
+            rgb = _etcColours(blocks[:, 8:])
+            alpha = blocks[:, 0].astype(np.float32)
+        else:
+            rgb = _etcColours(blocks)
+
+    rgba = np.concatenate([rgb, alpha[:, None]], axis=1)
+    return np.clip(np.rint(rgba), 0, 255).astype(np.uint8).reshape(blocksY, blocksX, 4)
+
+
+def swapEtcRedBlue(compressed: bytes) -> bytes:
+    """Swap the red and blue channels of an ETC1-compressed image, without decoding it.
+    ETC1 blocks store each channel's base colours in separate bytes, with shared modifiers, so this is lossless.
+
+    :param compressed: The ETC1 (or ETC1-compatible ETC2) compressed image content
+    :type compressed: bytes
+    :return: `compressed`, with red and blue swapped in every block
+    :rtype: bytes
+    :raises ValueError: If `compressed` is not a whole number of 8-byte blocks
+    :raises ValueError: If `compressed` contains ETC2-only blocks, whose channels cannot be swapped
+    """
+    if len(compressed) % 8 != 0:
+        raise ValueError(f"Compressed image of {len(compressed)} bytes is not a whole number of ETC blocks")
+    
+    blocks = np.frombuffer(compressed, dtype=np.uint8).reshape(-1, 8)
+
+    # ETC2's T, H and planar modes are encoded as differential blocks whose second base colour overflows
+    channels = blocks[:, :3].astype(np.int16)
+    delta = channels & 0b111
+    offset = (channels >> 3) + np.where(delta >= 4, delta - 8, delta)
+    differential = (blocks[:, 3] & 0b10).astype(bool)
+    if (differential & ((offset < 0) | (offset > 31)).any(axis=1)).any():
+        raise ValueError("The image contains ETC2-only blocks, whose channels cannot be swapped")
+    
+    swapped = blocks[:, [2, 1, 0, 3, 4, 5, 6, 7]]
+    return swapped.tobytes()
@@ -1,4 +1,13 @@
+from typing import List, Literal, Tuple, Union
 from PIL import Image
+import numpy as np
+import numpy.typing as npt
+
+MipmapFilter = Literal["box", "kaiser"]
+AlphaUsage = Literal["opaque", "binary", "graded"]
+
+# The number of bytes of alpha scanned at a time by `alphaUsage`
+ALPHA_SCAN_CHUNK_SIZE = 1024 * 1024
 
 def switchRGBA_BGRA(im: Image.Image):
     """Swap the red and blue channels of an image, and return as a new image.
@@ -18,3 +27,184 @@ def switchRGBA_BGRA(im: Image.Image):
         return Image.merge("RGBA", (b, g, r, a))
     
     raise ValueError("Only RGB/RGBA images are accepted")
+
+
+def imageFromArray(array: npt.NDArray[np.uint8]) -> Image.Image:
+    """Wrap a `(height, width, 4)` uint8 array in an RGBA image, without copying.
+    If `array` is writeable, changes made to the image are made directly to `array`, and vice versa.
+    If `array` is read-only, the image will copy the pixel data on its first mutation.
+
+    :param array: The pixel data, in RGBA channel order
+    :type array: npt.NDArray[np.uint8]
+    :return: An RGBA image sharing memory with `array`
+    :rtype: Image.Image
+    :raises ValueError: If `array` is not a C-contiguous `(height, width, 4)` uint8 array
+    """
+    if array.ndim != 3 or array.shape[2] != 4:
+        raise ValueError(f"array must have shape (height, width, 4), but {array.shape} was given")
+    
+    if array.dtype != np.uint8:
+        raise ValueError(f"array must have dtype uint8, but {array.dtype} was given")
+    
+    if not array.flags.c_contiguous:
+        raise ValueError("array must be C-contiguous")
+    
+    im = Image.frombuffer("RGBA", (array.shape[1], array.shape[0]), array, "raw", "RGBA", 0, 1) # type: ignore[reportUnknownMemberType]
+    # frombuffer images are always marked as read-only, which causes pillow to copy on mutation
+    im.readonly = 0 if array.flags.writeable else 1
+    return im
+
+
+def arrayFromImage(im: Image.Image) -> npt.NDArray[np.uint8]:
+    """Copy the pixels of an image into a new `(height, width, 4)` uint8 array, in RGBA channel order.
+
+    :param im: The image to copy
+    :type im: Image.Image
+    :return: A new array containing the pixels of `im`
+    :rtype: npt.NDArray[np.uint8]
+    """
+    array = np.empty((im.height, im.width, 4), dtype=np.uint8)
+    # Pasting converts to RGBA directly into the array, without an intermediate copy
+    with imageFromArray(array) as view:
+        view.paste(im, (0, 0))
+    
+    return array
+
+
+def padToMultiple(im: Image.Image, multiple: Tuple[int, int]) -> Image.Image:
+    """Pad an image so that its dimensions are multiples of `multiple`, by repeating its edge pixels.
+    If `im` is already a multiple of `multiple`, it is returned as-is.
+
+    :param im: The image to pad
+    :type im: Image.Image
+    :param multiple: The (width, height) which the padded dimensions should be multiples of
+    :type multiple: Tuple[int, int]
+    :return: `im`, or a new padded image
+    :rtype: Image.Image
+    """
+    padX = -im.width % multiple[0]
+    padY = -im.height % multiple[1]
+    if padX == 0 and padY == 0:
+        return im
+    
+    array = np.asarray(im)
+    padding = ((0, padY), (0, padX)) + ((0, 0),) * (array.ndim - 2)
+    return Image.fromarray(np.pad(array, padding, mode="edge"), im.mode)
+
+
+def alphaUsage(source: Union[Image.Image, npt.NDArray[np.uint8]]) -> AlphaUsage:
+    """Find how an image uses its alpha channel, without copying the image.
+    - `opaque`: Every pixel is fully opaque
+    - `binary`: Every pixel is either fully opaque, or fully transparent
+    - `graded`: Some pixels are partially transparent
+
+    Arrays are scanned in chunks of rows, and can be views of a larger image.
+
+    :param source: The image, or a `(height, width, 4)` RGBA uint8 array
+    :type source: Union[Image.Image, npt.NDArray[np.uint8]]
+    :return: How `source` uses its alpha channel
+    :rtype: AlphaUsage
+    """
+    if isinstance(source, Image.Image):
+        bands = source.getbands()
+        if "A" not in bands:
+            return "opaque"
+
+        # The histogram is counted in place, one band after another
+        alphaStart = 256 * bands.index("A")
+        histogram = source.histogram()[alphaStart : alphaStart + 256] # type: ignore[reportUnknownMemberType]
+        if not any(histogram[:255]):
+            return "opaque"
+        return "binary" if not any(histogram[1:255]) else "graded"
+
+    usage: AlphaUsage = "opaque"
+    rows = max(1, ALPHA_SCAN_CHUNK_SIZE // max(1, source.shape[1]))
+    for start in range(0, source.shape[0], rows):
+        alpha = source[start : start + rows, :, 3]
+        if usage == "opaque" and (alpha == 255).all():
+            continue
+
+        if not ((alpha == 0) | (alpha == 255)).all():
+            return "graded"
+        usage = "binary"
+
+    return usage
+
+
+def _strided(array: npt.NDArray[np.float32], axis: int, start: int, count: int) -> npt.NDArray[np.float32]:
+    # A view of every other element along `axis`, without copying
+    index = (slice(None),) * axis + (slice(start, start + 2 * count, 2),)
+    return array[index]
+
+
+def _halveAxisBox(array: npt.NDArray[np.float32], axis: int) -> npt.NDArray[np.float32]:
+    length = array.shape[axis]
+    if length == 1:
+        return array
+    
+    half = length // 2
+    return (_strided(array, axis, 0, half) + _strided(array, axis, 1, half)) * 0.5
+
+
+def _kaiserKernel(taps: int = 8, beta: float = 4.0) -> npt.NDArray[np.float32]:
+    # Windowed sinc with a cutoff at half the sample rate, centred between two source pixels
+    offsets = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(offsets / 2) * np.kaiser(taps, beta)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def _halveAxisKaiser(array: npt.NDArray[np.float32], axis: int, kernel: npt.NDArray[np.float32]) -> npt.NDArray[np.float32]:
+    length = array.shape[axis]
+    if length == 1:
+        return array
+    
+    half = length // 2
+    taps = len(kernel)
+    before = taps // 2 - 1
+    padding = [(0, 0)] * array.ndim
+    padding[axis] = (before, taps - before)
+    padded = np.pad(array, padding, mode="edge")
+
+    # Output pixel i is centred at input 2i + 0.5, so reads inputs 2i - before ... 2i - before + taps - 1
+    result = np.zeros(array.shape[:axis] + (half,) + array.shape[axis + 1:], dtype=np.float32)
+    for tap, weight in enumerate(kernel):
+        result += weight * _strided(padded, axis, tap, half)
+    
+    return result
+
+
+def downsample(array: npt.NDArray[np.uint8], filter: MipmapFilter = "box") -> npt.NDArray[np.uint8]:
+    """Halve the dimensions of a `(height, width, channels)` uint8 array, rounding down to a minimum of 1.
+    This is the next level of a mip chain.
+
+    :param array: The pixels to downsample
+    :type array: npt.NDArray[np.uint8]
+    :param filter: The downsampling filter. `box` averages 2x2 pixel groups, `kaiser` is a sharper windowed sinc. defaults to "box"
+    :type filter: MipmapFilter
+    :return: A new, downsampled array
+    :rtype: npt.NDArray[np.uint8]
+    """
+    pixels = array.astype(np.float32)
+    if filter == "box":
+        pixels = _halveAxisBox(_halveAxisBox(pixels, 0), 1)
+    elif filter == "kaiser":
+        kernel = _kaiserKernel()
+        pixels = _halveAxisKaiser(_halveAxisKaiser(pixels, 0, kernel), 1, kernel)
+    else:
+        raise ValueError(f"Unknown filter '{filter}'")
+    
+    return np.clip(np.rint(pixels), 0, 255).astype(np.uint8)
+
+
+def mipmapShapes(width: int, height: int) -> List[Tuple[int, int]]:
+    """Get the (width, height) of each level of a full mip chain, from (`width`, `height`) down to (1, 1).
+
+    :param width: The width of the base level
+    :type width: int
+    :param height: The height of the base level
+    :type height: int
+    :return: The shape of every mip level, including the base level
+    :rtype: List[Tuple[int, int]]
+    """
+    levels = max(width, height).bit_length()
+    return [(max(1, width >> level), max(1, height >> level)) for level in range(levels)]
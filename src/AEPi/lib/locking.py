@@ -0,0 +1,117 @@
+from contextlib import contextmanager
+from functools import wraps
+from threading import Condition, get_ident, local
+from typing import Any, Callable, Iterator, Optional, TypeVar, cast
+
+TFunc = TypeVar("TFunc", bound=Callable[..., Any])
+
+
+class ReadWriteLock:
+    """A lock which can be held by any number of threads for reading, or by a single thread for writing.
+    Waiting writers are preferred over new readers, so that a steady stream of readers cannot starve writers.
+
+    The lock is reentrant. A thread holding the lock for writing may acquire it again for reading or writing,
+    and a thread holding the lock for reading may acquire it again for reading.
+    A thread holding the lock only for reading cannot acquire it for writing, as two such threads would deadlock.
+
+    ```py
+    lock = ReadWriteLock()
+    with lock.read():
+        ...
+    with lock.write():
+        ...
+    ```
+    """
+    def __init__(self) -> None:
+        self._condition = Condition()
+        self._readers = 0
+        self._waitingWriters = 0
+        self._writer: Optional[int] = None
+        # The number of nested read acquisitions held by each thread
+        self._held = local()
+
+
+    def _readDepth(self) -> int:
+        return getattr(self._held, "depth", 0)
+
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock for reading within the `with` block.
+        Blocks while another thread holds, or is waiting for, the lock for writing.
+        """
+        depth = self._readDepth()
+        # Re-entry never waits, as this thread already excludes writers
+        if self._writer == get_ident() or depth > 0:
+            self._held.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._held.depth = depth
+            return
+
+        with self._condition:
+            while self._writer is not None or self._waitingWriters:
+                self._condition.wait()
+            self._readers += 1
+
+        self._held.depth = 1
+        try:
+            yield
+        finally:
+            self._held.depth = 0
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock for writing within the `with` block.
+        Blocks while any other thread holds the lock.
+
+        :raises RuntimeError: If this thread holds the lock only for reading
+        """
+        if self._writer == get_ident():
+            yield
+            return
+
+        if self._readDepth() > 0:
+            raise RuntimeError("Cannot acquire the lock for writing while holding it for reading")
+
+        with self._condition:
+            self._waitingWriters += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waitingWriters -= 1
+            self._writer = get_ident()
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+
+def readLocked(method: TFunc) -> TFunc:
+    """Decorate a method to hold `self._lock` for reading while it runs.
+    """
+    @wraps(method)
+    def inner(self: Any, *args: Any, **kwargs: Any) -> Any:
+        with self._lock.read():
+            return method(self, *args, **kwargs)
+    return cast(TFunc, inner)
+
+
+def writeLocked(method: TFunc) -> TFunc:
+    """Decorate a method to hold `self._lock` for writing while it runs.
+    """
+    @wraps(method)
+    def inner(self: Any, *args: Any, **kwargs: Any) -> Any:
+        with self._lock.write():
+            return method(self, *args, **kwargs)
+    return cast(TFunc, inner)
@@ -0,0 +1,101 @@
+import numpy as np
+import numpy.typing as npt
+
+# The side length of the square windows over which SSIM statistics are computed
+SSIM_WINDOW = 8
+# The number of values differenced at a time by `mse`
+CHUNK_SIZE = 1024 * 1024
+
+_MAX = 255.0
+_C1 = (0.01 * _MAX) ** 2
+_C2 = (0.03 * _MAX) ** 2
+
+
+def _validatePair(a: npt.NDArray[np.uint8], b: npt.NDArray[np.uint8]):
+    if a.shape != b.shape:
+        raise ValueError(f"Images must have the same shape, but got {a.shape} and {b.shape}")
+
+    if a.size == 0:
+        raise ValueError("Images must not be empty")
+
+
+def mse(a: npt.NDArray[np.uint8], b: npt.NDArray[np.uint8]) -> float:
+    """The mean squared error between two images, over all channels.
+
+    :param a: A `(height, width, channels)` uint8 array
+    :type a: npt.NDArray[np.uint8]
+    :param b: An array of the same shape as `a`
+    :type b: npt.NDArray[np.uint8]
+    :return: The mean squared error
+    :rtype: float
+    :raises ValueError: If `a` and `b` have different shapes, or are empty
+    """
+    _validatePair(a, b)
+    # Differences are accumulated in chunks of rows, to bound the memory of the float intermediates
+    rows = max(1, CHUNK_SIZE // max(1, a[0].size))
+    total = 0.0
+    for start in range(0, a.shape[0], rows):
+        diff = a[start : start + rows].astype(np.float64) - b[start : start + rows]
+        total += float(np.vdot(diff, diff))
+    return total / a.size
+
+
+def psnr(a: npt.NDArray[np.uint8], b: npt.NDArray[np.uint8]) -> float:
+    """The peak signal-to-noise ratio between two images, over all channels, in decibels.
+    Higher is better. Identical images have infinite PSNR.
+
+    :param a: A `(height, width, channels)` uint8 array
+    :type a: npt.NDArray[np.uint8]
+    :param b: An array of the same shape as `a`
+    :type b: npt.NDArray[np.uint8]
+    :return: The PSNR of `b` relative to `a`
+    :rtype: float
+    :raises ValueError: If `a` and `b` have different shapes, or are empty
+    """
+    error = mse(a, b)
+    if error == 0:
+        return float("inf")
+    return float(10 * np.log10(_MAX * _MAX / error))
+
+
+def _windowMeans(x: npt.NDArray[np.float64], size: int) -> npt.NDArray[np.float64]:
+    # The mean of every size x size window, from an integral image
+    integral = np.zeros((x.shape[0] + 1, x.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(x, axis=0), axis=1, out=integral[1:, 1:])
+    sums = integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size]
+    return sums / (size * size)
+
+
+def ssim(a: npt.NDArray[np.uint8], b: npt.NDArray[np.uint8]) -> float:
+    """The mean structural similarity between two images, averaged over all channels.
+    Statistics are computed over every `SSIM_WINDOW` x `SSIM_WINDOW` window, or the whole image if it is smaller.
+    1 is identical, lower is worse.
+
+    :param a: A `(height, width, channels)` uint8 array
+    :type a: npt.NDArray[np.uint8]
+    :param b: An array of the same shape as `a`
+    :type b: npt.NDArray[np.uint8]
+    :return: The SSIM of `b` relative to `a`
+    :rtype: float
+    :raises ValueError: If `a` and `b` have different shapes, or are empty
+    """
+    _validatePair(a, b)
+    size = min(SSIM_WINDOW, a.shape[0], a.shape[1])
+
+    total = 0.0
+    # Channels are compared separately, to bound the memory of the float intermediates
+    for channel in range(a.shape[2]):
+        x = a[..., channel].astype(np.float64)
+        y = b[..., channel].astype(np.float64)
+
+        meanX = _windowMeans(x, size)
+        meanY = _windowMeans(y, size)
+        varianceX = _windowMeans(x * x, size) - meanX * meanX
+        varianceY = _windowMeans(y * y, size) - meanY * meanY
+        covariance = _windowMeans(x * y, size) - meanX * meanY
+
+        similarity = ((2 * meanX * meanY + _C1) * (2 * covariance + _C2)) \
+            / ((meanX * meanX + meanY * meanY + _C1) * (varianceX + varianceY + _C2))
+        total += float(similarity.mean())
+
+    return total / a.shape[2]
@@ -0,0 +1,48 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+
+
+def _alignUp(value: int, alignment: int) -> int:
+    return -(-value // alignment) * alignment
+
+
+def packShelves(shapes: Sequence[Tuple[int, int]], alignment: int = 1, maxWidth: Optional[int] = None) -> Tuple[List[Tuple[int, int]], Tuple[int, int]]:
+    """Pack rectangles into rows ("shelves"), tallest first, without overlap.
+    Each rectangle is placed at a multiple of `alignment`, so that rectangles do not share compression blocks when `alignment` is the block size.
+
+    :param shapes: The (width, height) of each rectangle
+    :type shapes: Sequence[Tuple[int, int]]
+    :param alignment: The multiple that every position is rounded up to. defaults to 1
+    :type alignment: int, optional
+    :param maxWidth: The width of each shelf. defaults to roughly the width of a square holding all of the rectangles
+    :type maxWidth: Optional[int], optional
+    :raises ValueError: If `alignment` is not positive, or a rectangle is empty or wider than `maxWidth`
+    :return: The (x, y) of each rectangle, in the order of `shapes`, and the (width, height) of the area used
+    :rtype: Tuple[List[Tuple[int, int]], Tuple[int, int]]
+    """
+    if alignment < 1:
+        raise ValueError(f"alignment must be positive, but {alignment} was given")
+    if any(w < 1 or h < 1 for w, h in shapes):
+        raise ValueError("Rectangles must not be empty")
+
+    aligned = [(_alignUp(w, alignment), _alignUp(h, alignment)) for w, h in shapes]
+    if maxWidth is None:
+        area = sum(w * h for w, h in aligned)
+        maxWidth = max([_alignUp(math.isqrt(area - 1) + 1, alignment) if area else 0] + [w for w, _ in aligned])
+    elif any(w > maxWidth for w, _ in aligned):
+        raise ValueError(f"A rectangle is wider than the maximum width of {maxWidth}, once aligned")
+
+    positions: List[Tuple[int, int]] = [(0, 0)] * len(shapes)
+    x = y = shelfHeight = usedWidth = 0
+    for i in sorted(range(len(shapes)), key=lambda i: (-aligned[i][1], -aligned[i][0])):
+        w, h = aligned[i]
+        if x + w > maxWidth:
+            y += shelfHeight
+            x = shelfHeight = 0
+
+        positions[i] = (x, y)
+        x += w
+        shelfHeight = max(shelfHeight, h)
+        usedWidth = max(usedWidth, x)
+
+    return positions, (usedWidth, y + shelfHeight)
@@ -0,0 +1,360 @@
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from contextvars import copy_context
+from os import PathLike
+from types import TracebackType
+from typing import IO, Any, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from .constants import CompressionFormat, CompressionQuality, FORMAT_BITCOUNTS
+from .exceptions import AeiWriteException
+from .image import CompressedAEI, Texture
+from .image.compressedAEI import _atomicFile, _UINT32
+from .lib import imageOps
+from . import codec
+
+TException = TypeVar("TException", bound=Exception)
+
+# The number of rows of each mip level compressed at a time, before rounding up to whole blocks
+STRIPE_HEIGHT = 256
+# The size above which compressed lower mip levels are spooled to a temporary file until the full-size level is written
+SPOOL_SIZE = 16 * 1024 * 1024
+
+# PVRTC blocks are not stored in row order, and depend on their neighbours, so can't be compressed a stripe at a time
+STRIPE_FORMATS = {
+    format for format in FORMAT_BITCOUNTS
+    if format not in (CompressionFormat.PVRTC12A, CompressionFormat.PVRTC14A)
+}
+
+
+class _Level:
+    def __init__(self, width: int, height: int, stripeHeight: int, output: IO[bytes]) -> None:
+        self.width = width
+        self.height = height
+        self.stripeHeight = stripeHeight
+        self.output = output
+        # Rows which have been received, but not yet compressed
+        self.buffered: List[npt.NDArray[np.uint8]] = []
+        self.numBuffered = 0
+        self.received = 0
+        self.written = 0
+
+
+    def take(self, final: bool) -> Iterator[npt.NDArray[np.uint8]]:
+        # Whole stripes of buffered rows, and any remainder once the level is complete
+        while self.numBuffered >= self.stripeHeight or final and self.numBuffered:
+            rows = self.buffered[0] if len(self.buffered) == 1 else np.concatenate(self.buffered)
+            count = min(self.stripeHeight, self.numBuffered)
+            self.buffered = [rows[count:]] if count < len(rows) else []
+            self.numBuffered -= count
+            yield rows[:count]
+
+
+class StripeWriter:
+    """Compress and write an AEI whose image content is supplied a few rows at a time, without holding the whole image in memory.
+    Memory use is proportional to the width of the AEI, rather than its area, so images far larger than memory can be written.
+
+    Rows are gathered into stripes of whole compression blocks, which are compressed concurrently and written in order.
+    The mip chain is generated with the box filter, a stripe at a time. The full-size image is written to `fp` as it is compressed,
+    while smaller mip levels are kept in memory, or spooled to a temporary file once large, until the full-size image is complete.
+    The output is identical to compressing the whole image at once with `AEI.write`.
+
+    ```py
+    with StripeWriter("terrain.aei", (16384, 16384), CompressionFormat.DXT5, mipmapped=True) as writer:
+        for y in range(0, 16384, 512):
+            writer.write(renderRows(y, 512))
+    ```
+
+    :param fp: The path to write to, which is replaced atomically when the writer is closed, or a file to write to
+    :type fp: Union[str, PathLike, BinaryIO]
+    :param shape: The (width, height) of the AEI
+    :type shape: Tuple[int, int]
+    :param format: The compression format
+    :type format: CompressionFormat
+    :param quality: The compression quality. defaults to None
+    :type quality: Optional[CompressionQuality], optional
+    :param mipmapped: Whether to generate and write a mip chain. defaults to False
+    :type mipmapped: bool, optional
+    :param textures: The textures of the AEI. defaults to a single texture covering the whole AEI, unless `fonts` are given
+    :type textures: Optional[List[Texture]], optional
+    :param fonts: The symbol maps of the AEI. defaults to no symbol maps
+    :type fonts: Optional[List[Dict[str, Texture]]], optional
+    :param workers: The number of stripes to compress at once. defaults to the `ThreadPoolExecutor` default
+    :type workers: Optional[int], optional
+    :param stripeHeight: The number of rows to compress at a time, rounded up to whole blocks. defaults to `STRIPE_HEIGHT`
+    :type stripeHeight: int, optional
+    :raises ValueError: If `format` can't be compressed a stripe at a time, or does not support mipmapping when `mipmapped` is given
+    :raises UnsupportedCompressionFormatException: If no compatible codec is loaded
+    """
+    def __init__(
+            self,
+            fp: Union[str, PathLike[Any], BinaryIO],
+            shape: Tuple[int, int],
+            format: CompressionFormat,
+            quality: Optional[CompressionQuality] = None,
+            mipmapped: bool = False,
+            textures: Optional[List[Texture]] = None,
+            fonts: Optional[List[Dict[str, Texture]]] = None,
+            workers: Optional[int] = None,
+            stripeHeight: int = STRIPE_HEIGHT
+        ) -> None:
+        if format not in STRIPE_FORMATS:
+            raise ValueError(f"Compression format {format.name} can't be compressed a stripe at a time")
+        if mipmapped and not format.supportsMipmapping:
+            raise ValueError(f"Compression format {format.name} does not support mipmapping")
+        codec.compressorFor(format)
+
+        width, height = shape
+        fonts = list(fonts or [])
+        textures = list(textures or [])
+        if len(textures) == 0 and len(fonts) == 0:
+            textures.append(Texture(0, 0, width, height))
+
+        self.format = format
+        self.quality: Optional[CompressionQuality] = quality
+        self._metadata = CompressedAEI(format, width, height, [], textures, fonts, quality, mipmapped)
+        self._closed = False
+
+        # Stripes must be whole blocks, and an even number of rows so that each halves exactly into the next mip level
+        blockHeight = format.blockShape[1]
+        alignment = blockHeight if blockHeight % 2 == 0 else 2 * blockHeight
+        stripeHeight = -(-max(1, stripeHeight) // alignment) * alignment
+
+        # Matches the ThreadPoolExecutor default
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self._window = 2 * workers
+        self._pending: Deque[Tuple[_Level, Future[bytes]]] = deque()
+
+        self._stack = ExitStack()
+        try:
+            if isinstance(fp, (str, PathLike)):
+                self._file: BinaryIO = self._stack.enter_context(_atomicFile(fp))
+            else:
+                self._file = fp
+
+            self._executor = self._stack.enter_context(ThreadPoolExecutor(workers))
+            shapes = self._metadata.mipmapShapes
+            self._levels = [_Level(width, height, stripeHeight, self._file)]
+            for w, h in shapes[1:]:
+                spool = self._stack.enter_context(tempfile.SpooledTemporaryFile(SPOOL_SIZE))
+                self._levels.append(_Level(w, h, stripeHeight, spool)) # type: ignore[reportArgumentType]
+
+            self._file.write(self._metadata._packHeaderMeta()) # type: ignore[reportPrivateUsage]
+            self._writeImageLength(self._levels[0])
+
+        except BaseException as ex:
+            self._stack.__exit__(type(ex), ex, ex.__traceback__)
+            raise
+
+
+    @property
+    def rowsWritten(self) -> int:
+        """The number of rows of the full-size image received so far.
+        """
+        return self._levels[0].received
+
+
+    def write(self, rows: npt.NDArray[np.uint8]):
+        """Add the next rows of the full-size image, from the top down.
+        `rows` may be any number of rows, and is not altered. It must not be changed until the writer is closed.
+
+        :param rows: A `(rows, width, 4)` uint8 array in RGBA channel order
+        :type rows: npt.NDArray[np.uint8]
+        :raises ValueError: If the writer is closed, `rows` has the wrong shape, or `rows` extends past the bottom of the AEI
+        :raises AeiWriteException: If compression fails
+        """
+        if self._closed:
+            raise ValueError("The writer is closed")
+        level = self._levels[0]
+        if rows.ndim != 3 or rows.shape[1:] != (level.width, 4) or rows.dtype != np.uint8:
+            raise ValueError(f"rows must be a (rows, {level.width}, 4) uint8 array, but a {rows.dtype} array of shape {rows.shape} was given")
+        if level.received + len(rows) > level.height:
+            raise ValueError(f"The AEI is {level.height} rows high, but {level.received + len(rows)} rows were given")
+
+        try:
+            self._feed(0, rows)
+        except Exception as ex:
+            raise AeiWriteException(None, ex) from ex
+
+
+    def _feed(self, index: int, rows: npt.NDArray[np.uint8]):
+        level = self._levels[index]
+        if len(rows):
+            level.buffered.append(rows)
+            level.numBuffered += len(rows)
+            level.received += len(rows)
+
+        for stripe in level.take(level.received == level.height):
+            self._compress(level, stripe)
+            if index + 1 < len(self._levels):
+                # An odd final row is dropped, as `imageOps.downsample` does for the whole image
+                if level.height > 1:
+                    stripe = stripe[: len(stripe) // 2 * 2]
+                if len(stripe):
+                    self._feed(index + 1, imageOps.downsample(stripe))
+
+
+    def _compress(self, level: _Level, stripe: npt.NDArray[np.uint8]):
+        # Workers run in a copy of this context, so that instrumentation is collected from them
+        image = imageOps.imageFromArray(np.ascontiguousarray(stripe))
+        self._pending.append((level, self._executor.submit(copy_context().run, codec.encodeImage, image, self.format, self.quality)))
+        while len(self._pending) >= self._window:
+            self._writeNext()
+
+
+    def _writeNext(self):
+        level, compressed = self._pending.popleft()
+        payload = compressed.result()
+        level.output.write(payload)
+        level.written += len(payload)
+
+
+    def _writeImageLength(self, level: _Level):
+        # image length only appears in compressed AEIs
+        if self.format.isCompressed:
+            self._file.write(_UINT32.pack(self.format.imageLength(level.width, level.height)))
+
+
+    def _finish(self):
+        if self.rowsWritten != self._levels[0].height:
+            raise ValueError(f"The AEI is {self._levels[0].height} rows high, but only {self.rowsWritten} rows were given")
+
+        while self._pending:
+            self._writeNext()
+
+        for i, level in enumerate(self._levels):
+            expected = self.format.imageLength(level.width, level.height)
+            if level.written != expected:
+                raise ValueError(f"Mip level {i} compressed to {level.written} bytes, but a {level.width}x{level.height} {self.format.name} image is {expected} bytes")
+
+            if i > 0:
+                self._writeImageLength(level)
+                level.output.seek(0)
+                shutil.copyfileobj(level.output, self._file)
+
+        self._file.write(self._metadata._packSymbols()) # type: ignore[reportPrivateUsage]
+
+
+    def close(self):
+        """Finish writing the AEI. If writing to a path, the file is then moved into place.
+
+        :raises ValueError: If fewer rows were written than the height of the AEI
+        :raises AeiWriteException: If compression or writing fails
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            self._finish()
+        except BaseException as ex:
+            self._abort(ex)
+            if isinstance(ex, Exception) and not isinstance(ex, ValueError):
+                raise AeiWriteException(None, ex) from ex
+            raise
+
+        self._stack.close()
+
+
+    def _abort(self, ex: BaseException):
+        for _, compressed in self._pending:
+            compressed.cancel()
+        self._pending.clear()
+        # Removes the temporary file when writing to a path
+        self._stack.__exit__(type(ex), ex, ex.__traceback__)
+
+
+    def __enter__(self):
+        """This method is called when entering a `with` statement.
+        """
+        return self
+
+
+    def __exit__(self, exceptionType: Type[TException], exception: TException, trace: TracebackType):
+        """This method is called when exiting a `with` statement.
+        If the `with` block raised, the AEI is discarded. Otherwise, it is finished with `close`.
+        """
+        if exception is None:
+            self.close()
+        elif not self._closed:
+            self._closed = True
+            self._abort(exception)
+
+
+def writeStripes(
+        fp: Union[str, PathLike[Any], BinaryIO],
+        shape: Tuple[int, int],
+        stripes: Iterable[npt.NDArray[np.uint8]],
+        format: CompressionFormat,
+        quality: Optional[CompressionQuality] = None,
+        mipmapped: bool = False,
+        textures: Optional[List[Texture]] = None,
+        fonts: Optional[List[Dict[str, Texture]]] = None,
+        workers: Optional[int] = None
+    ):
+    """Compress and write an AEI whose image content is supplied as stripes of rows, from the top down, with a `StripeWriter`.
+    `stripes` is consumed lazily, so only a few stripes are held in memory at once.
+
+    :param fp: The path to write to, which is replaced atomically, or a file to write to
+    :type fp: Union[str, PathLike, BinaryIO]
+    :param shape: The (width, height) of the AEI
+    :type shape: Tuple[int, int]
+    :param stripes: `(rows, width, 4)` uint8 arrays in RGBA channel order, which together cover the AEI
+    :type stripes: Iterable[npt.NDArray[np.uint8]]
+    :param format: The compression format
+    :type format: CompressionFormat
+    :param quality: The compression quality. defaults to None
+    :type quality: Optional[CompressionQuality], optional
+    :param mipmapped: Whether to generate and write a mip chain. defaults to False
+    :type mipmapped: bool, optional
+    :param textures: The textures of the AEI. defaults to a single texture covering the whole AEI, unless `fonts` are given
+    :type textures: Optional[List[Texture]], optional
+    :param fonts: The symbol maps of the AEI. defaults to no symbol maps
+    :type fonts: Optional[List[Dict[str, Texture]]], optional
+    :param workers: The number of stripes to compress at once. defaults to the `ThreadPoolExecutor` default
+    :type workers: Optional[int], optional
+    :raises ValueError: If the stripes do not cover the AEI, or `format` can't be compressed a stripe at a time
+    :raises AeiWriteException: If compression or writing fails
+    """
+    with StripeWriter(fp, shape, format, quality, mipmapped, textures, fonts, workers) as writer:
+        for stripe in stripes:
+            writer.write(stripe)
+
+
+def tileStripes(readTile: Callable[[int, int, int, int], npt.NDArray[np.uint8]], shape: Tuple[int, int], tileShape: Tuple[int, int]) -> Iterator[npt.NDArray[np.uint8]]:
+    """Assemble stripes for `StripeWriter` from an image supplied as tiles, one row of tiles at a time.
+    Only a single row of tiles is held in memory at once.
+
+    ```py
+    writeStripes("skybox.aei", (8192, 8192), tileStripes(readTile, (8192, 8192), (1024, 1024)), CompressionFormat.DXT1)
+    ```
+
+    :param readTile: Called with the x, y, width and height of each tile, returning a `(height, width, 4)` uint8 array in RGBA channel order.
+    Tiles at the right and bottom edges are cropped to the image
+    :type readTile: Callable[[int, int, int, int], npt.NDArray[np.uint8]]
+    :param shape: The (width, height) of the image
+    :type shape: Tuple[int, int]
+    :param tileShape: The (width, height) of each tile
+    :type tileShape: Tuple[int, int]
+    :raises ValueError: If `readTile` returns an array of the wrong shape
+    :return: A `(rows, width, 4)` stripe for each row of tiles
+    :rtype: Iterator[npt.NDArray[np.uint8]]
+    """
+    width, height = shape
+    tileWidth, tileHeight = tileShape
+    for y in range(0, height, tileHeight):
+        rows = min(tileHeight, height - y)
+        stripe = np.empty((rows, width, 4), dtype=np.uint8)
+        for x in range(0, width, tileWidth):
+            columns = min(tileWidth, width - x)
+            tile = readTile(x, y, columns, rows)
+            if tile.shape != (rows, columns, 4):
+                raise ValueError(f"The tile at ({x}, {y}) should have shape {(rows, columns, 4)}, but has shape {tile.shape}")
+            stripe[:, x : x + columns] = tile
+        yield stripe
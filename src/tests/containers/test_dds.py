@@ -0,0 +1,51 @@
+import io
+import pytest
+from AEPi import CompressionFormat
+from AEPi.containers import readDds, writeDds
+from AEPi.exceptions import AeiReadException, UnsupportedCompressionFormatException
+from AEPi.image.compressedAEI import CompressedAEI
+
+# 8x8 of DXT5 blocks, followed by its 4x4, 2x2 and 1x1 mip levels
+DXT5_MIPMAPS = [bytes(range(64)), b"\x01" * 16, b"\x02" * 16, b"\x03" * 16]
+
+
+def test_writeDds_readDds_roundTrip():
+    compressed = CompressedAEI(CompressionFormat.DXT5, 8, 8, DXT5_MIPMAPS, mipmapped=True)
+    dds = writeDds(compressed)
+    dds.seek(0)
+    actual = readDds(dds)
+    assert actual.format is CompressionFormat.DXT5
+    assert actual.shape == (8, 8)
+    assert actual.mipmapped
+    assert actual.mipmaps == DXT5_MIPMAPS
+    assert [t.shape for t in actual.textures] == [(8, 8)]
+
+
+def test_writeDds_writesHeader():
+    compressed = CompressedAEI(CompressionFormat.DXT1, 4, 4, [b"\x00" * 8])
+    dds = writeDds(compressed).getvalue() # type: ignore[reportAttributeAccessIssue]
+    assert dds[:4] == b"DDS "
+    assert dds[84:88] == b"DXT1"
+    assert len(dds) == 128 + 8
+
+
+def test_writeDds_unsupportedFormat_raises():
+    compressed = CompressedAEI(CompressionFormat.ETC1, 4, 4, [b"\x00" * 8])
+    with pytest.raises(UnsupportedCompressionFormatException):
+        writeDds(compressed)
+
+
+def test_readDds_partialMipChain_raises():
+    compressed = CompressedAEI(CompressionFormat.DXT5, 8, 8, DXT5_MIPMAPS[:2])
+    dds = writeDds(compressed)
+    dds.seek(0)
+    with pytest.raises(AeiReadException):
+        readDds(dds)
+
+
+
+def test_readDds_truncated_raises():
+    dds = writeDds(CompressedAEI(CompressionFormat.DXT5, 8, 8, DXT5_MIPMAPS[:1]))
+    with pytest.raises(AeiReadException) as info:
+        readDds(io.BytesIO(dds.getvalue()[:-5])) # type: ignore[reportAttributeAccessIssue]
+    assert "5 bytes short" in str(info.value.__cause__)
@@ -0,0 +1,59 @@
+import io
+import pytest
+from AEPi import CompressionFormat
+from AEPi.containers import readKtx, writeKtx
+from AEPi.exceptions import AeiReadException, UnsupportedCompressionFormatException
+from AEPi.image.compressedAEI import CompressedAEI
+
+# An ETC1 differential block with base colours (0xF8, 0x48, 0x00)
+ETC1_BLOCK = b"\xF8\x48\x00\x02\x11\x22\x33\x44"
+
+
+def test_writeKtx_readKtx_roundTrip():
+    compressed = CompressedAEI(CompressionFormat.ETC1, 4, 4, [ETC1_BLOCK], quality=3)
+    ktx = writeKtx(compressed)
+    ktx.seek(0)
+    actual = readKtx(ktx, quality=3)
+    assert actual.format is CompressionFormat.ETC1
+    assert actual.shape == (4, 4)
+    assert actual.mipmaps == [ETC1_BLOCK]
+    assert actual.quality == 3
+
+
+def test_writeKtx_ETC1_swapsToRGB():
+    compressed = CompressedAEI(CompressionFormat.ETC1, 4, 4, [ETC1_BLOCK])
+    ktx = writeKtx(compressed).getvalue() # type: ignore[reportAttributeAccessIssue]
+    assert ktx[:12] == b"\xABKTX 11\xBB\r\n\x1A\n"
+    # header, then the level size
+    assert ktx[68:76] == b"\x00\x48\xF8\x02\x11\x22\x33\x44"
+
+
+def test_writeKtx_DXT5_isByteForByte():
+    block = bytes(range(16))
+    compressed = CompressedAEI(CompressionFormat.DXT5, 4, 4, [block])
+    ktx = writeKtx(compressed).getvalue() # type: ignore[reportAttributeAccessIssue]
+    assert ktx[68:] == block
+
+
+def test_writeKtx_unsupportedFormat_raises():
+    compressed = CompressedAEI(CompressionFormat.Uncompressed_UI, 1, 1, [b"\x00" * 4])
+    with pytest.raises(UnsupportedCompressionFormatException):
+        writeKtx(compressed)
+
+
+def test_readKtx_truncated_raises():
+    ktx = writeKtx(CompressedAEI(CompressionFormat.ETC1, 4, 4, [ETC1_BLOCK])).getvalue() # type: ignore[reportAttributeAccessIssue]
+    with pytest.raises(AeiReadException) as info:
+        readKtx(io.BytesIO(ktx[:-3]))
+    assert "3 bytes short" in str(info.value.__cause__)
+
+    with pytest.raises(AeiReadException):
+        readKtx(io.BytesIO(ktx[:66]))
+
+
+def test_readKtx_wrongLevelLength_raises():
+    ktx = bytearray(writeKtx(CompressedAEI(CompressionFormat.ETC1, 4, 4, [ETC1_BLOCK])).getvalue()) # type: ignore[reportAttributeAccessIssue]
+    # The length of the first mip level follows the 64 byte header
+    ktx[64:68] = (4).to_bytes(4, "little")
+    with pytest.raises(AeiReadException):
+        readKtx(io.BytesIO(bytes(ktx)))
@@ -1,12 +1,15 @@
 from io import BytesIO
+from pathlib import Path
 
 from PIL.Image import Image
 from AEPi import AEI, Texture, CompressionFormat
 from AEPi.codec import ImageCodecAdaptor, supportsFormats
 import pytest
+import numpy as np
 from PIL import Image
 
 from AEPi.constants import CompressionFormat
+from AEPi.exceptions import AeiReadException
 
 SMILEY_AEI_2TEXTURES_PATH = "src/tests/assets/smiley_ATC_twotextures_nomipmap_nosymbols_high.aei"
 SMILEY_PNG_PATH = "src/tests/assets/smiley.png"
@@ -44,7 +47,8 @@ class MockCodec(ImageCodecAdaptor):
     def decompress(cls, fp, format, width, height, quality): # type: ignore[reportMissingParameterType]
         if g_useSmiley:
             return smileyImage()
-        return DECOMPRESSED
+        # AEI.read takes ownership of decompressed images
+        return DECOMPRESSED.copy()
 
 #region dimensions
 
@@ -223,6 +227,19 @@ def test_write_symbols_isCorrect():
            
     g_useSmiley = False
 
+
+def test_write_toPath_canBeRead(tmp_path: Path):
+    path = tmp_path / "smiley.aei"
+    with smileyImage() as png:
+        with AEI(png) as aei:
+            aei.addTexture(0, 0, 8, 8)
+            aei.write(path, format=CompressionFormat.Uncompressed_UI)
+
+            with AEI.read(path) as new_aei:
+                assert [t.shape for t in new_aei.textures] == [(8, 8)]
+                with new_aei.getTexture(0, 0, 8, 8) as actual, aei.getTexture(0, 0, 8, 8) as expected:
+                    assert actual.tobytes() == expected.tobytes()
+
 #endregion write
 #endregion aei files
 #region textures
@@ -350,3 +367,414 @@ def test_getTexture_outOfBounds_warns():
         aei.getTexture(Texture(5, 0, 10, 10))
 
 #endregion textures
+#region arrays
+
+def test_fromArray_sharesMemory():
+    array = np.zeros((2, 3, 4), dtype=np.uint8)
+    with AEI.fromArray(array) as aei:
+        assert aei.shape == (3, 2)
+        array[1, 2] = (1, 2, 3, 4)
+        assert aei._image.getpixel((2, 1)) == (1, 2, 3, 4) # type: ignore[reportUnknownMemberType]
+
+
+def test_fromArray_addTexture_writesToArray():
+    array = np.zeros((16, 16, 4), dtype=np.uint8)
+    with Image.new("RGBA", (1, 1), (255, 255, 255, 255)) as png, AEI.fromArray(array) as aei:
+        aei.addTexture(png, 2, 3)
+        assert tuple(array[3, 2]) == (255, 255, 255, 255)
+
+
+def test_fromArray_readOnly_copiesOnMutation():
+    array = np.zeros((1, 1, 4), dtype=np.uint8)
+    array.flags.writeable = False
+    with Image.new("RGBA", (1, 1), (255, 255, 255, 255)) as png, AEI.fromArray(array) as aei:
+        aei.addTexture(png, 0, 0)
+        assert tuple(array[0, 0]) == (0, 0, 0, 0)
+        assert tuple(aei.asArray()[0, 0]) == (255, 255, 255, 255)
+
+
+def test_fromArray_incorrectShape_raises():
+    with pytest.raises(ValueError):
+        AEI.fromArray(np.zeros((2, 2, 3), dtype=np.uint8))
+
+
+def test_asArray_changes_visibleToWrite():
+    with AEI((1, 1)) as aei, BytesIO() as outBytes:
+        aei.asArray()[0, 0] = (1, 2, 3, 4)
+        aei.write(outBytes, format=CompressionFormat.Uncompressed_UI)
+        outBytes.seek(0)
+        with AEI.read(outBytes) as new_aei:
+            assert new_aei._image.getpixel((0, 0)) == (1, 2, 3, 4) # type: ignore[reportUnknownMemberType]
+
+
+def test_asArray_texture_isView():
+    with AEI((16, 16)) as aei:
+        tex = Texture(4, 8, 2, 3)
+        aei.addTexture(tex)
+        view = aei.asArray(tex)
+        assert view.shape == (3, 2, 4)
+        view[:] = 255
+        assert aei.getTexture(tex).getpixel((1, 2)) == (255, 255, 255, 255) # type: ignore[reportUnknownMemberType]
+        assert aei._image.getpixel((3, 8)) == (0, 0, 0, 0) # type: ignore[reportUnknownMemberType]
+
+
+def test_asArray_outOfBounds_raises():
+    with AEI((10, 10)) as aei:
+        with pytest.raises(ValueError):
+            aei.asArray(11, 0, 10, 10)
+
+#endregion arrays
+#region ownership
+
+def test_init_noCopy_sharesImage():
+    with Image.new("RGBA", (1, 1), (255, 255, 255, 255)) as png:
+        aei = AEI(png, copy=False)
+        assert aei._image is png
+        aei.close()
+        # shared images are not closed by the AEI
+        assert png.getpixel((0, 0)) == (255, 255, 255, 255) # type: ignore[reportUnknownMemberType]
+
+
+def test_init_noCopy_copiesOnMutation():
+    with Image.new("RGBA", (1, 1), (255, 255, 255, 255)) as png, Image.new("RGBA", (1, 1), (1, 2, 3, 255)) as newPng:
+        with AEI(png, copy=False) as aei:
+            aei.addTexture(newPng, 0, 0)
+            assert aei._image is not png
+            assert aei._image.getpixel((0, 0)) == (1, 2, 3, 255) # type: ignore[reportUnknownMemberType]
+            assert png.getpixel((0, 0)) == (255, 255, 255, 255) # type: ignore[reportUnknownMemberType]
+
+
+def test_init_noCopy_asArray_doesNotAlterImage():
+    with Image.new("RGBA", (1, 1), (255, 255, 255, 255)) as png, AEI(png, copy=False) as aei:
+        aei.asArray()[0, 0] = 0
+        assert png.getpixel((0, 0)) == (255, 255, 255, 255) # type: ignore[reportUnknownMemberType]
+
+#endregion ownership
+#region mipmaps
+
+def test_write_mipmapped_setsFlag():
+    with smileyImage() as png, AEI(png) as aei:
+        fp = aei.write(format=CompressionFormat.ETC1, mipmapped=True)
+        fp.seek(len(b"AEimage\x00"))
+        assert fp.read(1)[0] == CompressionFormat.ETC1.value | 0b10
+
+
+def test_write_mipmapped_readsMipmaps():
+    with smileyImage() as png, AEI(png) as aei, BytesIO() as fp:
+        aei.write(fp, format=CompressionFormat.ETC1, mipmapped=True)
+        fp.seek(0)
+        with AEI.read(fp) as new_aei:
+            assert new_aei.mipmapped
+            assert new_aei.shape == (16, 16)
+            assert [m.shape for m in new_aei.mipmaps] == [(8, 8), (4, 4), (2, 2), (1, 1)]
+            with new_aei.mipmaps[0].decode() as mip:
+                assert mip.size == (8, 8)
+
+
+def test_write_mipmapped_unsupportedFormat_raises():
+    with AEI((4, 4)) as aei:
+        with pytest.raises(ValueError):
+            aei.write(format=CompressionFormat.Uncompressed_UI, mipmapped=True)
+
+
+def test_readMipmap_readsLevel():
+    with smileyImage() as png, AEI(png) as aei, BytesIO() as fp:
+        aei.write(fp, format=CompressionFormat.ETC1, mipmapped=True, mipmapFilter="kaiser")
+        fp.seek(0)
+        with AEI.readMipmap(fp, 2) as mip:
+            assert mip.size == (4, 4)
+
+
+def test_readMipmap_outOfRange_raises():
+    with AEI.read(PIXEL_AEI_PATH) as aei, BytesIO() as fp:
+        aei.write(fp)
+        fp.seek(0)
+        with pytest.raises(IndexError):
+            AEI.readMipmap(fp, 1)
+
+#endregion mipmaps
+#region thumbnails
+
+def test_thumbnail_approximatesImage():
+    with smileyImage() as png, AEI(png) as aei, BytesIO() as fp:
+        aei.write(fp, format=CompressionFormat.ETC1)
+        fp.seek(0)
+        with AEI.thumbnail(fp) as thumb, png.reduce(4) as expected:
+            assert thumb.size == (4, 4)
+            difference = np.abs(np.asarray(thumb.convert("RGBA"), dtype=int) - np.asarray(expected, dtype=int))
+            assert difference.max() <= 32
+
+
+def test_thumbnail_mipmapped_usesSmallerLevel():
+    with smileyImage() as png, AEI(png) as aei, BytesIO() as fp:
+        aei.write(fp, format=CompressionFormat.ETC1, mipmapped=True)
+        fp.seek(0)
+        with AEI.thumbnail(fp, 8) as thumb:
+            assert thumb.size == (2, 2)
+
+
+def test_thumbnail_uncompressed_subsamples():
+    with smileyImage() as png, AEI(png) as aei, BytesIO() as fp:
+        aei.write(fp, format=CompressionFormat.Uncompressed_UI)
+        fp.seek(0)
+        with AEI.thumbnail(fp, 8) as thumb:
+            assert thumb.size == (2, 2)
+            assert thumb.getpixel((1, 1)) == png.getpixel((8, 8)) # type: ignore[reportUnknownMemberType]
+
+
+def test_thumbnail_invalidScale_raises():
+    with pytest.raises(ValueError):
+        AEI.thumbnail(PIXEL_AEI_PATH, 3)
+
+#endregion thumbnails
+
+
+#region estimate
+
+@pytest.mark.parametrize(("format", "mipmapped", "textures", "fonts"), [
+    (CompressionFormat.Uncompressed_UI, False, 0, 0),
+    (CompressionFormat.ETC1, False, 2, 1),
+    (CompressionFormat.ETC1, True, 1, 0),
+    (CompressionFormat.ETC2, False, 0, 2)
+])
+def test_estimate_sizes_matchWrite(format: CompressionFormat, mipmapped: bool, textures: int, fonts: int):
+    with AEI((10, 6)) as aei:
+        for i in range(textures):
+            aei.addTexture(i, 0, 1, 1)
+        for i in range(fonts):
+            aei.fonts.append({chr(ord("a") + i): Texture(0, 0, 1, 1)})
+
+        estimate = aei.estimate(format, 2, mipmapped)
+        compressed = aei.compress(format, 2, mipmapped)
+        written = compressed.write().getvalue() # type: ignore[reportAttributeAccessIssue]
+
+    assert estimate.payloadBytes == sum(len(m) for m in compressed.mipmaps)
+    assert estimate.fileBytes == len(written)
+    assert estimate.readMemory >= estimate.payloadBytes
+    assert estimate.writeMemory >= estimate.fileBytes
+
+
+def test_estimate_unsupportedMipmapping_raises():
+    with AEI((8, 8)) as aei:
+        with pytest.raises(ValueError):
+            aei.estimate(CompressionFormat.Uncompressed_UI, mipmapped=True)
+
+
+def test_read_wrongImageLength_raises():
+    with AEI((8, 8)) as aei:
+        written = bytearray(aei.write(format=CompressionFormat.ETC1).getvalue()) # type: ignore[reportAttributeAccessIssue]
+
+    # The image length directly follows the header and single texture
+    lengthOffset = 15 + 8
+    written[lengthOffset] += 1
+    with pytest.raises(AeiReadException):
+        AEI.read(BytesIO(written))
+
+#endregion estimate
+
+
+#region alpha
+
+def test_alphaUsage_perTexture():
+    with AEI((8, 4)) as aei:
+        aei.addTexture(Image.new("RGBA", (4, 4), (10, 20, 30, 255)), 0, 0)
+        aei.addTexture(Image.new("RGBA", (4, 4), (10, 20, 30, 128)), 4, 0)
+
+        assert aei.alphaUsage(aei.textures[0]) == "opaque"
+        assert aei.alphaUsage(4, 0, 4, 4) == "graded"
+        assert aei.alphaUsage() == "graded"
+
+
+def test_alphaUsage_arrayBacked_matchesImage():
+    array = np.full((4, 8, 4), 255, dtype=np.uint8)
+    array[:, 4:, 3] = 0
+    with AEI.fromArray(array) as aei:
+        assert aei.alphaUsage(0, 0, 4, 4) == "opaque"
+        assert aei.alphaUsage() == "binary"
+
+
+@pytest.mark.parametrize(("alpha", "aeiFormat", "expected"), [
+    (255, None, CompressionFormat.DXT1),
+    (255, CompressionFormat.ETC1, CompressionFormat.ETC1),
+    (0, None, CompressionFormat.DXT5),
+    (100, CompressionFormat.ETC1, CompressionFormat.DXT5)
+])
+def test_compress_autoFormat_followsAlpha(alpha: int, aeiFormat: CompressionFormat, expected: CompressionFormat):
+    with AEI(Image.new("RGBA", (8, 8), (10, 20, 30, alpha)), format=aeiFormat) as aei:
+        assert aei.estimate("auto").payloadBytes == expected.imageLength(8, 8)
+        assert aei.compress("auto").format is expected
+        assert aei.format is aeiFormat
+
+#endregion alpha
+
+
+def test_measureEncode_lossless_isExact():
+    with AEI((8, 8)) as aei:
+        aei.addTexture(0, 0, 4, 4)
+        trial = aei.measureEncode(CompressionFormat.Uncompressed_UI)
+
+    assert trial.psnr == float("inf")
+    assert trial.ssim == pytest.approx(1)
+    assert trial.texturePsnr == [float("inf")]
+
+
+def test_optimizeFormat_picksSmallestMeetingBudget():
+    noise = np.random.default_rng(0).integers(0, 256, (16, 16, 4), dtype=np.uint8)
+    with AEI.fromArray(noise) as aei:
+        aei.addTexture(0, 0, 8, 8)
+        formats = [CompressionFormat.Uncompressed_UI, CompressionFormat.ETC1]
+
+        # Noise can't survive ETC1, so only the lossless format meets a strict budget
+        strict = aei.optimizeFormat(minPsnr=60, formats=formats)
+        assert strict.compressed.format is CompressionFormat.Uncompressed_UI
+
+        loose = aei.optimizeFormat(minPsnr=1, formats=formats)
+        assert loose.compressed.format is CompressionFormat.ETC1
+
+
+def test_optimizeFormat_noneMeetBudget_raises():
+    noise = np.random.default_rng(0).integers(0, 256, (16, 16, 4), dtype=np.uint8)
+    with AEI.fromArray(noise) as aei:
+        with pytest.raises(ValueError):
+            aei.optimizeFormat(minSsim=0.99, formats=[CompressionFormat.ETC1])
+
+
+def test_optimizeFormat_noBudget_raises():
+    with AEI((8, 8)) as aei:
+        with pytest.raises(ValueError):
+            aei.optimizeFormat()
+
+
+def test_writeMany_matchesWrite():
+    pixels = np.random.default_rng(0).integers(0, 256, (16, 16, 4), dtype=np.uint8)
+    formats = [CompressionFormat.ETC1, CompressionFormat.ETC2, CompressionFormat.Uncompressed_UI]
+    with AEI.fromArray(pixels) as aei:
+        aei.addTexture(0, 0, 8, 8)
+        written = aei.writeMany({format: None for format in formats}, quality=2)
+
+        for format in formats:
+            expected = aei.write(format=format, quality=2).getvalue() # type: ignore[reportAttributeAccessIssue]
+            assert written[format].getvalue() == expected # type: ignore[reportOptionalMemberAccess]
+
+
+def test_writeMany_sharesPreprocessing():
+    from AEPi.instrumentation import collectStats
+
+    with AEI((16, 16)) as aei:
+        with collectStats() as stats:
+            aei.writeMany({CompressionFormat.ETC1: None, CompressionFormat.ETC2: None, CompressionFormat.Uncompressed_UI: None})
+
+    # ETC1 and ETC2 share a pixel layout, so are swapped once between them
+    assert len([t for t in stats.phases if t.name == "swap"]) == 1
+    assert len([t for t in stats.phases if t.name == "compress"]) == 3
+
+
+def test_writeMany_toPaths(tmp_path: Path):
+    with AEI((8, 8)) as aei:
+        paths = {CompressionFormat.ETC1: tmp_path / "etc1.aei", CompressionFormat.Uncompressed_UI: tmp_path / "ui.aei"}
+        assert aei.writeMany(paths) == {format: None for format in paths}
+
+    for format, path in paths.items():
+        with AEI.read(path) as read:
+            assert read.format is format
+
+
+def test_writeMany_unsupportedMipmapping_raises():
+    with AEI((8, 8)) as aei:
+        with pytest.raises(ValueError):
+            aei.writeMany({CompressionFormat.Uncompressed_UI: None}, mipmapped=True)
+
+
+def _fillShared(aei: AEI) -> int:
+    with aei:
+        aei.asArray()[...] = 7
+        return len(aei.textures)
+
+
+def test_pickle_unshared_roundTrips():
+    import pickle
+
+    with AEI((4, 2), format=CompressionFormat.ETC1, quality=2) as aei:
+        aei.asArray()[...] = 9
+        aei.addTexture(0, 0, 2, 2)
+        aei.fonts.append({"a": Texture(1, 1, 1, 1)})
+
+        with pickle.loads(pickle.dumps(aei)) as copy:
+            assert copy.shape == (4, 2)
+            assert copy.format is CompressionFormat.ETC1 and copy.quality == 2
+            assert [t.shape for t in copy.textures] == [(2, 2)]
+            assert copy.fonts[0]["a"].x == 1
+            assert (copy.asArray() == 9).all()
+            assert copy.sharedMemoryName is None
+
+
+def test_share_workerWritesVisible():
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+
+    with AEI((16, 8)) as aei:
+        aei.addTexture(0, 0, 4, 4)
+        name = aei.share()
+        assert aei.sharedMemoryName == name
+        # Only metadata and the block name are pickled
+        assert len(pickle.dumps(aei)) < 16 * 8 * 4
+
+        with ProcessPoolExecutor(1) as executor:
+            assert executor.submit(_fillShared, aei).result() == 1
+
+        assert (aei.asArray() == 7).all()
+        assert aei.getTexture(0, 0, 1, 1).getpixel((0, 0)) == (7, 7, 7, 7) # type: ignore[reportUnknownMemberType]
+
+
+def test_share_close_freesBlock():
+    from multiprocessing.shared_memory import SharedMemory
+
+    aei = AEI((4, 4))
+    name = aei.share()
+    aei.close()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name)
+
+
+def test_concurrentTextureAccess_stress():
+    import threading
+
+    size = 8
+    writers = 4
+    iterations = 200
+    errors: list[BaseException] = []
+
+    with AEI((size * writers, size)) as aei:
+        done = threading.Event()
+
+        def writer(index: int):
+            try:
+                with Image.new("RGBA", (size, size), (index + 1, index + 1, index + 1, 255)) as im:
+                    for _ in range(iterations):
+                        aei.addTexture(im, index * size, 0)
+                        aei.removeTexture(index * size, 0, size, size)
+            except BaseException as ex:
+                errors.append(ex)
+
+        def reader(index: int):
+            try:
+                while not done.is_set():
+                    with aei.getTexture(index * size, 0, size, size) as crop:
+                        # A crop never sees a texture part way through being added or removed
+                        assert len(crop.getcolors()) == 1 # type: ignore[reportArgumentType]
+            except BaseException as ex:
+                errors.append(ex)
+
+        writerThreads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        readerThreads = [threading.Thread(target=reader, args=(i % writers,)) for i in range(2 * writers)]
+        for thread in readerThreads + writerThreads:
+            thread.start()
+        for thread in writerThreads:
+            thread.join()
+        done.set()
+        for thread in readerThreads:
+            thread.join()
+
+        assert errors == []
+        assert aei.textures == []
+        assert (aei.asArray() == 0).all()
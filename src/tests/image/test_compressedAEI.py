@@ -0,0 +1,92 @@
+import stat
+from io import BytesIO
+from pathlib import Path
+import pytest
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.image.compressedAEI import CompressedAEI
+from AEPi.exceptions import AeiWriteException
+
+SMILEY_AEI_2TEXTURES_PATH = "src/tests/assets/smiley_ATC_twotextures_nomipmap_nosymbols_high.aei"
+
+
+def test_read_doesNotDecode():
+    compressed = CompressedAEI.read(SMILEY_AEI_2TEXTURES_PATH)
+    assert compressed.format is CompressionFormat.ATC
+    assert compressed.shape == (16, 16)
+    assert len(compressed.mipmaps) == 1
+    assert len(compressed.mipmaps[0]) == 256
+    assert [t.position for t in compressed.textures] == [(0, 0), (8, 8)]
+    assert compressed.quality == 3
+
+
+def test_write_roundTrip_isIdentical():
+    with open(SMILEY_AEI_2TEXTURES_PATH, "rb") as expected:
+        expectedBytes = expected.read()
+    
+    actual = CompressedAEI.read(BytesIO(expectedBytes)).write()
+    assert actual.getvalue() == expectedBytes # type: ignore[reportAttributeAccessIssue]
+
+
+def test_write_incorrectMipmapCount_raises():
+    compressed = CompressedAEI(CompressionFormat.ETC1, 8, 8, [b"\x00" * 32], [Texture(0, 0, 8, 8)], mipmapped=True)
+    with pytest.raises(ValueError):
+        compressed.write()
+
+
+def test_write_toPath_isIdentical(tmp_path: Path):
+    compressed = CompressedAEI.read(SMILEY_AEI_2TEXTURES_PATH)
+    path = tmp_path / "out.aei"
+    assert compressed.write(path) is None
+
+    with open(SMILEY_AEI_2TEXTURES_PATH, "rb") as expected:
+        assert path.read_bytes() == expected.read()
+    assert [p.name for p in tmp_path.iterdir()] == ["out.aei"]
+
+
+def test_write_toPath_hasDefaultPermissions(tmp_path: Path):
+    reference = tmp_path / "reference"
+    reference.write_bytes(b"")
+    path = tmp_path / "out.aei"
+    CompressedAEI.read(SMILEY_AEI_2TEXTURES_PATH).write(path)
+
+    assert stat.S_IMODE(path.stat().st_mode) == stat.S_IMODE(reference.stat().st_mode)
+
+
+def test_write_toPath_failure_leavesExistingFile(tmp_path: Path):
+    path = tmp_path / "out.aei"
+    path.write_bytes(b"existing")
+    # Font symbols must be single UTF-16 code units
+    compressed = CompressedAEI(CompressionFormat.Uncompressed_UI, 1, 1, [bytes(4)], [Texture(0, 0, 1, 1)], [{"\U0001F600": Texture(0, 0, 1, 1)}])
+
+    with pytest.raises(AeiWriteException):
+        compressed.write(path)
+
+    assert path.read_bytes() == b"existing"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.aei"]
+
+
+def test_write_withFonts_roundTrips():
+    fonts = [{"a": Texture(0, 0, 1, 1), "b": Texture(1, 0, 1, 1)}, {}]
+    compressed = CompressedAEI(CompressionFormat.Uncompressed_UI, 2, 1, [bytes(8)], [Texture(0, 0, 2, 1)], fonts, 2)
+
+    actual = CompressedAEI.read(BytesIO(compressed.write().getvalue())) # type: ignore[reportAttributeAccessIssue]
+    assert [{k: v.position for k, v in f.items()} for f in actual.fonts] == [{"a": (0, 0), "b": (1, 0)}, {}]
+    assert actual.quality == 2
+
+
+def test_readMetadata_matchesRead():
+    import hashlib
+
+    with AEI((16, 16)) as aei:
+        aei.addTexture(0, 0, 4, 4)
+        aei.fonts.append({"a": Texture(0, 0, 1, 1)})
+        fileBytes = aei.write(format=CompressionFormat.ETC1, quality=2, mipmapped=True).getvalue() # type: ignore[reportAttributeAccessIssue]
+
+    compressed = CompressedAEI.read(BytesIO(fileBytes))
+    payloadHash = hashlib.blake2b()
+    metadata = CompressedAEI.readMetadata(BytesIO(fileBytes), payloadHash.update)
+
+    assert (metadata.format, metadata.width, metadata.height, metadata.mipmapped, metadata.quality) == (CompressionFormat.ETC1, 16, 16, True, 2)
+    assert metadata.imageLengths == [len(m) for m in compressed.mipmaps]
+    assert metadata.fonts[0]["a"].shape == (1, 1)
+    assert payloadHash.digest() == hashlib.blake2b(b"".join(compressed.mipmaps)).digest()
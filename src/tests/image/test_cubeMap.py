@@ -0,0 +1,77 @@
+import mmap
+import os
+import numpy as np
+import pytest
+from AEPi import AEI, CompressionFormat, CompressedAEI, CubeMap
+from AEPi.image.cubeMap import CUBE_FACES
+
+
+def faces(size: int = 8):
+    return [np.full((size, size, 4), 10 * (i + 1), dtype=np.uint8) for i in range(len(CUBE_FACES))]
+
+
+@pytest.mark.parametrize("format", [CompressionFormat.Uncompressed_CubeMap, CompressionFormat.Uncompressed_CubeMap_PC])
+def test_fromFaces_isVerticalStripOfFaces(format: CompressionFormat):
+    cube = CubeMap.fromFaces(faces(), format)
+    assert cube.compressed.shape == (8, 48)
+
+    with AEI.fromCompressed(cube.compressed) as aei:
+        for i in range(len(CUBE_FACES)):
+            assert (aei.asArray()[8 * i : 8 * (i + 1)] == 10 * (i + 1)).all()
+
+
+def test_decodeFace_byNameAndIndex():
+    cube = CubeMap.fromFaces(faces())
+    with cube.decodeFace("+y") as byName, cube.decodeFace(2) as byIndex:
+        assert np.array_equal(np.asarray(byName), np.asarray(byIndex))
+        assert (np.asarray(byName) == 30).all()
+
+    assert [np.asarray(face)[0, 0, 0] for face in cube.decodeFaces()] == [10, 20, 30, 40, 50, 60]
+    with pytest.raises(KeyError):
+        cube.decodeFace("up") # type: ignore[reportArgumentType]
+
+
+def test_replaceFace_onlyChangesThatFace():
+    cube = CubeMap.fromFaces(faces())
+    cube.replaceFace("-z", np.zeros((8, 8, 4), dtype=np.uint8))
+
+    assert bytes(cube.faceContent("-z")) == bytes(8 * 8 * 4)
+    assert bytes(cube.faceContent("+z")) == bytes([50]) * (8 * 8 * 4)
+    with pytest.raises(ValueError):
+        cube.replaceFace("+x", np.zeros((4, 4, 4), dtype=np.uint8))
+
+
+def test_open_writable_writesFaceInPlace(tmp_path: str):
+    path = os.path.join(tmp_path, "sky.aei")
+    CubeMap.fromFaces(faces()).compressed.write(path)
+
+    with CubeMap.open(path, writable=True) as cube:
+        cube.replaceFace("+x", np.full((8, 8, 4), 99, dtype=np.uint8))
+
+    with CubeMap.open(path) as cube:
+        assert bytes(cube.faceContent("+x")) == bytes([99]) * (8 * 8 * 4)
+        assert bytes(cube.faceContent("-x")) == bytes([20]) * (8 * 8 * 4)
+
+
+def test_init_notCubeMap_raises():
+    with pytest.raises(ValueError):
+        CubeMap(CompressedAEI(CompressionFormat.Uncompressed_UI, 8, 48, [bytes(8 * 48 * 4)]))
+    with pytest.raises(ValueError):
+        CubeMap(CompressedAEI(CompressionFormat.Uncompressed_CubeMap, 8, 8, [bytes(8 * 8 * 4)]))
+
+
+def test_open_notCubeMap_releasesFile(tmp_path: str, monkeypatch: pytest.MonkeyPatch):
+    path = os.path.join(tmp_path, "flat.aei")
+    CompressedAEI(CompressionFormat.Uncompressed_UI, 8, 48, [bytes(8 * 48 * 4)]).write(path)
+
+    maps: "list[mmap.mmap]" = []
+    class RecordingMmap(mmap.mmap):
+        def __new__(cls, *args, **kwargs): # type: ignore[reportMissingParameterType]
+            fileMap = super().__new__(cls, *args, **kwargs)
+            maps.append(fileMap)
+            return fileMap
+
+    monkeypatch.setattr(mmap, "mmap", RecordingMmap)
+    with pytest.raises(ValueError):
+        CubeMap.open(path)
+    assert len(maps) == 1 and maps[0].closed
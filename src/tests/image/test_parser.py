@@ -0,0 +1,140 @@
+from io import BytesIO
+import pytest
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.image.compressedAEI import CompressedAEI
+from AEPi.exceptions import AeiReadException
+from AEPi.image.parser import AeiParser, HeaderEvent, TexturesEvent, PayloadEvent, FontEvent, EndEvent, AeiEvent
+
+SMILEY_AEI_2TEXTURES_PATH = "src/tests/assets/smiley_ATC_twotextures_nomipmap_nosymbols_high.aei"
+
+
+def readAsset() -> bytes:
+    with open(SMILEY_AEI_2TEXTURES_PATH, "rb") as f:
+        return f.read()
+
+
+def parseInChunks(data: bytes, chunkSize: int) -> list[AeiEvent]:
+    parser = AeiParser()
+    events: list[AeiEvent] = []
+    for i in range(0, len(data), chunkSize):
+        events += parser.feed(data[i : i + chunkSize])
+    return events + parser.close()
+
+
+@pytest.mark.parametrize("chunkSize", [1, 7, 1024])
+def test_feed_anyChunkSize_emitsEventsInOrder(chunkSize: int):
+    events = parseInChunks(readAsset(), chunkSize)
+
+    assert [type(e) for e in events] == [HeaderEvent, TexturesEvent, PayloadEvent, EndEvent]
+    assert events[0] == HeaderEvent(CompressionFormat.ATC, False, 16, 16)
+    assert [t.position for t in events[1].textures] == [(0, 0), (8, 8)] # type: ignore[reportAttributeAccessIssue]
+    assert len(events[2].compressed) == 256 # type: ignore[reportAttributeAccessIssue]
+    assert events[3] == EndEvent(3)
+
+
+def test_feed_payload_emittedBeforeFonts():
+    compressed = CompressedAEI(CompressionFormat.Uncompressed_UI, 2, 2, [bytes(16)], [Texture(0, 0, 2, 2)], [{"a": Texture(0, 0, 1, 1)}])
+    data = compressed.write().getvalue() # type: ignore[reportAttributeAccessIssue]
+
+    parser = AeiParser()
+    # Everything up to and including the payload, but not the fonts
+    events = parser.feed(data[:15 + 8 + 16])
+    assert isinstance(events[-1], PayloadEvent)
+
+    events = parser.feed(data[15 + 8 + 16:])
+    assert isinstance(events[0], FontEvent)
+    assert events[0].font["a"].shape == (1, 1)
+    assert parser.close() == [EndEvent(None)]
+
+
+def test_feed_mipmapped_emitsEveryLevel():
+    with AEI((8, 8)) as aei:
+        data = aei.write(format=CompressionFormat.ETC1, mipmapped=True).getvalue() # type: ignore[reportAttributeAccessIssue]
+
+    payloads = [e for e in parseInChunks(data, 5) if isinstance(e, PayloadEvent)]
+    assert [(p.level, p.width, p.height) for p in payloads] == [(0, 8, 8), (1, 4, 4), (2, 2, 2), (3, 1, 1)]
+
+
+def test_close_incomplete_raises():
+    parser = AeiParser()
+    parser.feed(readAsset()[:-20])
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_close_trailingData_strict_raises():
+    parser = AeiParser(strict=True)
+    parser.feed(readAsset() + b"\x00")
+    with pytest.raises(ValueError):
+        parser.close()
+
+
+def test_feed_trailingData_stopsAfterQuality():
+    parser = AeiParser()
+    events = parser.feed(readAsset() + b"next")
+    assert parser.bytesNeeded == 0
+    assert parser.unusedData == b"next"
+    assert parser.close()[-1] == EndEvent(3)
+    assert isinstance(events[-1], PayloadEvent)
+
+
+def test_read_embeddedInStream_leavesStreamAfterAei():
+    data = readAsset()
+    stream = BytesIO(b"prefix" + data + b"suffix")
+    stream.seek(len(b"prefix"))
+
+    compressed = CompressedAEI.read(stream)
+    assert compressed.write().getvalue() == data # type: ignore[reportAttributeAccessIssue]
+    assert stream.read() == b"suffix"
+    assert CompressedAEI.fromBuffer(data + b"suffix").quality == 3
+
+    with pytest.raises(AeiReadException):
+        CompressedAEI.read(BytesIO(data + b"suffix"), strict=True)
+
+
+def test_feed_wrongFileType_raises():
+    with pytest.raises(ValueError):
+        AeiParser().feed(b"NOTANAEI" + bytes(16))
+
+
+def test_fromChunks_matchesRead():
+    data = readAsset()
+    compressed = CompressedAEI.fromChunks(data[i : i + 3] for i in range(0, len(data), 3))
+    assert compressed.write().getvalue() == data # type: ignore[reportAttributeAccessIssue]
+
+
+def test_feed_wrongImageLength_raisesBeforePayload():
+    data = bytearray(readAsset())
+    # The image length follows the header and two textures
+    lengthOffset = 15 + 2 * 8
+    data[lengthOffset : lengthOffset + 4] = (255).to_bytes(4, "little")
+
+    with pytest.raises(ValueError):
+        AeiParser().feed(data[:lengthOffset + 4])
+
+
+def test_parseBuffer_matchesFeed_withoutCopying():
+    data = readAsset()
+    events = AeiParser.parseBuffer(data)
+    fed = parseInChunks(data, 7)
+
+    assert [type(e) for e in events] == [type(e) for e in fed]
+    payload = next(e for e in events if isinstance(e, PayloadEvent))
+    assert isinstance(payload.compressed, memoryview)
+    assert payload.compressed.obj is data
+    assert bytes(payload.compressed) == next(e for e in fed if isinstance(e, PayloadEvent)).compressed
+
+
+def test_parseBuffer_truncated_raises():
+    with pytest.raises(ValueError):
+        AeiParser.parseBuffer(readAsset()[:-20])
+
+
+def test_iterBuffer_onProblem_continues():
+    compressed = CompressedAEI(CompressionFormat.Uncompressed_UI, 2, 2, [bytes(16)], [Texture(0, 0, 2, 2)], [{"a": Texture(0, 0, 1, 1)}])
+    data = compressed.write().getvalue() + b"\x00\x00" # type: ignore[reportAttributeAccessIssue]
+
+    problems: list[str] = []
+    events = list(AeiParser.iterBuffer(data, strict=True, onProblem=problems.append))
+    assert [type(e) for e in events] == [HeaderEvent, TexturesEvent, PayloadEvent, FontEvent, EndEvent]
+    assert len(problems) == 1 and "trailing data" in problems[0]
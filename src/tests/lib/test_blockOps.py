@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from AEPi.constants import CompressionFormat
+from AEPi.lib import blockOps
+
+# A DXT1 block with both endpoints pure red (RGB565 0xF800)
+DXT1_RED = b"\x00\xF8\x00\xF8\x00\x00\x00\x00"
+# An ETC1 differential block with both base colours (0xF8, 0x00, 0x00)
+ETC1_RED = b"\xF8\x00\x00\x02\x00\x00\x00\x00"
+# This is the RGBA pixel (100, 200, 200, 255), compressed to ATC 4bpp using AEIEditor.
+ATC_PIXEL = b"\xFF\xFF\xFF\xFF\xFF\xFF\xFF\xFF\x00\x00\x58\x66\xFF\xFF\xFF\xFF"
+
+
+def test_blockGridShape_roundsUp():
+    assert blockOps.blockGridShape(5, 4) == (2, 1)
+
+
+def test_blockColours_DXT1_solidBlock():
+    colours = blockOps.blockColours(DXT1_RED, CompressionFormat.DXT1, 4, 4)
+    assert colours.shape == (1, 1, 4)
+    assert tuple(colours[0, 0]) == (255, 0, 0, 255)
+
+
+def test_blockColours_ETC1_solidBlock():
+    colours = blockOps.blockColours(ETC1_RED, CompressionFormat.ETC1, 4, 4)
+    assert tuple(colours[0, 0]) == (255, 0, 0, 255)
+
+
+def test_blockColours_ATC_approximatesPixel():
+    colours = blockOps.blockColours(ATC_PIXEL, CompressionFormat.ATC, 1, 1)
+    assert np.abs(colours[0, 0].astype(int) - (100, 200, 200, 255)).max() <= 4
+
+
+def test_blockColours_multipleBlocks_isRowMajor():
+    colours = blockOps.blockColours(DXT1_RED + b"\x00" * 8, CompressionFormat.DXT1, 8, 4)
+    assert colours.shape == (1, 2, 4)
+    assert tuple(colours[0, 1]) == (0, 0, 0, 255)
+
+
+def test_blockColours_incorrectLength_raises():
+    with pytest.raises(ValueError):
+        blockOps.blockColours(DXT1_RED, CompressionFormat.DXT1, 8, 8)
+
+
+def test_blockColours_unsupportedFormat_raises():
+    with pytest.raises(ValueError):
+        blockOps.blockColours(DXT1_RED, CompressionFormat.PVRTC14A, 4, 4)
+
+
+def test_blockColours_DXT5_interpolatesAlpha():
+    block = b"\x80\x80" + b"\x00" * 6 + DXT1_RED
+    colours = blockOps.blockColours(block, CompressionFormat.DXT5, 4, 4)
+    assert tuple(colours[0, 0]) == (255, 0, 0, 128)
+
+
+def test_swapEtcRedBlue_swapsBaseColours():
+    assert blockOps.swapEtcRedBlue(ETC1_RED) == b"\x00\x00\xF8\x02\x00\x00\x00\x00"
+
+
+def test_swapEtcRedBlue_etc2Block_raises():
+    # Differential red base of 31 with an offset of +1 is ETC2's T mode
+    with pytest.raises(ValueError):
+        blockOps.swapEtcRedBlue(b"\xF9\x00\x00\x02\x00\x00\x00\x00")
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from PIL import Image
 from AEPi.lib import imageOps
 
@@ -12,3 +13,82 @@ def test_switchRGBA_BGRA_incorrectMode_raises():
     with Image.new("L", (1, 1)) as im:
         with pytest.raises(ValueError):
             imageOps.switchRGBA_BGRA(im)
+
+
+def test_imageFromArray_sharesMemory():
+    array = np.zeros((1, 1, 4), dtype=np.uint8)
+    with imageOps.imageFromArray(array) as im:
+        im.paste((50, 100, 150, 200), (0, 0, 1, 1))
+        assert tuple(array[0, 0]) == (50, 100, 150, 200)
+
+
+def test_arrayFromImage_convertsToRGBA():
+    with Image.new("RGB", (2, 1), (50, 100, 150)) as im:
+        array = imageOps.arrayFromImage(im)
+        assert array.shape == (1, 2, 4)
+        assert tuple(array[0, 1]) == (50, 100, 150, 255)
+
+
+def test_downsample_box_averagesPixels():
+    array = np.array([[[0] * 4, [100] * 4], [[200] * 4, [100] * 4]], dtype=np.uint8)
+    assert tuple(imageOps.downsample(array)[0, 0]) == (100, 100, 100, 100)
+
+
+@pytest.mark.parametrize("filter", ["box", "kaiser"])
+def test_downsample_oddShape_roundsDown(filter: imageOps.MipmapFilter):
+    array = np.full((5, 1, 4), 77, dtype=np.uint8)
+    downsampled = imageOps.downsample(array, filter)
+    assert downsampled.shape == (2, 1, 4)
+    assert (downsampled == 77).all()
+
+
+def test_mipmapShapes_endsAt1x1():
+    assert imageOps.mipmapShapes(8, 2) == [(8, 2), (4, 1), (2, 1), (1, 1)]
+
+
+def test_padToMultiple_padsEdges():
+    with Image.new("RGBA", (5, 4), (1, 2, 3, 4)) as im, imageOps.padToMultiple(im, (4, 4)) as padded:
+        assert padded.size == (8, 4)
+        assert padded.getpixel((7, 3)) == (1, 2, 3, 4) # type: ignore[reportUnknownMemberType]
+
+
+#region alphaUsage
+
+def alphaArray(*alphas: int) -> np.ndarray:
+    array = np.zeros((len(alphas), 3, 4), dtype=np.uint8)
+    array[..., 3] = np.array(alphas, dtype=np.uint8)[:, None]
+    return array
+
+
+@pytest.mark.parametrize(("alphas", "expected"), [
+    ((255, 255), "opaque"),
+    ((255, 0), "binary"),
+    ((0, 0), "binary"),
+    ((255, 128), "graded"),
+    ((0, 1), "graded")
+])
+def test_alphaUsage_array_classifies(alphas: tuple[int, ...], expected: str):
+    assert imageOps.alphaUsage(alphaArray(*alphas)) == expected
+
+
+@pytest.mark.parametrize(("alphas", "expected"), [
+    ((255, 255), "opaque"),
+    ((255, 0), "binary"),
+    ((255, 128), "graded")
+])
+def test_alphaUsage_image_matchesArray(alphas: tuple[int, ...], expected: str):
+    with Image.fromarray(alphaArray(*alphas), "RGBA") as im:
+        assert imageOps.alphaUsage(im) == expected
+
+
+def test_alphaUsage_noAlphaBand_isOpaque():
+    with Image.new("RGB", (2, 2)) as im:
+        assert imageOps.alphaUsage(im) == "opaque"
+
+
+def test_alphaUsage_manyChunks_findsLateGrading(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(imageOps, "ALPHA_SCAN_CHUNK_SIZE", 3)
+    assert imageOps.alphaUsage(alphaArray(255, 0, 255, 255, 7)) == "graded"
+    assert imageOps.alphaUsage(alphaArray(255, 255, 255, 0, 255)) == "binary"
+
+#endregion alphaUsage
@@ -0,0 +1,59 @@
+import threading
+import pytest
+from AEPi.lib.locking import ReadWriteLock
+
+
+def test_read_manyThreadsAtOnce():
+    lock = ReadWriteLock()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def reader():
+        with lock.read():
+            # Every reader must hold the lock at the same time to pass the barrier
+            barrier.wait()
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_write_excludesReaders():
+    lock = ReadWriteLock()
+    events: list[str] = []
+    writing = threading.Event()
+
+    def reader():
+        writing.wait()
+        with lock.read():
+            events.append("read")
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    with lock.write():
+        writing.set()
+        thread.join(0.05)
+        events.append("write")
+    thread.join()
+
+    assert events == ["write", "read"]
+
+
+def test_reentrant():
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.read():
+            with lock.write():
+                pass
+    with lock.read():
+        with lock.read():
+            pass
+
+
+def test_write_whileReading_raises():
+    lock = ReadWriteLock()
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            with lock.write():
+                pass
@@ -0,0 +1,53 @@
+import math
+import pytest
+import numpy as np
+from AEPi.lib import metrics
+
+
+def randomImage(seed: int, shape: tuple[int, int, int] = (16, 16, 4)):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_mse_matchesNumpy():
+    a, b = randomImage(0), randomImage(1)
+    expected = np.mean((a.astype(np.float64) - b) ** 2)
+    assert metrics.mse(a, b) == pytest.approx(expected)
+
+
+def test_mse_chunked_matchesUnchunked(monkeypatch: pytest.MonkeyPatch):
+    a, b = randomImage(0, (33, 7, 4)), randomImage(1, (33, 7, 4))
+    expected = metrics.mse(a, b)
+    monkeypatch.setattr(metrics, "CHUNK_SIZE", 1)
+    assert metrics.mse(a, b) == pytest.approx(expected)
+
+
+def test_psnr_identical_isInfinite():
+    a = randomImage(0)
+    assert metrics.psnr(a, a.copy()) == math.inf
+
+
+def test_psnr_knownError():
+    a = np.zeros((4, 4, 4), dtype=np.uint8)
+    b = np.full_like(a, 255)
+    assert metrics.psnr(a, b) == pytest.approx(0)
+
+
+def test_ssim_identical_isOne():
+    a = randomImage(0)
+    assert metrics.ssim(a, a.copy()) == pytest.approx(1)
+
+
+def test_ssim_noise_isLower():
+    a = randomImage(0)
+    noisy = np.clip(a.astype(np.int16) + np.random.default_rng(2).integers(-40, 40, a.shape), 0, 255).astype(np.uint8)
+    assert metrics.ssim(a, noisy) < metrics.ssim(a, a)
+
+
+def test_ssim_smallerThanWindow_usesWholeImage():
+    a = randomImage(0, (3, 5, 4))
+    assert metrics.ssim(a, a) == pytest.approx(1)
+
+
+def test_mismatchedShapes_raises():
+    with pytest.raises(ValueError):
+        metrics.mse(randomImage(0), randomImage(0, (8, 8, 4)))
@@ -0,0 +1,29 @@
+import pytest
+from AEPi.lib.packing import packShelves
+
+
+def overlaps(a, b): # type: ignore[reportMissingParameterType]
+    (ax, ay, aw, ah), (bx, by, bw, bh) = a, b # type: ignore[reportUnknownVariableType]
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah # type: ignore[reportUnknownVariableType]
+
+
+def test_packShelves_noOverlapAndWithinBounds():
+    shapes = [(5, 7), (16, 3), (1, 1), (9, 9), (4, 12), (30, 2)]
+    positions, (width, height) = packShelves(shapes, alignment=4)
+
+    boxes = [(x, y, w, h) for (x, y), (w, h) in zip(positions, shapes)]
+    for i, (x, y, w, h) in enumerate(boxes):
+        assert x % 4 == 0 and y % 4 == 0
+        assert x + w <= width and y + h <= height
+        assert not any(overlaps(boxes[i], other) for other in boxes[i + 1:])
+
+
+def test_packShelves_maxWidth_respected():
+    positions, (width, _) = packShelves([(4, 4)] * 10, maxWidth=8)
+    assert width == 8
+    assert len(set(positions)) == 10
+
+
+def test_packShelves_tooWide_raises():
+    with pytest.raises(ValueError):
+        packShelves([(9, 1)], maxWidth=8)
@@ -0,0 +1,8 @@
+import numpy as np
+import numpy.typing as npt
+
+
+def noise(width: int, height: int, seed: int = 0) -> npt.NDArray[np.uint8]:
+    """A deterministic RGBA image of random pixels, which doesn't compress trivially.
+    """
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 4), dtype=np.uint8)
@@ -0,0 +1,80 @@
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+import pytest
+from AEPi import AEI, CompressionFormat
+from AEPi.archives import AeiArchive
+
+
+def aeiBytes(value: int, format: CompressionFormat = CompressionFormat.Uncompressed_UI) -> bytes:
+    with AEI((8, 8)) as aei:
+        aei.asArray()[...] = value
+        aei.addTexture(0, 0, 4, 4)
+        return aei.write(format=format, quality=2).getvalue() # type: ignore[reportAttributeAccessIssue]
+
+
+ENTRIES = {f"textures/{i}.aei": aeiBytes(i) for i in range(5)}
+
+
+def writeZip(path: Path, compression: int):
+    with zipfile.ZipFile(path, "w", compression) as archive:
+        archive.writestr("readme.txt", "not an aei")
+        for name, contents in ENTRIES.items():
+            archive.writestr(name, contents)
+
+
+def writeTar(path: Path, mode: str):
+    with tarfile.open(path, mode) as archive: # type: ignore[reportCallIssue, reportArgumentType]
+        for name, contents in ENTRIES.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(contents)
+            archive.addfile(info, io.BytesIO(contents))
+
+
+@pytest.mark.parametrize(("fileName", "writer", "mapped"), [
+    ("stored.zip", lambda p: writeZip(p, zipfile.ZIP_STORED), True), # type: ignore[reportUnknownLambdaType]
+    ("deflated.zip", lambda p: writeZip(p, zipfile.ZIP_DEFLATED), False), # type: ignore[reportUnknownLambdaType]
+    ("plain.tar", lambda p: writeTar(p, "w"), True), # type: ignore[reportUnknownLambdaType]
+    ("compressed.tar.gz", lambda p: writeTar(p, "w:gz"), False) # type: ignore[reportUnknownLambdaType]
+])
+def test_archive_readsEntries(tmp_path: Path, fileName: str, writer, mapped: bool): # type: ignore[reportMissingParameterType]
+    path = tmp_path / fileName
+    writer(path)
+
+    with AeiArchive(path) as archive:
+        assert archive.names == list(ENTRIES)
+        assert all(archive.isMapped(name) == mapped for name in archive.names)
+
+        compressed = archive.readCompressed("textures/3.aei")
+        assert isinstance(compressed.mipmaps[0], memoryview) == mapped
+        assert compressed.write().getvalue() == ENTRIES["textures/3.aei"] # type: ignore[reportAttributeAccessIssue]
+
+        for i, (name, aei) in enumerate(archive.readAll(workers=2)):
+            with aei:
+                assert name == f"textures/{i}.aei"
+                assert (aei.asArray() == i).all()
+
+
+def test_archive_decodesMappedEtc1(tmp_path: Path):
+    contents = aeiBytes(0, CompressionFormat.ETC1)
+    with zipfile.ZipFile(tmp_path / "etc.zip", "w") as archive:
+        archive.writestr("etc.aei", contents)
+
+    with AeiArchive(tmp_path / "etc.zip") as archive:
+        with archive.read("etc.aei") as aei:
+            assert aei.format is CompressionFormat.ETC1
+            assert aei.shape == (8, 8)
+
+
+def test_archive_missingEntry_raises(tmp_path: Path):
+    writeZip(tmp_path / "a.zip", zipfile.ZIP_STORED)
+    with AeiArchive(tmp_path / "a.zip") as archive:
+        with pytest.raises(KeyError):
+            archive.read("readme.txt")
+
+
+def test_archive_notAnArchive_raises(tmp_path: Path):
+    (tmp_path / "other.bin").write_bytes(b"neither zip nor tar" * 100)
+    with pytest.raises(ValueError):
+        AeiArchive(tmp_path / "other.bin")
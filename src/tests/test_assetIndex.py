@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.assetIndex import AssetIndex
+
+
+def writeAei(path: Path, size: int = 8, format: CompressionFormat = CompressionFormat.ETC1, glyphs: str = ""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with AEI((size, size)) as aei:
+        aei.addTexture(0, 0, 4, 4)
+        if glyphs:
+            aei.fonts.append({glyph: Texture(i, 0, 1, 1) for i, glyph in enumerate(glyphs)})
+        aei.write(str(path), format=format)
+
+
+def test_scan_indexesMetadata(tmp_path: Path):
+    writeAei(tmp_path / "a.aei", glyphs="ab")
+    writeAei(tmp_path / "nested" / "b.aei", size=16, format=CompressionFormat.Uncompressed_UI)
+    (tmp_path / "notes.txt").write_text("not an aei")
+
+    with AssetIndex() as index:
+        result = index.scan(tmp_path)
+        assert sorted(result.added) == sorted([str(tmp_path / "a.aei"), str(tmp_path / "nested" / "b.aei")])
+
+        indexed = index.get(tmp_path / "nested" / "b.aei")
+        assert indexed is not None
+        assert (indexed.format, indexed.width, indexed.height) == (CompressionFormat.Uncompressed_UI, 16, 16)
+        assert [t.shape for t in index.textures(tmp_path / "a.aei")] == [(4, 4)]
+        assert index.fonts(tmp_path / "a.aei")[0]["b"].x == 1
+
+
+def test_query_filters(tmp_path: Path):
+    writeAei(tmp_path / "small.aei", glyphs="x")
+    writeAei(tmp_path / "large.aei", size=32)
+    writeAei(tmp_path / "large2.aei", size=32)
+
+    with AssetIndex() as index:
+        index.scan(tmp_path)
+        assert [Path(i.path).name for i in index.query(glyph="x")] == ["small.aei"]
+        assert [Path(i.path).name for i in index.query(format=CompressionFormat.ETC1, minWidth=16, minHeight=16)] == ["large.aei", "large2.aei"]
+
+        # Identical image content has the same hash
+        large = index.get(tmp_path / "large.aei")
+        assert large is not None
+        assert len(index.query(payloadHash=large.payloadHash)) == 2
+
+
+def test_rescan_isIncremental(tmp_path: Path):
+    writeAei(tmp_path / "kept.aei")
+    writeAei(tmp_path / "changed.aei")
+    writeAei(tmp_path / "removed.aei")
+
+    with AssetIndex(tmp_path / "index.sqlite") as index:
+        index.scan(tmp_path)
+
+    writeAei(tmp_path / "changed.aei", size=16)
+    # Ensure the change is visible even on filesystems with coarse timestamps
+    os.utime(tmp_path / "changed.aei", ns=(0, 0))
+    os.remove(tmp_path / "removed.aei")
+    writeAei(tmp_path / "new.aei")
+
+    with AssetIndex(tmp_path / "index.sqlite") as index:
+        result = index.scan(tmp_path)
+        assert result.added == [str(tmp_path / "new.aei")]
+        assert result.updated == [str(tmp_path / "changed.aei")]
+        assert result.removed == [str(tmp_path / "removed.aei")]
+        assert result.unchanged == 1
+        assert index.get(tmp_path / "changed.aei").width == 16 # type: ignore[reportOptionalMemberAccess]
+
+
+def test_scan_corruptFile_reportedAndNotIndexed(tmp_path: Path):
+    (tmp_path / "corrupt.aei").write_bytes(b"not an aei at all")
+
+    with AssetIndex() as index:
+        result = index.scan(tmp_path)
+        assert list(result.failed) == [str(tmp_path / "corrupt.aei")]
+        assert index.query() == []
@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import numpy as np
+import pytest
+from PIL import Image
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.builder import AtlasBuilder, AtlasTarget, BuildEvent, SpriteSource, loadManifest
+from randomImages import noise
+
+
+def savePng(path: str, pixels: np.ndarray): # type: ignore[reportMissingTypeArgument]
+    Image.fromarray(pixels, "RGBA").save(path)
+    # Ensure the change is visible to polling, even on file systems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def expectedBytes(target: AtlasTarget) -> bytes:
+    canvas = np.zeros((target.height, target.width, 4), dtype=np.uint8)
+    with AEI.fromArray(canvas, format=target.format, quality=target.quality) as aei:
+        for sprite in target.sprites:
+            with Image.open(sprite.source) as image:
+                pixels = np.asarray(image.convert("RGBA"))
+            canvas[sprite.y : sprite.y + pixels.shape[0], sprite.x : sprite.x + pixels.shape[1]] = pixels
+            aei.addTexture(Texture(sprite.x, sprite.y, pixels.shape[1], pixels.shape[0]))
+        return aei.write(mipmapped=target.mipmapped).getvalue() # type: ignore[reportAttributeAccessIssue]
+
+
+@pytest.fixture
+def sources(tmp_path: str):
+    paths = [os.path.join(tmp_path, f"sprite{i}.png") for i in range(3)]
+    for i, path in enumerate(paths):
+        savePng(path, noise(13 + i, 10, i))
+    return paths
+
+
+@pytest.mark.parametrize("format, mipmapped", [
+    (CompressionFormat.ETC1, True),
+    (CompressionFormat.Uncompressed_UI, False)
+])
+def test_rebuild_changedSprite_matchesFullEncode(tmp_path: str, sources: list, format: CompressionFormat, mipmapped: bool): # type: ignore[reportMissingTypeArgument]
+    sprites = (SpriteSource(sources[0], 0, 0), SpriteSource(sources[1], 10, 6), SpriteSource(sources[2], 30, 21))
+    target = AtlasTarget(os.path.join(tmp_path, "out", "atlas.aei"), 50, 33, format, sprites, 2, mipmapped)
+    builder = AtlasBuilder([target])
+
+    events = builder.build()
+    assert [e.fullBuild for e in events] == [True]
+    with open(target.output, "rb") as file:
+        assert file.read() == expectedBytes(target)
+
+    # A sprite which overlaps another, and changes size
+    savePng(sources[1], noise(9, 17, 7))
+    events = builder.rebuild()
+    assert [(e.fullBuild, e.changedSprites) for e in events] == [(False, (1,))]
+    assert events[0].encodedPixels < 50 * 33
+    with open(target.output, "rb") as file:
+        assert file.read() == expectedBytes(target)
+
+
+def test_rebuild_onlyAffectedTargets(tmp_path: str, sources: list): # type: ignore[reportMissingTypeArgument]
+    first = AtlasTarget(os.path.join(tmp_path, "first.aei"), 32, 16, CompressionFormat.ETC1, (SpriteSource(sources[0], 0, 0),))
+    second = AtlasTarget(os.path.join(tmp_path, "second.aei"), 32, 16, CompressionFormat.ETC1, (SpriteSource(sources[1], 0, 0),))
+    builder = AtlasBuilder([first, second])
+    builder.build()
+    assert builder.rebuild() == []
+
+    savePng(sources[1], noise(14, 10, 9))
+    assert [e.target for e in builder.rebuild()] == [second]
+
+    # Saving identical pixels re-encodes nothing
+    savePng(sources[1], noise(14, 10, 9))
+    assert builder.rebuild() == []
+
+
+def test_rebuild_unreadableSource_reportedOncePerChange(tmp_path: str, sources: list): # type: ignore[reportMissingTypeArgument]
+    target = AtlasTarget(os.path.join(tmp_path, "atlas.aei"), 32, 16, CompressionFormat.ETC1, (SpriteSource(sources[0], 0, 0),))
+    builder = AtlasBuilder([target])
+    builder.build()
+
+    with open(sources[0], "wb") as file:
+        file.write(b"not a png")
+    errors = []
+    assert builder.rebuild(onError=lambda path, ex: errors.append(path)) == []
+    assert errors == [sources[0]]
+
+    # The unreadable image is not retried until it changes again
+    assert builder.rebuild(onError=lambda path, ex: errors.append(path)) == []
+    assert errors == [sources[0]]
+    with open(sources[0], "wb") as file:
+        file.write(b"still not a png")
+    assert builder.rebuild(onError=lambda path, ex: errors.append(path)) == []
+    assert errors == [sources[0], sources[0]]
+
+    savePng(sources[0], noise(8, 8, 3))
+    assert len(builder.rebuild()) == 1
+
+
+def test_rebuild_spriteMovedOutside_keepsOtherChanges(tmp_path: str, sources: list): # type: ignore[reportMissingTypeArgument]
+    sprites = (SpriteSource(sources[0], 0, 0), SpriteSource(sources[1], 16, 0))
+    target = AtlasTarget(os.path.join(tmp_path, "atlas.aei"), 32, 16, CompressionFormat.Uncompressed_UI, sprites)
+    builder = AtlasBuilder([target])
+    builder.build()
+
+    # A valid change, alongside a change which no longer fits the target
+    savePng(sources[0], noise(8, 8, 5))
+    savePng(sources[1], noise(40, 8, 6))
+    with pytest.raises(ValueError):
+        builder.rebuild()
+
+    savePng(sources[1], noise(8, 8, 6))
+    assert [e.changedSprites for e in builder.rebuild()] == [(0, 1)]
+    with open(target.output, "rb") as file:
+        assert file.read() == expectedBytes(target)
+
+
+def test_watch_reloadsManifest(tmp_path: str, sources: list): # type: ignore[reportMissingTypeArgument]
+    manifestPath = os.path.join(tmp_path, "manifest.json")
+    manifest = {"targets": [{
+        "output": "atlas.aei", "width": 32, "height": 16, "format": "ETC1",
+        "sprites": [{"source": "sprite0.png", "x": 0, "y": 0}],
+        "fonts": [{"a": [0, 0, 4, 4]}]
+    }]}
+    with open(manifestPath, "w") as file:
+        json.dump(manifest, file)
+
+    targets = loadManifest(manifestPath)
+    assert targets[0].sprites == (SpriteSource(sources[0], 0, 0),)
+    assert targets[0].fonts == ({"a": (0, 0, 4, 4)},)
+
+    builder = AtlasBuilder.fromManifest(manifestPath)
+    stop = threading.Event()
+    built = threading.Event()
+    events: "list[BuildEvent]" = []
+    def onBuild(event: BuildEvent):
+        events.append(event)
+        built.set()
+
+    thread = threading.Thread(target=builder.watch, kwargs={"interval": 0.01, "stop": stop, "onBuild": onBuild})
+    thread.start()
+    try:
+        assert built.wait(10)
+        built.clear()
+        manifest["targets"][0]["sprites"].append({"source": "sprite1.png", "x": 16, "y": 0})
+        with open(manifestPath, "w") as file:
+            json.dump(manifest, file)
+        stat = os.stat(manifestPath)
+        os.utime(manifestPath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert built.wait(10)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert [len(e.target.sprites) for e in events] == [1, 2]
+    with AEI.read(os.path.join(tmp_path, "atlas.aei")) as aei:
+        assert len(aei.textures) == 2 and list(aei.fonts[0]) == ["a"]
+
+
+def test_build_spriteOutsideTarget_raises(tmp_path: str, sources: list): # type: ignore[reportMissingTypeArgument]
+    target = AtlasTarget(os.path.join(tmp_path, "atlas.aei"), 16, 16, CompressionFormat.ETC1, (SpriteSource(sources[0], 8, 0),))
+    with pytest.raises(ValueError):
+        AtlasBuilder([target]).build()
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from AEPi import AEI, Texture
+from AEPi.dedup import findDuplicates, rebuildAtlases
+
+
+def icon(seed: int, size: int = 8):
+    return np.random.default_rng(seed).integers(0, 256, (size, size, 4), dtype=np.uint8)
+
+
+def atlas(*icons: np.ndarray) -> AEI: # type: ignore[reportMissingTypeArgument]
+    aei = AEI((8 * len(icons), 16))
+    for i, pixels in enumerate(icons):
+        aei.asArray()[4 : 4 + pixels.shape[0], 8 * i : 8 * i + pixels.shape[1]] = pixels
+        aei.addTexture(Texture(8 * i, 4, pixels.shape[1], pixels.shape[0]))
+    return aei
+
+
+def test_findDuplicates_exact_groupsAcrossAtlases():
+    atlases = {
+        "a": atlas(icon(0), icon(1), icon(0)),
+        "b": atlas(icon(2), icon(0)),
+        "c": atlas(icon(1))
+    }
+    report = findDuplicates(atlases)
+
+    assert report.numSprites == 6
+    assert [[(s.atlas, s.textureIndex) for s in g.sprites] for g in report.groups] == [
+        [("a", 0), ("a", 2), ("b", 1)],
+        [("a", 1), ("c", 0)]
+    ]
+    assert all(g.exact for g in report.groups)
+    assert report.redundantPixels == 3 * 64
+
+
+def test_findDuplicates_nearIdentical_onlyWithMinPsnr():
+    similar = icon(0)
+    similar[0, 0, 0] ^= 1
+    atlases = {"a": atlas(icon(0)), "b": atlas(similar, icon(1))}
+
+    assert findDuplicates(atlases).groups == []
+
+    report = findDuplicates(atlases, minPsnr=40)
+    assert len(report.groups) == 1
+    group = report.groups[0]
+    assert [(s.atlas, s.textureIndex) for s in group.sprites] == [("a", 0), ("b", 0)]
+    assert not group.exact and group.minPsnr > 40
+
+
+def test_findDuplicates_differentShapes_notGrouped():
+    atlases = {"a": atlas(icon(0, 8)), "b": atlas(icon(0, 8)[:4, :4].copy())}
+    assert findDuplicates(atlases, minPsnr=0).groups == []
+
+
+def test_rebuildAtlases_sharesDuplicatesAndKeepsContent():
+    atlases = {
+        "a": atlas(icon(0), icon(1), icon(1)),
+        "b": atlas(icon(0), icon(2))
+    }
+    rebuilt = rebuildAtlases(atlases, findDuplicates(atlases))
+
+    assert len(rebuilt.shared.textures) == 1
+    assert len(rebuilt.atlases["a"].textures) == 1
+    assert len(rebuilt.atlases["b"].textures) == 1
+    assert rebuilt.locations["a", 0] == rebuilt.locations["b", 0]
+    assert rebuilt.locations["a", 1] == rebuilt.locations["a", 2]
+    assert rebuilt.locations["a", 0].atlas == "shared"
+
+    for (name, index), location in rebuilt.locations.items():
+        aei = rebuilt.shared if location.atlas == "shared" else rebuilt.atlases[location.atlas]
+        original = atlases[name]
+        assert np.array_equal(aei.asArray(location.texture), original.asArray(original.textures[index]))
+
+
+def test_rebuildAtlases_mismatchedReport_raises():
+    atlases = {"a": atlas(icon(0), icon(0))}
+    report = findDuplicates(atlases)
+    with pytest.raises(ValueError):
+        rebuildAtlases({"a": atlas(icon(0), icon(0))}, report)
+    with pytest.raises(ValueError):
+        rebuildAtlases(atlases, report, sharedName="a")
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from AEPi import AEI, CompressionFormat, CompressedAEI, Texture
+from AEPi.delta import makePatch, applyPatch
+from randomImages import noise
+
+
+def compress(pixels: np.ndarray, format: CompressionFormat = CompressionFormat.ETC1, mipmapped: bool = False, textures: int = 1) -> CompressedAEI: # type: ignore[reportMissingTypeArgument]
+    with AEI.fromArray(pixels.copy()) as aei:
+        for i in range(textures):
+            aei.addTexture(Texture(i, 0, 4, 4))
+        return aei.compress(format, quality=2, mipmapped=mipmapped)
+
+
+@pytest.mark.parametrize("format", [CompressionFormat.ETC1, CompressionFormat.Uncompressed_UI])
+def test_patch_changedRegion_reconstructsAndIsSmall(format: CompressionFormat):
+    pixels = noise(64, 64)
+    old = compress(pixels, format)
+    pixels[8:16, 8:16] = 0
+    new = compress(pixels, format)
+
+    patch = makePatch(old, new)
+    assert applyPatch(old, patch) == new.write().getvalue() # type: ignore[reportAttributeAccessIssue]
+    assert len(patch) < len(new.mipmaps[0]) // 8
+
+
+def test_patch_mipmapsAndMetadata_reconstructs():
+    pixels = noise(32, 32)
+    old = compress(pixels, mipmapped=True)
+    pixels[0:4, 0:4] = 255
+    new = compress(pixels, mipmapped=True, textures=2)
+    new.fonts.append({"a": Texture(0, 0, 1, 1)})
+
+    assert applyPatch(old, makePatch(old, new)) == new.write().getvalue() # type: ignore[reportAttributeAccessIssue]
+
+
+def test_patch_resized_sendsFullLevel():
+    old = compress(noise(16, 16))
+    new = compress(noise(32, 32))
+    patch = makePatch(old, new)
+
+    assert len(patch) > len(new.mipmaps[0])
+    assert applyPatch(old, patch) == new.write().getvalue() # type: ignore[reportAttributeAccessIssue]
+
+
+def test_applyPatch_wrongBase_raises():
+    old = compress(noise(16, 16))
+    new = compress(noise(16, 16, 1))
+    with pytest.raises(ValueError):
+        applyPatch(new, makePatch(old, new))
+
+
+def test_applyPatch_truncated_raises():
+    old = compress(noise(16, 16))
+    new = compress(noise(16, 16, 1))
+    with pytest.raises(ValueError):
+        applyPatch(old, makePatch(old, new)[:-3])
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from PIL import Image
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.derivatives import Variant, makeVariants, scaleTexture
+from AEPi.lib import imageOps
+from randomImages import noise
+
+
+def box(texture: Texture):
+    return (texture.x, texture.y, texture.width, texture.height)
+
+
+@pytest.mark.parametrize("texture, downscale, blockShape, expected", [
+    (Texture(16, 8, 32, 16), 2, (4, 4), (8, 4, 16, 8)),
+    (Texture(8, 8, 8, 8), 4, (4, 4), (0, 0, 4, 4)),
+    (Texture(3, 5, 6, 2), 2, (1, 1), (1, 2, 4, 2)),
+    (Texture(60, 60, 4, 4), 8, (4, 4), (4, 4, 4, 4))
+])
+def test_scaleTexture_coversAndSnaps(texture: Texture, downscale: int, blockShape: tuple, expected: tuple): # type: ignore[reportMissingTypeArgument]
+    assert box(scaleTexture(texture, downscale, (64 // downscale, 64 // downscale), blockShape)) == expected
+
+
+def test_makeVariants_scalesCanvasAndBoxes():
+    with AEI.fromArray(noise(64, 32), format=CompressionFormat.ETC1) as aei:
+        aei.addTexture(Texture(16, 8, 32, 16))
+        aei.fonts.append({"a": Texture(0, 0, 8, 8)})
+        variants = makeVariants(aei, {
+            "HD": Variant(1),
+            "SD": Variant(2, CompressionFormat.Uncompressed_UI),
+            "LD": Variant(4, mipmapped=True)
+        })
+
+    assert {name: (v.width, v.height) for name, v in variants.items()} == {"HD": (64, 32), "SD": (32, 16), "LD": (16, 8)}
+    assert [box(t) for t in variants["HD"].textures] == [(16, 8, 32, 16)]
+    assert [box(t) for t in variants["SD"].textures] == [(8, 4, 16, 8)]
+    assert [box(t) for t in variants["LD"].textures] == [(4, 0, 8, 8)]
+    assert box(variants["LD"].fonts[0]["a"]) == (0, 0, 4, 4)
+    assert variants["LD"].format is CompressionFormat.ETC1 and variants["LD"].mipmapped
+    assert len(variants["LD"].mipmaps) > 1
+
+
+def test_makeVariants_sharesDownsampledSource():
+    pixels = noise(32, 32)
+    with AEI.fromArray(pixels.copy(), format=CompressionFormat.Uncompressed_UI) as aei:
+        variants = makeVariants(aei, {"LD": Variant(4)}, mipmapFilter="kaiser")
+
+    expected = imageOps.downsample(imageOps.downsample(pixels, "kaiser"), "kaiser")
+    with AEI.fromCompressed(variants["LD"]) as ld:
+        assert np.array_equal(ld.asArray(), expected)
+
+
+def test_makeVariants_leavesSourceImageBacked():
+    with AEI(Image.fromarray(noise(16, 16), "RGBA"), format=CompressionFormat.Uncompressed_UI) as aei:
+        variants = makeVariants(aei, {"SD": Variant(2)})
+        assert aei._array is None # type: ignore[reportPrivateUsage]
+
+    assert (variants["SD"].width, variants["SD"].height) == (8, 8)
+
+
+@pytest.mark.parametrize("variant", [Variant(3), Variant(0)])
+def test_makeVariants_rejectsNonPowerOfTwo(variant: Variant):
+    with AEI.fromArray(noise(8, 8), format=CompressionFormat.ETC1) as aei:
+        with pytest.raises(ValueError):
+            makeVariants(aei, {"bad": variant})
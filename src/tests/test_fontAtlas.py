@@ -0,0 +1,53 @@
+import io
+import pytest
+from PIL import ImageFont
+from AEPi import AEI, CompressionFormat
+from AEPi.fontAtlas import buildFontAtlas, rasterizeGlyphs
+
+
+@pytest.fixture(scope="module")
+def font() -> bytes:
+    default = ImageFont.load_default(16)
+    if not isinstance(default, ImageFont.FreeTypeFont) or not isinstance(default.path, io.BytesIO):
+        pytest.skip("Pillow was built without FreeType")
+    return default.path.getvalue()
+
+
+def test_rasterizeGlyphs_parallelMatchesSerial(font: bytes):
+    characters = "The quick brown fox jumps over the lazy dog 0123456789"
+    serial = rasterizeGlyphs(font, 16, characters, workers=1)
+    parallel = rasterizeGlyphs(font, 16, characters, workers=2, batchSize=8)
+
+    assert list(serial) == list(dict.fromkeys(characters))
+    assert list(parallel) == list(serial)
+    assert all((parallel[c] == serial[c]).all() for c in serial)
+    # Every cell is the height of the line
+    assert len({cell.shape[0] for cell in serial.values()}) == 1
+    assert serial[" "].max() == 0 and serial["T"].max() > 0
+
+
+def test_buildFontAtlas_symbolMapRoundTrips(font: bytes):
+    characters = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    glyphs = rasterizeGlyphs(font, 16, characters, workers=1)
+    with buildFontAtlas(font, 16, characters, CompressionFormat.Uncompressed_UI, padding=2, workers=1) as atlas:
+        symbols = atlas.fonts[0]
+        assert list(symbols) == list(characters)
+        assert len(atlas.textures) == 0
+
+        pixels = atlas.asArray()
+        for character, box in symbols.items():
+            assert (box.height, box.width) == glyphs[character].shape
+            assert (pixels[box.y : box.y + box.height, box.x : box.x + box.width, 3] == glyphs[character]).all()
+
+        written = io.BytesIO()
+        atlas.write(written)
+        written.seek(0)
+
+    with AEI.read(written) as read:
+        assert [(c, b.x, b.y, b.width, b.height) for c, b in read.fonts[0].items()] == [(c, b.x, b.y, b.width, b.height) for c, b in symbols.items()]
+
+
+@pytest.mark.parametrize("characters", [["ab"], ["\U0001F600"]])
+def test_rasterizeGlyphs_rejectsMultipleCodeUnits(font: bytes, characters: list): # type: ignore[reportMissingTypeArgument]
+    with pytest.raises(ValueError):
+        rasterizeGlyphs(font, 16, characters)
@@ -0,0 +1,79 @@
+from io import BytesIO
+from threading import Thread
+from AEPi import AEI, CompressionFormat
+from AEPi.instrumentation import PhaseTiming, collectStats, phase
+
+
+def test_phase_disabled_yieldsNone():
+    with phase("test") as timing:
+        assert timing is None
+
+
+def test_read_recordsReadPhases():
+    with AEI((8, 8)) as aei:
+        aei.addTexture(0, 0, 4, 4)
+        aei.addTexture(4, 4, 4, 4)
+        fileBytes = aei.write(format=CompressionFormat.Uncompressed_UI, quality=3).getvalue() # type: ignore[reportAttributeAccessIssue]
+
+    with collectStats() as stats:
+        AEI.read(BytesIO(fileBytes)).close()
+
+    assert {"read", "header", "decompress", "textures"} <= stats.totals().keys()
+    assert stats.bytes("read") == len(fileBytes)
+    assert stats.bytes("header") == 15 + 2 * 8
+    assert stats.bytes("decompress") == 4 * 8 * 8
+    assert all(t.seconds >= 0 for t in stats.phases)
+
+
+def test_write_recordsWritePhases():
+    with AEI((8, 8)) as aei:
+        with collectStats() as stats:
+            written = aei.write(format=CompressionFormat.Uncompressed_UI).getvalue() # type: ignore[reportAttributeAccessIssue]
+
+    assert {"compress", "metadata", "write"} <= stats.totals().keys()
+    assert stats.bytes("write") == len(written)
+
+
+def test_write_mipmapped_recordsEveryLevel():
+    with AEI((16, 16)) as aei:
+        with collectStats() as stats:
+            aei.write(format=CompressionFormat.ETC1, mipmapped=True)
+
+    assert len([t for t in stats.phases if t.name == "compress"]) == 5
+
+
+def test_collectStats_callback_calledPerPhase():
+    recorded: list[PhaseTiming] = []
+    with collectStats(recorded.append) as stats:
+        with phase("test", 3):
+            pass
+
+    assert recorded == stats.phases
+    assert recorded[0].name == "test"
+    assert recorded[0].bytes == 3
+
+
+def test_collectStats_nested_recordsInBoth():
+    with collectStats() as outer:
+        with phase("first"):
+            pass
+
+        with collectStats() as inner:
+            with phase("second"):
+                pass
+
+    assert [t.name for t in outer.phases] == ["first", "second"]
+    assert [t.name for t in inner.phases] == ["second"]
+
+
+def test_collectStats_otherThreads_notRecorded():
+    def otherThread():
+        with phase("other"):
+            pass
+
+    with collectStats() as stats:
+        thread = Thread(target=otherThread)
+        thread.start()
+        thread.join()
+
+    assert stats.phases == []
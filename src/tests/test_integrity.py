@@ -0,0 +1,58 @@
+from pathlib import Path
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.integrity import checkFile, checkFiles
+
+
+def writeAei(path: Path, format: CompressionFormat = CompressionFormat.ETC1) -> bytes:
+    with AEI((8, 8)) as aei:
+        aei.addTexture(0, 0, 4, 4)
+        aei.fonts.append({"a": Texture(0, 0, 1, 1)})
+        aei.write(str(path), format=format, quality=2)
+    return path.read_bytes()
+
+
+def test_checkFile_valid_ok(tmp_path: Path):
+    writeAei(tmp_path / "valid.aei")
+    report = checkFile(tmp_path / "valid.aei", decode=True)
+    assert report.ok, report.problems
+
+
+def test_checkFile_reportsEveryProblem(tmp_path: Path):
+    contents = bytearray(writeAei(tmp_path / "broken.aei"))
+    # Move the texture out of bounds, declare the wrong payload length, and add trailing data
+    contents[15:17] = (6).to_bytes(2, "little")
+    contents[23:27] = (1).to_bytes(4, "little")
+    contents += b"\x00\x00"
+    (tmp_path / "broken.aei").write_bytes(contents)
+
+    problems = checkFile(tmp_path / "broken.aei").problems
+    assert len(problems) == 3
+    assert "Texture 0" in problems[0]
+    assert "Mip level 0" in problems[1]
+    assert "trailing data" in problems[2]
+
+
+def test_checkFile_truncated(tmp_path: Path):
+    contents = writeAei(tmp_path / "truncated.aei")
+    (tmp_path / "truncated.aei").write_bytes(contents[:30])
+    assert checkFile(tmp_path / "truncated.aei").problems == ["The AEI ended unexpectedly"]
+
+
+def test_checkFile_wrongFileType(tmp_path: Path):
+    (tmp_path / "other.aei").write_bytes(b"PNGimage" + bytes(20))
+    assert "unknown type" in checkFile(tmp_path / "other.aei").problems[0]
+
+
+def test_checkFiles_preservesOrder(tmp_path: Path):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"{i}.aei"
+        if i % 3:
+            writeAei(path)
+        else:
+            path.write_bytes(b"corrupt")
+        paths.append(path)
+
+    reports = list(checkFiles(iter(paths), workers=2))
+    assert [r.path for r in reports] == [str(p) for p in paths]
+    assert [r.ok for r in reports] == [bool(i % 3) for i in range(20)]
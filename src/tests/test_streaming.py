@@ -0,0 +1,81 @@
+import io
+import os
+import numpy as np
+import pytest
+from AEPi import AEI, CompressionFormat, Texture
+from AEPi.streaming import StripeWriter, writeStripes, tileStripes
+from randomImages import noise
+
+
+def unevenStripes(pixels: np.ndarray): # type: ignore[reportMissingTypeArgument]
+    y = 0
+    for rows in [3, 7, 1, 20] * 100:
+        if y >= len(pixels):
+            return
+        yield pixels[y : y + rows]
+        y += rows
+
+
+@pytest.mark.parametrize("format, mipmapped", [
+    (CompressionFormat.ETC1, True),
+    (CompressionFormat.ETC1, False),
+    (CompressionFormat.Uncompressed_UI, False)
+])
+@pytest.mark.parametrize("shape", [(64, 64), (70, 45), (9, 1)])
+def test_stripeWriter_matchesWholeImageEncode(format: CompressionFormat, mipmapped: bool, shape: tuple): # type: ignore[reportMissingTypeArgument]
+    pixels = noise(*shape)
+    with AEI.fromArray(pixels.copy()) as aei:
+        expected = aei.write(format=format, quality=2, mipmapped=mipmapped).getvalue() # type: ignore[reportAttributeAccessIssue]
+
+    out = io.BytesIO()
+    with StripeWriter(out, shape, format, 2, mipmapped, stripeHeight=8) as writer:
+        for stripe in unevenStripes(pixels):
+            writer.write(stripe)
+
+    assert out.getvalue() == expected
+
+
+def test_writeStripes_tilesToPath_readsBack(tmp_path: str):
+    pixels = noise(40, 24)
+    path = os.path.join(tmp_path, "tiled.aei")
+    textures = [Texture(0, 0, 8, 8)]
+    stripes = tileStripes(lambda x, y, w, h: pixels[y : y + h, x : x + w], (40, 24), (16, 16))
+    writeStripes(path, (40, 24), stripes, CompressionFormat.Uncompressed_UI, textures=textures)
+
+    with AEI.read(path) as aei:
+        assert np.array_equal(aei.asArray(), pixels)
+        assert [t.shape for t in aei.textures] == [(8, 8)]
+
+
+def test_stripeWriter_tooFewRows_raisesAndLeavesNoFile(tmp_path: str):
+    path = os.path.join(tmp_path, "partial.aei")
+    writer = StripeWriter(path, (8, 8), CompressionFormat.ETC1)
+    writer.write(noise(8, 4))
+    with pytest.raises(ValueError):
+        writer.close()
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_stripeWriter_invalidRows_raises():
+    with StripeWriter(io.BytesIO(), (8, 8), CompressionFormat.ETC1) as writer:
+        with pytest.raises(ValueError):
+            writer.write(noise(4, 4))
+        with pytest.raises(ValueError):
+            writer.write(noise(8, 9))
+        writer.write(noise(8, 8))
+
+
+def test_stripeWriter_pvrtc_raises():
+    with pytest.raises(ValueError):
+        StripeWriter(io.BytesIO(), (8, 8), CompressionFormat.PVRTC14A)
+
+
+def test_stripeWriter_exceptionInBlock_discardsFile(tmp_path: str):
+    path = os.path.join(tmp_path, "aborted.aei")
+    with pytest.raises(RuntimeError):
+        with StripeWriter(path, (8, 8), CompressionFormat.ETC1) as writer:
+            writer.write(noise(8, 8))
+            raise RuntimeError()
+
+    assert os.listdir(tmp_path) == []